@@ -0,0 +1,87 @@
+import hashlib
+import os
+import numpy as np
+
+# Threshold calibration for the BM25 dedup. Records are ranked by bm25_score_first and the top N are called
+# duplicates; true/false positives of every cutoff N are cumulative sums over the ranked labels, so the whole
+# precision/recall/F1 curve is one numpy pass instead of a list scan and an f1_score call per N.
+# The calibration scores themselves are cached by corpus build and blocks, so picking another cutoff doesn't
+# rerun BM25.
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+CALIBRATION_DIR = os.path.join(CODE_DIR, ".reference_cache", "calibration")
+
+
+def _ratio(numerator, denominator, zero_division=1.0):
+    # numerator / denominator with sklearn's zero_division=1 where the denominator is 0
+    out = np.full(len(numerator), zero_division)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def cutoff_curve(labels, ranks=None):
+    # Metrics for calling the top N records duplicates, per N in ranks (default every N). labels are 1 for
+    # duplicates, in descending score order. Cutoffs past the end call every record a duplicate.
+    labels = np.asarray(labels, dtype=np.int64)
+    n = len(labels)
+    ranks = np.arange(1, n + 1) if ranks is None else np.asarray(ranks, dtype=np.int64)
+    top = np.minimum(ranks, n)
+    hits = np.zeros(n + 1, np.int64)
+    np.cumsum(labels, out=hits[1:])
+
+    tp = hits[top]
+    fp = top - tp
+    fn = hits[n] - tp
+    tn = n - top - fn
+    f1 = _ratio(2 * tp, 2 * tp + fp + fn)
+    f1_negative = _ratio(2 * tn, 2 * tn + fn + fp)
+    return {"rank": ranks, "precision": _ratio(tp, tp + fp), "recall": _ratio(tp, tp + fn), "f1": f1,
+            "macro_f1": (f1 + f1_negative) / 2}
+
+
+def optimal_rank(scores, labels, ranks=None):
+    # (rank, threshold, curve) of the cutoff with the best macro F1; the first one wins ties.
+    # threshold is the score of the record at that rank.
+    scores = np.asarray(scores, dtype=float)
+    order = np.argsort(-scores, kind="stable")
+    curve = cutoff_curve(np.asarray(labels)[order], ranks)
+    best = int(curve["rank"][np.argmax(curve["macro_f1"])])
+    return best, scores[order][min(best, len(scores)) - 1], curve
+
+
+def top_predictions(n, rank):
+    # 0/1 predictions for calling the top rank of n ranked records duplicates
+    return (np.arange(n) < rank).astype(int)
+
+
+def score_at_rank(scores, rank):
+    # rank-th highest score (1-based), without sorting everything
+    scores = np.asarray(scores, dtype=float)
+    return -np.partition(-scores, rank - 1)[rank - 1]
+
+
+def calibration_key(*parts):
+    # Hash of strings and columns (anything with tolist()) the calibration scores depend on
+    sha1 = hashlib.sha1()
+    for part in parts:
+        for value in (part.tolist() if hasattr(part, "tolist") else [part]):
+            sha1.update("{}\t".format(value).encode("utf8"))
+        sha1.update(b"\n")
+    return sha1.hexdigest()
+
+
+def load_scores(name, key, path=CALIBRATION_DIR):
+    # Cached calibration scores, or None
+    score_file = os.path.join(path, "{}-{}.npy".format(name, key))
+    return np.load(score_file) if os.path.exists(score_file) else None
+
+
+def save_scores(name, key, scores, path=CALIBRATION_DIR):
+    os.makedirs(path, exist_ok=True)
+    # Only the latest scores of a calibration are kept
+    for entry in os.listdir(path):
+        if entry.startswith(name + "-"):
+            os.remove(os.path.join(path, entry))
+    tmp_file = os.path.join(path, "{}-{}.{}.tmp.npy".format(name, key, os.getpid()))
+    np.save(tmp_file, np.asarray(scores))
+    os.replace(tmp_file, os.path.join(path, "{}-{}.npy".format(name, key)))
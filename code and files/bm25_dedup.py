@@ -0,0 +1,287 @@
+import json
+import os
+import shutil
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from tqdm import tqdm
+from corpus_store import Corpus
+
+# Blocked BM25 for the dedup stages. A policy is only ever compared with the policies of its own
+# (Year, ISO_code, Scope) group, so only the block x block scores are computed and kept instead of an
+# N x N matrix; IDF and average document length still come from the whole corpus.
+
+# gensim.summarization.bm25 defaults, so its scores and the thresholds tuned on them (BM25_experience_judgment) hold
+PARAM_K1 = 1.5
+PARAM_B = 0.75
+EPSILON = 0.25
+
+# Files of a serialized BM25 (see save_bm25); the CSR arrays are shared by counts and weights
+BM25_ARRAYS = ["indices", "indptr", "tf", "weights", "idf", "doc_len"]
+
+# Curated databases first: a duplicate cluster keeps their record over a scraped one
+SOURCE_PRIORITY = ["IEA", "Climate Policy", "LSE"]
+
+
+def count_matrix(documents):
+    # documents x terms counts and the term ids, from token lists or straight from a corpus_store.Corpus
+    if hasattr(documents, "count_matrix"):
+        return documents.count_matrix(), documents.token_ids
+    token_ids = {}
+    ids = [token_ids.setdefault(word, len(token_ids)) for document in documents for word in document]
+    indptr = np.zeros(len(documents) + 1, np.int64)
+    np.cumsum([len(document) for document in documents], out=indptr[1:])
+    counts = sparse.csr_matrix((np.ones(len(ids)), ids, indptr), shape=(len(documents), len(token_ids)))
+    counts.sum_duplicates()
+    return counts, token_ids
+
+
+def bm25_idf(doc_freq, corpus_size, epsilon=EPSILON):
+    # gensim IDF per term; terms no document has stay 0 and don't count towards the average
+    used = doc_freq > 0
+    idf = np.zeros(len(doc_freq))
+    idf[used] = np.log(corpus_size - doc_freq[used] + 0.5) - np.log(doc_freq[used] + 0.5)
+    average_idf = idf[used].mean() if used.any() else 0.0
+    idf[used & (idf < 0)] = epsilon * average_idf
+    return idf, average_idf
+
+
+def bm25_weights(counts, idf, avgdl, k1=PARAM_K1, b=PARAM_B):
+    # weight of term t in document d: idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(d) / avgdl))
+    doc_len = np.asarray(counts.sum(axis=1)).ravel()
+    tf = counts.data
+    norm = np.repeat(k1 * (1 - b + b * doc_len / avgdl), np.diff(counts.indptr))
+    return sparse.csr_matrix((idf[counts.indices] * tf * (k1 + 1) / (tf + norm), counts.indices, counts.indptr),
+                             shape=counts.shape)
+
+
+class BM25:
+    # Okapi BM25 as a documents x terms CSR weight matrix, so a batch of queries is one sparse product.
+    # Scores match gensim.summarization.bm25.BM25 (gone in gensim 4): negative IDFs are floored at
+    # epsilon * average IDF, and a query word counts once per occurrence.
+    def __init__(self, corpus, k1=PARAM_K1, b=PARAM_B, epsilon=EPSILON):
+        self.counts, self._token_ids = count_matrix(corpus)
+        self.corpus_size = self.counts.shape[0]
+        self.doc_len = np.asarray(self.counts.sum(axis=1)).ravel()
+        self.avgdl = self.doc_len.sum() / self.corpus_size
+        doc_freq = np.bincount(self.counts.indices, minlength=self.counts.shape[1])
+        self.idf, self.average_idf = bm25_idf(doc_freq, self.corpus_size, epsilon)
+        self.weights = bm25_weights(self.counts, self.idf, self.avgdl, k1, b)
+        self.path = None
+        self.corpus = corpus if hasattr(corpus, "count_matrix") else None
+
+    @classmethod
+    def load(cls, path, corpus=None):
+        # BM25 written by save(), memory-mapped: opening costs no parsing and processes share the pages
+        bm25 = cls.__new__(cls)
+        with open(os.path.join(path, "bm25.json"), "r", encoding="utf8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in BM25_ARRAYS}
+        shape = tuple(meta["shape"])
+        bm25.counts = sparse.csr_matrix((arrays["tf"], arrays["indices"], arrays["indptr"]), shape=shape, copy=False)
+        bm25.weights = sparse.csr_matrix((arrays["weights"], arrays["indices"], arrays["indptr"]), shape=shape,
+                                         copy=False)
+        bm25.idf, bm25.doc_len = arrays["idf"], arrays["doc_len"]
+        bm25.corpus_size, bm25.avgdl, bm25.average_idf = meta["corpus_size"], meta["avgdl"], meta["average_idf"]
+        bm25._token_ids = None
+        bm25.path = path
+        bm25.corpus = corpus
+        return bm25
+
+    def save(self, path):
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        os.makedirs(tmp_path, exist_ok=True)
+        arrays = {"indices": self.counts.indices, "indptr": self.counts.indptr, "tf": self.counts.data,
+                  "weights": self.weights.data, "idf": self.idf, "doc_len": self.doc_len}
+        for name in BM25_ARRAYS:
+            np.save(os.path.join(tmp_path, name + ".npy"), np.asarray(arrays[name]))
+        with open(os.path.join(tmp_path, "bm25.json"), "w", encoding="utf8") as f:
+            json.dump({"shape": list(self.counts.shape), "corpus_size": int(self.corpus_size),
+                       "avgdl": float(self.avgdl), "average_idf": float(self.average_idf)}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    def __reduce__(self):
+        # A saved BM25 goes to worker processes as its path and is mapped again there instead of being copied
+        if self.path is None:
+            return super().__reduce__()
+        return _load_shared, (self.path, self.corpus.path if self.corpus is not None else None)
+
+    @property
+    def token_ids(self):
+        if self._token_ids is None:
+            self._token_ids = self.corpus.token_ids
+        return self._token_ids
+
+    def encode(self, documents):
+        # Query matrix for token lists; words the corpus doesn't have can't score and are dropped
+        rows, cols = [], []
+        for i, document in enumerate(documents):
+            for word in document:
+                if word in self.token_ids:
+                    rows.append(i)
+                    cols.append(self.token_ids[word])
+        return sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(documents), self.counts.shape[1]))
+
+    def _queries(self, queries):
+        # A query matrix from encode(), or positions of corpus documents used as queries
+        return queries if sparse.issparse(queries) else self.counts[np.asarray(queries, dtype=np.int64)]
+
+    def score_matrix(self, queries, docs=None):
+        # Dense queries x docs scores; docs are corpus positions (all documents by default)
+        weights = self.weights if docs is None else self.weights[np.asarray(docs, dtype=np.int64)]
+        return (self._queries(queries) @ weights.T).toarray()
+
+    def get_scores(self, document):
+        return self.score_matrix(self.encode([document]))[0]
+
+    def get_score(self, document, index):
+        return self.score_matrix(self.encode([document]), [index])[0, 0]
+
+    def pair_scores(self, first, second):
+        # Score of document second[i] for the query first[i], for each pair
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        return np.asarray(self.counts[first].multiply(self.weights[second]).sum(axis=1)).ravel()
+
+    def top_k(self, queries, k=1, exclude_self=False, batch_size=1024):
+        # [(doc positions, scores)] per query, best first, from the sparse product only (documents sharing no
+        # word with the query score 0 and are left out). exclude_self skips the query's own position.
+        results = []
+        positions = None if sparse.issparse(queries) else np.asarray(queries, dtype=np.int64)
+        query_matrix = self._queries(queries)
+        for start in range(0, query_matrix.shape[0], batch_size):
+            scores = (query_matrix[start:start + batch_size] @ self.weights.T).tocsr()
+            for i in range(scores.shape[0]):
+                row = scores.getrow(i)
+                docs, values = row.indices, row.data
+                if exclude_self and positions is not None:
+                    keep = docs != positions[start + i]
+                    docs, values = docs[keep], values[keep]
+                if len(values) > k:
+                    best = np.argpartition(-values, k - 1)[:k]
+                    docs, values = docs[best], values[best]
+                order = np.argsort(-values, kind="stable")
+                results.append((docs[order], values[order]))
+        return results
+
+
+def _load_shared(path, corpus_path):
+    return BM25.load(path, Corpus(corpus_path) if corpus_path else None)
+
+
+def bm25_index(corpus, k1=PARAM_K1, b=PARAM_B, epsilon=EPSILON):
+    # BM25 of a corpus_store.Corpus, serialized inside the corpus build the first time it's asked for and
+    # memory-mapped afterwards; a new corpus version is a new build, so the index can't go stale
+    path = os.path.join(corpus.path, "bm25-{}-{}-{}".format(k1, b, epsilon))
+    if not os.path.exists(os.path.join(path, "bm25.json")):
+        BM25(corpus, k1, b, epsilon).save(path)
+        print("BM25 index of {} docs written".format(len(corpus)))
+    return BM25.load(path, corpus)
+
+
+_worker = {}
+
+
+def _init_worker(bm25):
+    _worker["bm25"] = bm25
+
+
+def _score_block(index):
+    # scores[i, j] = BM25 of document index[j] for the query index[i]
+    return _worker["bm25"].score_matrix(index, index)
+
+
+def block_scores(bm25, blocks, n_process=1, desc='BM25 Blocks'):
+    # Score matrix per block (list of positional index arrays), in the order of blocks.
+    # Blocks are handed out largest first so one big block doesn't finish last on its own.
+    scores = [np.zeros((len(index), len(index))) for index in blocks]
+    todo = sorted((i for i, index in enumerate(blocks) if len(index) > 1), key=lambda i: -len(blocks[i]))
+    bar = tqdm(total=len(todo), desc=desc, ncols=150)
+    if n_process > 1 and len(todo) > 1:
+        with Pool(n_process, _init_worker, (bm25,)) as pool:
+            for i, block in zip(todo, pool.imap(_score_block, [blocks[i] for i in todo])):
+                scores[i] = block
+                bar.update(1)
+    else:
+        _init_worker(bm25)
+        for i in todo:
+            scores[i] = _score_block(blocks[i])
+            bar.update(1)
+    bar.close()
+    print("{}: {} blocks, {} pairs scored instead of {}".format(
+        desc, len(blocks), sum(len(index) ** 2 for index in blocks), bm25.corpus_size ** 2))
+    return scores
+
+
+def duplicate_pairs(blocks, scores, threshold):
+    # (first, second) corpus positions of every pair in a block scoring above threshold
+    firsts, seconds = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)]
+    for index, block in zip(blocks, scores):
+        if len(index) > 1:
+            rows, cols = np.nonzero(block > threshold)
+            other = rows != cols
+            firsts.append(np.asarray(index)[rows[other]])
+            seconds.append(np.asarray(index)[cols[other]])
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def duplicate_clusters(n, pairs):
+    # Cluster id per corpus position: the connected components of the duplicate pairs (either direction),
+    # union-find style; a policy without duplicates is its own cluster
+    first, second = pairs
+    graph = sparse.csr_matrix((np.ones(len(first)), (first, second)), shape=(n, n))
+    return connected_components(graph, directed=True, connection="weak")[1]
+
+
+def canonical_records(clusters, sources, lengths):
+    # True for the one record kept per cluster: best SOURCE_PRIORITY, then longest content, then first position
+    rank = {source: i for i, source in enumerate(SOURCE_PRIORITY)}
+    source_rank = np.array([rank.get(source, len(SOURCE_PRIORITY)) for source in sources])
+    order = np.lexsort((np.arange(len(clusters)), -np.asarray(lengths), source_rank, clusters))
+    first = np.ones(len(order), bool)
+    first[1:] = clusters[order[1:]] != clusters[order[:-1]]
+    keep = np.zeros(len(order), bool)
+    keep[order[first]] = True
+    return keep
+
+
+def near_blocks(df, pairs, scope="Scope"):
+    # Pairs whose blocks could still be the same policy: year at most one apart, ISO_code equal or missing on one
+    # side, scope equal or Unknown/missing on one side (scope=None skips the scope check)
+    first, second = pairs
+    year = pd.to_numeric(df["Year"], errors="coerce").to_numpy(dtype=float)
+    year_gap = np.abs(year[first] - year[second])
+    keep = (year_gap <= 1) | np.isnan(year_gap)
+    iso = df["ISO_code"].fillna("").astype(str).str.strip().to_numpy()
+    keep &= (iso[first] == iso[second]) | (iso[first] == "") | (iso[second] == "")
+    if scope is not None:
+        scopes = df[scope].fillna("Unknown").astype(str).to_numpy()
+        keep &= (scopes[first] == scopes[second]) | (scopes[first] == "Unknown") | (scopes[second] == "Unknown")
+    return keep
+
+
+def verify_pairs(bm25, pairs, threshold):
+    # Candidate pairs scoring above threshold in either direction
+    first, second = pairs
+    scores = np.maximum(bm25.pair_scores(first, second), bm25.pair_scores(second, first))
+    keep = scores > threshold
+    print("BM25 verified {} of {} candidate pairs".format(int(keep.sum()), len(keep)))
+    return first[keep], second[keep]
+
+
+def dedup_clusters(df, blocks, scores, threshold, extra_pairs=None):
+    # Cluster ids and the positions to drop, so each cluster of policies scoring above threshold keeps one.
+    # extra_pairs are already verified duplicates: cross-block BM25 pairs, or embedding pairs.
+    first, second = duplicate_pairs(blocks, scores, threshold)
+    if extra_pairs is not None:
+        first = np.concatenate([first, extra_pairs[0]])
+        second = np.concatenate([second, extra_pairs[1]])
+    clusters = duplicate_clusters(len(df), (first, second))
+    content = df["Policy_Content"] if "Policy_Content" in df.columns else df["Policy"]
+    keep = canonical_records(clusters, df["Source"].tolist(), content.fillna("").astype(str).str.len().to_numpy())
+    print("{} duplicate clusters, {} records dropped".format(
+        len(np.unique(clusters[~keep])), int((~keep).sum())))
+    return clusters, np.flatnonzero(~keep).tolist()
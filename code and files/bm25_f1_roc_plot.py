@@ -4,10 +4,10 @@ import os
 import matplotlib.pyplot as plt
 import warnings
 from matplotlib.pyplot import MultipleLocator
-from sklearn.metrics import f1_score, classification_report
+from sklearn.metrics import classification_report
 from sklearn.metrics import roc_curve
 from sklearn.metrics import RocCurveDisplay
-from tqdm import tqdm
+from bm25_calibration import cutoff_curve, top_predictions
 
 warnings.filterwarnings("ignore")
 
@@ -43,44 +43,26 @@ if __name__ == '__main__':
     bm25_man_all = bm25_man_all.sort_values(by=['bm25_score_first'], ascending=False)
     # print(bm25_man_all)
 
-    preds_dict = dict()
     # labs_dict = dict()
 
     a = bm25_man_all["A"].to_list()
-    labs = [0] * len(a)
-    for idx, p in enumerate(a):
-        if p in bm25_dup_list:
-            labs[idx] = 1
-
-    optimal_rank = 0
-    max_f1 = 0.
-    f1 = []
-    top_bm25 = []
-    bar = tqdm(range(1000, 8001), desc='Optimal rank', ncols=150)
-    for i in bar:
-        top_bm25.append(i)
-        preds = [0] * len(a)
-
-        bm25_temp = a[:i]
-        # print(bm25_temp["A"].to_list())
-        # p_list_temp = set(bm25_temp["A"].to_list())
-        for idx, p in enumerate(a):
-            if p in bm25_temp:
-                preds[idx] = 1
-        if i in draw:
-            preds_dict[i] = preds
-        # print(sum(preds))
-
-        macro_f1 = f1_score(labs, preds, average='macro', zero_division=1)
-        f1.append(macro_f1)
-        if macro_f1 > max_f1:
-            max_f1 = macro_f1
-            optimal_rank = i
-
-            report = classification_report(labs, preds, zero_division=1, output_dict=True)
-            print(report)
-
-            df = pd.DataFrame(report).transpose()
+    labs = bm25_man_all["A"].isin(bm25_dup_list).astype(int).to_numpy()
+
+    # Macro F1 of every top-N cutoff from cumulative sums over the ranked labels
+    top_bm25 = list(range(1000, 8001))
+    curve = cutoff_curve(labs, top_bm25)
+    f1 = curve["macro_f1"].tolist()
+    optimal_rank = top_bm25[int(np.argmax(f1))]
+    max_f1 = max(f1)
+    print("Optimal rank {}: macro f1 {:.4f}, bm25_score_first {}".format(
+        optimal_rank, max_f1, bm25_man_all["bm25_score_first"].iloc[min(optimal_rank, len(a)) - 1]))
+
+    preds_dict = {d: top_predictions(len(a), d) for d in draw}
+
+    report = classification_report(labs, top_predictions(len(a), optimal_rank), zero_division=1, output_dict=True)
+    print(report)
+
+    df = pd.DataFrame(report).transpose()
 
     df.to_csv('/home/zhhuang/climate_policy_paper/code/model_save/optimal_rank.csv', index=True)
 
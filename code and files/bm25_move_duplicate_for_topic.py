@@ -1,92 +1,17 @@
+import argparse
 import pandas as pd
 import numpy as np
-from gensim.summarization.bm25 import BM25
 import os
 import sys
-import re
 from tqdm import tqdm
-from nltk import data
-from nltk.tokenize import word_tokenize
-from nltk import pos_tag
-from nltk.stem import WordNetLemmatizer
-import spacy
-import geonamescache
-
-data.path.append(r"/home/zhhuang/climate_policy_paper/code/data/nltk_data")
-
-
-def gen_dict_extract(var, key):
-    if isinstance(var, dict):
-        for k, v in var.items():
-            if k == key:
-                yield v
-            if isinstance(v, (dict, list)):
-                yield from gen_dict_extract(v, key)
-    elif isinstance(var, list):
-        for d in var:
-            yield from gen_dict_extract(d, key)
-
-
-def load_stopwords():
-    stopwords = []
-    with open('/home/zhhuang/climate_policy_paper/code/data/stopwords.txt', 'r', encoding='utf8') as file:
-        for line in file:
-            stopwords.append(line.strip())
-    return stopwords
-
-
-def lemmatize(words, wnl: WordNetLemmatizer):
-    for word, tag in pos_tag(words):
-        if tag.startswith('NN'):
-            yield wnl.lemmatize(word, pos='n')
-        elif tag.startswith('VB'):
-            yield wnl.lemmatize(word, pos='v')
-        elif tag.startswith('JJ'):
-            yield wnl.lemmatize(word, pos='a')
-        elif tag.startswith('R'):
-            yield wnl.lemmatize(word, pos='r')
-        else:
-            yield word
-
-
-def normalize(texts):
-    stopwords = load_stopwords()
-    wnl = WordNetLemmatizer()
-    processed_texts = []
-
-    bar = tqdm(range(len(texts)), desc='Preprocessing ...', ncols=150)
-    for _, text in zip(bar, texts):
-        # 1.去除年份和%，如1991-2007，2025，2.5%
-        n_text = re.sub(r'(\d{4}(-\d{4})?)|([-+]?\d+(.\d+)?%)', '', text)
-
-        # 2.converting all characters to lowercase 小写
-        n_text = n_text.lower()
-
-        # 3.stopwords 停用词 (包含punctuation and symbols 标点和符号)
-        words = [word for word in word_tokenize(n_text) if word not in stopwords]
-
-        # 4.lemmatization 词形还原
-        words = list(lemmatize(words, wnl))
-
-        # 5.geo
-        geo = []
-        doc = nlp(' '.join(words))
-        for ent in doc.ents:
-            if ent.label_ == 'GPE':
-                if ent.text in cities:
-                    pass
-                else:
-                    geo.append(ent.text)
-            elif ent.label_ in ['DATE', 'TIME']:
-                geo.append(ent.text)
-        words = ' '.join(words)
-        if geo:
-            for g in geo:
-                words = words.replace(g, '')
-
-        processed_texts.append(words)
-
-    return processed_texts
+from bm25_tokenizer import tokenize_policies, BM25_TOKENIZER
+from bm25_dedup import bm25_index, block_scores, dedup_clusters, near_blocks, verify_pairs
+from minhash_lsh import lsh_candidates
+from corpus_store import build_corpus
+from bm25_calibration import calibration_key, load_scores, save_scores, score_at_rank
+from text_normalize import clean_content
+from embedding_dedup import cached_embeddings, dedup_texts, ann_index, similar_pairs, block_similar_pairs, \
+    calibrated_similarity
 
 
 def get_data():
@@ -109,22 +34,24 @@ def get_bm25_score(top_ratio):
     df_all = pd.concat([iea_cp_cclw_df, df_docs])
     # print(df.info())
 
-    bm25_matrix = np.zeros((len(df_all["Policy"]), len(df_all["Policy"])))
-    policy_list = normalize(df_all["Policy"].tolist())
+    corpus = build_corpus("bm25_for_topic_calibration", df_all["Policy"].tolist(), tokenize_policies,
+                          tokenizer=BM25_TOKENIZER)
     policy_list_raw = df_all["Policy"].tolist()
-    tokenized_policy_list = [doc.split(" ") for doc in policy_list]
 
-    # gensim
-    bm25 = BM25(tokenized_policy_list)
+    # bm25_score_first only changes with the corpus and the groups; a cached copy skips BM25 and the loop below
+    calibration = calibration_key(os.path.basename(corpus.path), df_all["Year"], df_all["ISO_code"])
+    is_database = df_all["Source"].isin(["IEA", "Climate Policy", "LSE"]).to_numpy()
+    cached_scores = load_scores("bm25_for_topic_calibration", calibration)
+    if cached_scores is not None:
+        return score_at_rank(cached_scores[is_database], top_ratio)
 
-    bar = tqdm(range(len(df_all)), desc='BM25 Matrix', ncols=150)
-    for _, num_row in zip(bar, df_all.iterrows()):
-        num, row = num_row
-        tokenized_query = policy_list[num].split(" ")
-        doc_scores = bm25.get_scores(tokenized_query)
-        bm25_matrix[num] = doc_scores
+    # gensim.summarization scores, as a memory-mapped sparse term-document matrix stored with the corpus
+    bm25 = bm25_index(corpus)
 
     grouped = df_all.groupby(["Year", "ISO_code"])["Policy"]
+    # BM25 only within each group, with the IDF of the whole corpus
+    blocks = list(grouped.indices.values())
+    bm25_blocks = block_scores(bm25, blocks, n_process=os.cpu_count())
 
     group_policy_number = np.zeros(len(df_all["Policy"]))
     bm25_score_first = np.zeros(len(df_all["Policy"]))
@@ -134,17 +61,16 @@ def get_bm25_score(top_ratio):
     # ========= bm25_score_first =========
     bar = tqdm(range(len(grouped.indices)), desc='BM25 Group Dedup', ncols=150)
 
-    for _, name_index in zip(bar, grouped.indices.items()):
-        name, index = name_index
+    for _, (index, block) in zip(bar, zip(blocks, bm25_blocks)):
         if len(index) == 1:
             group_policy_number[index] = 1
 
         elif len(index) == 2:
             group_policy_number[index] = 2
             for num, idx in enumerate(index):
-                scores = bm25_matrix[idx]
+                scores = block[num]
                 other_policy_index = np.delete(index, num)
-                other_policy_scores = scores[other_policy_index]
+                other_policy_scores = np.delete(scores, num)
                 sort_score_index = np.argsort(other_policy_scores)[::-1]
                 # print(other_policy_index)
                 # print(other_policy_scores)
@@ -161,16 +87,16 @@ def get_bm25_score(top_ratio):
                 # if len(other_policy_index) > 0:
                 #
                 #     # print(bm25_policy_first)
-                #     if np.max(scores[other_policy_index]) > BM25_experience_judgment:
+                #     if np.max(other_policy_scores) > BM25_experience_judgment:
                 #         delete_list.append(idx)
 
         else:
             group_policy_number[index] = len(index)
 
             for num, idx in enumerate(index):
-                scores = bm25_matrix[idx]
+                scores = block[num]
                 other_policy_index = np.delete(index, num)
-                other_policy_scores = scores[other_policy_index]
+                other_policy_scores = np.delete(scores, num)
                 sort_score_index = np.argsort(other_policy_scores)[::-1]
                 # print(other_policy_index[sort_score_index[0]])
                 # print(policy_list[other_policy_index[sort_score_index[0]]])
@@ -187,7 +113,7 @@ def get_bm25_score(top_ratio):
                 # if len(other_policy_index) > 0:
                 #
                 #     # print(bm25_policy_first)
-                #     if np.max(scores[other_policy_index]) > BM25_experience_judgment:
+                #     if np.max(other_policy_scores) > BM25_experience_judgment:
                 #         delete_list.append(idx)
 
     df_all["group_policy_number"] = group_policy_number
@@ -198,13 +124,9 @@ def get_bm25_score(top_ratio):
     # save(df, delete_list, BM25_experience_judgment)
 
     # ratio = 2940
-    df_bm25 = df_all[df_all["Source"].isin(["IEA", "Climate Policy", "LSE"])]
-    bm25_scr_list = df_bm25["bm25_score_first"].to_list()
-    bm25_scr_list.sort()
+    save_scores("bm25_for_topic_calibration", calibration, bm25_score_first)
     # ratio = int(2940 / 13298 * len(df_bm25["bm25_score_first"].to_list()))
-    # iea_cp_lse_length = len(data[data["Scope"].isin(['IEA', 'Climate Policy', 'LSE'])])
-    # print(bm25_scr_list[::-1])
-    bm25_score = bm25_scr_list[::-1][top_ratio - 1]
+    bm25_score = score_at_rank(bm25_score_first[is_database], top_ratio)
     return bm25_score
 
 
@@ -228,18 +150,13 @@ def save(df_result, del_list, score):
 
 
 if __name__ == '__main__':
-    nlp = spacy.load("en_core_web_trf")
-
-    gc = geonamescache.GeonamesCache()
-
-    # gets nested dictionary for countries
-    countries = gc.get_countries()
-
-    # gets nested dictionary for cities
-    cities = gc.get_cities()
-
-    cities = [*gen_dict_extract(cities, 'name')]
-    countries = [*gen_dict_extract(countries, 'name')]
+    parser = argparse.ArgumentParser()
+    # Also merge ClimateBERT near-duplicates (paraphrased or translated titles); needs torch/transformers.
+    # blocks: exact cosine within each (Year, ISO_code) group; ann: ANN neighbours, kept when the blocks are close
+    parser.add_argument('--embedding', default='off', choices=['off', 'blocks', 'ann'])
+    parser.add_argument('--embedding_threshold', default=None, type=float,
+                        help="Cosine cutoff; calibrated on the labelled duplicates when not given")
+    args = parser.parse_args()
 
     BM25_experience_judgment = get_bm25_score(2940)
 
@@ -247,22 +164,16 @@ if __name__ == '__main__':
     # print(df.info())
 
     # ========= bm25_matrix =========
-    bm25_matrix = np.zeros((len(df["Policy"]), len(df["Policy"])))
-    policy_list = normalize(df["Policy"].tolist())
+    corpus = build_corpus("bm25_for_topic", df["Policy"].tolist(), tokenize_policies, tokenizer=BM25_TOKENIZER)
     policy_list_raw = df["Policy"].tolist()
-    tokenized_policy_list = [doc.split(" ") for doc in policy_list]
-
-    # gensim
-    bm25 = BM25(tokenized_policy_list)
 
-    bar = tqdm(range(len(df)), desc='BM25 Matrix', ncols=150)
-    for _, num_row in zip(bar, df.iterrows()):
-        num, row = num_row
-        tokenized_query = policy_list[num].split(" ")
-        doc_scores = bm25.get_scores(tokenized_query)
-        bm25_matrix[num] = doc_scores
+    # gensim.summarization scores, as a memory-mapped sparse term-document matrix stored with the corpus
+    bm25 = bm25_index(corpus)
 
     grouped = df.groupby(["Year", "ISO_code"])["Policy"]
+    # BM25 only within each group, with the IDF of the whole corpus
+    blocks = list(grouped.indices.values())
+    bm25_blocks = block_scores(bm25, blocks, n_process=os.cpu_count())
 
     group_policy_number = np.zeros(len(df["Policy"]))
     bm25_score_first = np.zeros(len(df["Policy"]))
@@ -272,47 +183,20 @@ if __name__ == '__main__':
     # print(grouped.indices)
     # print(type(grouped.indices))
 
-    delete_list = []
     # ========= bm25_score_first =========
     bar = tqdm(range(len(grouped.indices)), desc='BM25 Group Dedup', ncols=150)
 
-    for _, name_index in zip(bar, grouped.indices.items()):
-        name, index = name_index
+    for _, (index, block) in zip(bar, zip(blocks, bm25_blocks)):
         if len(index) == 1:
             group_policy_number[index] = 1
 
-        elif len(index) == 2:
-            group_policy_number[index] = 2
-            for num, idx in enumerate(index):
-                scores = bm25_matrix[idx]
-                other_policy_index = np.delete(index, num)
-                other_policy_scores = scores[other_policy_index]
-                sort_score_index = np.argsort(other_policy_scores)[::-1]
-                # print(other_policy_index)
-                # print(other_policy_scores)
-
-                bm25_score_first[idx] = other_policy_scores[sort_score_index[0]]
-                bm25_policy_first[idx] = policy_list_raw[other_policy_index[sort_score_index[0]]]
-                bm25_index_first[idx] = other_policy_index[sort_score_index[0]]
-
-                del_temp = []
-                for opi_idx, i in enumerate(other_policy_index):
-                    if i in delete_list:
-                        del_temp.append(opi_idx)
-                other_policy_index = np.delete(other_policy_index, del_temp)
-                if len(other_policy_index) > 0:
-
-                    # print(bm25_policy_first)
-                    if np.max(scores[other_policy_index]) > BM25_experience_judgment:
-                        delete_list.append(idx)
-
         else:
             group_policy_number[index] = len(index)
 
             for num, idx in enumerate(index):
-                scores = bm25_matrix[idx]
+                scores = block[num]
                 other_policy_index = np.delete(index, num)
-                other_policy_scores = scores[other_policy_index]
+                other_policy_scores = np.delete(scores, num)
                 sort_score_index = np.argsort(other_policy_scores)[::-1]
                 # print(other_policy_index[sort_score_index[0]])
                 # print(policy_list[other_policy_index[sort_score_index[0]]])
@@ -321,20 +205,37 @@ if __name__ == '__main__':
                 bm25_policy_first[idx] = policy_list_raw[other_policy_index[sort_score_index[0]]]
                 bm25_index_first[idx] = other_policy_index[sort_score_index[0]]
 
-                del_temp = []
-                for opi_idx, i in enumerate(other_policy_index):
-                    if i in delete_list:
-                        del_temp.append(opi_idx)
-                other_policy_index = np.delete(other_policy_index, del_temp)
-                if len(other_policy_index) > 0:
-
-                    # print(bm25_policy_first)
-                    if np.max(scores[other_policy_index]) > BM25_experience_judgment:
-                        delete_list.append(idx)
-
     df["group_policy_number"] = group_policy_number
     df["bm25_score_first"] = bm25_score_first
     df["bm25_policy_first"] = bm25_policy_first
     df["bm25_index_first"] = bm25_index_first
 
+    # Near-duplicates the blocking misses (year off by one, missing ISO_code): MinHash-LSH candidates over the
+    # normalized titles, kept when their blocks are close and BM25 confirms them
+    first, second = lsh_candidates([corpus.text(i) for i in range(len(corpus))])
+    close = near_blocks(df, (first, second), scope=None)
+    cross_block_pairs = verify_pairs(bm25, (first[close], second[close]), BM25_experience_judgment)
+
+    if args.embedding != 'off':
+        # Semantic neighbours of title + leading content
+        threshold = args.embedding_threshold
+        if threshold is None:
+            threshold = calibrated_similarity(["Year", "ISO_code"])
+        vectors = cached_embeddings("bm25_for_topic", dedup_texts(df["Policy"].tolist(),
+                                                                  df["Policy_Content"].map(clean_content).tolist()))
+        if args.embedding == 'blocks':
+            first, second = block_similar_pairs(vectors, blocks, threshold)
+        else:
+            first, second = similar_pairs(ann_index("bm25_for_topic", vectors), vectors, threshold)
+            close = near_blocks(df, (first, second), scope=None)
+            first, second = first[close], second[close]
+        # Like the LSH candidates, embedding pairs only count when BM25 confirms them
+        first, second = verify_pairs(bm25, (first, second), BM25_experience_judgment)
+        cross_block_pairs = (np.concatenate([cross_block_pairs[0], first]),
+                             np.concatenate([cross_block_pairs[1], second]))
+
+    # Pairs above the threshold form duplicate clusters; each cluster keeps one canonical record
+    df["dup_cluster"], delete_list = dedup_clusters(df, blocks, bm25_blocks, BM25_experience_judgment,
+                                                    cross_block_pairs)
+
     save(df, delete_list, BM25_experience_judgment)
@@ -0,0 +1,48 @@
+import os
+from gazetteer import load_gazetteer
+from ner_pipeline import pipe_entities, model_tag
+from corpus_store import source_tag
+from text_normalize import normalize_texts, STOPWORDS_FILE
+
+# The BM25 dedup tokenization shared by bm25_move_duplicate, bm25_move_duplicate_for_topic and the
+# concat_bm25_similar stages: text_normalize steps 1-4, then dates and non-city place names found by NER are removed.
+# The 17.23 threshold and the persisted dedup indexes were built on these tokens.
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Names the normalize() tokenization in the corpus store; editing this module, the shared normalizer or the
+# stopwords retires it
+BM25_TOKENIZER = "normalize-geo-{}-{}".format(model_tag(), source_tag(
+    __file__, STOPWORDS_FILE, os.path.join(CODE_DIR, 'text_normalize.py')))
+
+
+def normalize(texts):
+    # City/country hash sets compiled from geonamescache
+    gazetteer = load_gazetteer()
+    processed_texts = []
+
+    # 1-4.years and %, lowercase, stopwords, lemmatization
+    word_texts = normalize_texts(texts, n_process=os.cpu_count())
+
+    # 5.geo (batched, cached NER over all texts)
+    for words, ents in zip(word_texts, pipe_entities(word_texts, desc='Geo NER')):
+        geo = []
+        for start, end, label in ents:
+            if label == 'GPE':
+                if gazetteer.is_city(words[start:end]):
+                    pass
+                else:
+                    geo.append(words[start:end])
+            elif label in ['DATE', 'TIME']:
+                geo.append(words[start:end])
+        if geo:
+            for g in geo:
+                words = words.replace(g, '')
+
+        processed_texts.append(words)
+
+    return processed_texts
+
+
+def tokenize_policies(texts):
+    return [doc.split(" ") for doc in normalize(texts)]
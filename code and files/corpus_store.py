@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import numpy as np
+from scipy import sparse
+
+# Tokenized corpora shared by the BM25 dedup, topic and TF-IDF stages.
+# A corpus is written once under .reference_cache/corpus/<name>/<build>/ and memory-mapped by every reader:
+#   vocab.json   tokens; the position is the token id
+#   docs.json    document ids and content hashes, in corpus order
+#   ids.npy      int32 token ids of all documents back to back
+#   offsets.npy  int64; document i is ids[offsets[i]:offsets[i + 1]]
+# <build> is a hash of the tokenizer, the document ids and the content hashes, so an unchanged corpus is opened
+# without tokenizing anything; a changed one only tokenizes texts whose content hash the previous build lacks.
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(CODE_DIR, ".reference_cache", "corpus")
+CORPUS_VERSION = 1
+CURRENT_FILE = "CURRENT"
+
+# TfidfVectorizer() defaults: lowercase, tokens of 2+ word characters
+TFIDF_TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+TFIDF_TOKENIZER = "tfidf-default"
+
+
+def content_hash(text):
+    return hashlib.sha1(str(text).encode("utf8")).hexdigest()
+
+
+def source_tag(*paths):
+    # Short hash of the files that define a tokenizer, so editing any of them retires the stored tokens
+    sha1 = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            sha1.update(f.read())
+    return sha1.hexdigest()[:12]
+
+
+def build_key(tokenizer, doc_ids, hashes):
+    sha1 = hashlib.sha1("{}\n{}\n".format(CORPUS_VERSION, tokenizer).encode("utf8"))
+    for doc_id, digest in zip(doc_ids, hashes):
+        sha1.update("{}\t{}\n".format(doc_id, digest).encode("utf8"))
+    return sha1.hexdigest()
+
+
+class Corpus:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf8") as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(path, "docs.json"), "r", encoding="utf8") as f:
+            docs = json.load(f)
+        self.tokenizer = docs["tokenizer"]
+        self.doc_ids = docs["doc_ids"]
+        self.hashes = docs["hashes"]
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self._token_ids = None
+        self._positions = None
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @property
+    def token_ids(self):
+        # token ==> id
+        if self._token_ids is None:
+            self._token_ids = {token: i for i, token in enumerate(self.vocab)}
+        return self._token_ids
+
+    def position(self, doc_id):
+        if self._positions is None:
+            self._positions = {doc: i for i, doc in enumerate(self.doc_ids)}
+        return self._positions[str(doc_id)]
+
+    def doc(self, i):
+        # Token ids of document i, a view into the memory-mapped ids
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def tokens(self, i):
+        vocab = self.vocab
+        return [vocab[j] for j in self.doc(i)]
+
+    def text(self, i):
+        return ' '.join(self.tokens(i))
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def count_matrix(self, rows=None):
+        # documents x vocab term counts (CSR), built straight from the id buffers
+        if rows is None:
+            # a copy: sum_duplicates sorts in place and the mapped ids are read-only
+            ids, indptr, n_rows = np.array(self.ids), np.asarray(self.offsets), len(self)
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            ids = np.concatenate([self.doc(i) for i in rows]) if len(rows) else np.zeros(0, np.int32)
+            indptr = np.zeros(len(rows) + 1, np.int64)
+            np.cumsum(self.offsets[rows + 1] - self.offsets[rows], out=indptr[1:])
+            n_rows = len(rows)
+        counts = sparse.csr_matrix((np.ones(len(ids)), np.asarray(ids), indptr), shape=(n_rows, len(self.vocab)))
+        counts.sum_duplicates()
+        return counts
+
+
+def open_corpus(name, path=CORPUS_DIR):
+    # The current build of a corpus, or None
+    current_file = os.path.join(path, name, CURRENT_FILE)
+    if not os.path.exists(current_file):
+        return None
+    with open(current_file, "r", encoding="utf8") as f:
+        build = f.read().strip()
+    build_path = os.path.join(path, name, build)
+    return Corpus(build_path) if os.path.isdir(build_path) else None
+
+
+def build_corpus(name, texts, tokenize, doc_ids=None, tokenizer="", path=CORPUS_DIR):
+    # Corpus of texts under name, tokenized by tokenize(list of texts) -> list of token lists.
+    # tokenizer names the tokenization; changing it starts the corpus from scratch.
+    doc_ids = [str(i) for i in (range(len(texts)) if doc_ids is None else doc_ids)]
+    hashes = [content_hash(text) for text in texts]
+    build = build_key(tokenizer, doc_ids, hashes)
+    corpus_path = os.path.join(path, name)
+    build_path = os.path.join(corpus_path, build)
+
+    old = open_corpus(name, path)
+    if old is not None and old.path == build_path:
+        print("{}: {} docs, unchanged".format(name, len(old)))
+        return old
+    if old is not None and old.tokenizer != tokenizer:
+        old = None
+
+    # Old token ids stay valid: the vocabulary only grows
+    token_ids = dict(old.token_ids) if old is not None else {}
+    old_rows = {digest: i for i, digest in enumerate(old.hashes)} if old is not None else {}
+    new_texts = {}
+    for text, digest in zip(texts, hashes):
+        if digest not in old_rows and digest not in new_texts:
+            new_texts[digest] = text
+    new_docs = {}
+    if new_texts:
+        for digest, words in zip(new_texts, tokenize(list(new_texts.values()))):
+            new_docs[digest] = np.array([token_ids.setdefault(word, len(token_ids)) for word in words], np.int32)
+
+    pieces = [old.doc(old_rows[digest]) if digest in old_rows else new_docs[digest] for digest in hashes]
+    offsets = np.zeros(len(pieces) + 1, np.int64)
+    np.cumsum([len(piece) for piece in pieces], out=offsets[1:])
+    ids = np.concatenate(pieces).astype(np.int32) if pieces else np.zeros(0, np.int32)
+
+    tmp_path = "{}.{}.tmp".format(build_path, os.getpid())
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, "ids.npy"), ids)
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    with open(os.path.join(tmp_path, "vocab.json"), "w", encoding="utf8") as f:
+        json.dump(list(token_ids), f, ensure_ascii=False)
+    with open(os.path.join(tmp_path, "docs.json"), "w", encoding="utf8") as f:
+        json.dump({"tokenizer": tokenizer, "doc_ids": doc_ids, "hashes": hashes}, f)
+    shutil.rmtree(build_path, ignore_errors=True)
+    os.replace(tmp_path, build_path)
+    _write_current(corpus_path, build)
+
+    # Older builds are dropped; readers that still map them keep their open files
+    for entry in os.listdir(corpus_path):
+        if entry not in (build, CURRENT_FILE) and not entry.endswith(".tmp"):
+            shutil.rmtree(os.path.join(corpus_path, entry), ignore_errors=True)
+
+    print("{}: {} docs, {} reused, {} tokenized, {} tokens in vocab".format(
+        name, len(texts), len(texts) - sum(digest in new_docs for digest in hashes), len(new_docs), len(token_ids)))
+    return Corpus(build_path)
+
+
+def _write_current(corpus_path, build):
+    tmp_file = os.path.join(corpus_path, "{}.{}.tmp".format(CURRENT_FILE, os.getpid()))
+    with open(tmp_file, "w", encoding="utf8") as f:
+        f.write(build)
+    os.replace(tmp_file, os.path.join(corpus_path, CURRENT_FILE))
+
+
+def tfidf_tokenize(texts):
+    return [TFIDF_TOKEN_PATTERN.findall(text.lower()) for text in texts]
+
+
+class Tfidf:
+    # TfidfVectorizer() over a Corpus: raw counts, smooth idf, l2 rows, columns in sorted token order
+    def fit(self, corpus, rows=None):
+        counts = corpus.count_matrix(rows)
+        used = np.flatnonzero(counts.getnnz(axis=0))
+        self.vocabulary = {token: col for col, token in enumerate(sorted(corpus.vocab[i] for i in used))}
+        counts = self._columns(corpus, counts)
+        n_docs = counts.shape[0]
+        doc_freq = np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+        return self
+
+    def _columns(self, corpus, counts):
+        # Corpus token ids ==> fitted columns; tokens not seen in fit are dropped
+        columns = np.array([self.vocabulary.get(token, -1) for token in corpus.vocab], np.int64)
+        counts = counts.tocoo()
+        keep = columns[counts.col] >= 0
+        return sparse.csr_matrix((counts.data[keep], (counts.row[keep], columns[counts.col[keep]])),
+                                 shape=(counts.shape[0], len(self.vocabulary)))
+
+    def transform(self, corpus, rows=None):
+        features = self._columns(corpus, corpus.count_matrix(rows)).multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(features.multiply(1 / norms[:, None]))
+
+
+def tfidf_corpus(path, texts):
+    # TfidfVectorizer tokens of the texts read from a data file, one corpus per file. The name carries a hash of the
+    # absolute path: single_labels/.../train.jsonl and multiple_labels/.../train.jsonl must not replace each other.
+    path = os.path.abspath(path)
+    name = "tfidf_{}_{}".format(os.path.splitext(os.path.basename(path))[0],
+                                hashlib.sha1(path.encode("utf8")).hexdigest()[:8])
+    return build_corpus(name, texts, tfidf_tokenize, tokenizer=TFIDF_TOKENIZER)
@@ -0,0 +1,286 @@
+import os
+import re
+import unicodedata
+from collections import defaultdict
+import pandas as pd
+from reference_cache import load_aggregates_codes, load_country_codes
+
+# Shared country-name resolution for the region/ISO stages
+# (files/policy_db_region_iso_annex.py, policy_db_iea_cp_cclw*/cp_iea_lse_region_process.py)
+
+RESOLVED_COLUMNS = ["Short_name", "Long_name", "ISO_code", "Income_Group", "WB_Region"]
+EMPTY_RECORD = ("", "", "", "", "")
+# ISO-keyed enrichment columns and the value used when an ISO is not in the lookup table
+ENRICHMENT_DEFAULTS = {"Annex": "Non Annex I", "IPCC_Region": ""}
+# Approximate matches need a trigram Dice similarity of at least FUZZY_THRESHOLD and must beat
+# the best candidate with a different ISO code by FUZZY_MARGIN ("Kingdom of" is ambiguous)
+FUZZY_THRESHOLD = 0.7
+FUZZY_MARGIN = 0.15
+
+# Spelling variant ==> name as written in Countries_Code.xlsx / Aggregates_Code.xlsx
+COUNTRY_ALIAS = {
+    "kyrgyzstan": "Kyrgyz Republic",
+    "viet nam": "Vietnam",
+    "republic df the congo": "Democratic Republic of the Congo",
+    "republic of the congo": "Democratic Republic of the Congo",
+    "bolivarian republic of venezuela": "Venezuela",
+    "bolivia (plurinational state of)": "Bolivia",
+    "boliv. rep. of": "Bolivia",
+    "lao": "LAO PDR",
+    "lao, people's dem. rep.": "LAO PDR",
+    "gambia": "The Gambia",
+    "bahamas": "The Bahamas",
+    "micronesia (federated states of)": "Micronesia",
+    "saint vincent and the grenadines": "st. vincent and the grenadines",
+    "chinese taipei": "China",
+    "usa": "United States",
+    "hong kong, china": "China",
+    "china, other": "China",
+    "macau, china": "China",
+    "macau (china)": "China",
+    "iran (islamic republic of)": "Iran",
+    "iran, islamic republic of": "Iran",
+    "dpr korea": "Dem. People's Rep. Korea",
+    "korea, republic of": "Korea",
+    "south korea": "Korea",
+    "taiwan, province of china": "China",
+    "people's dem. rep.": "Dem. People's Rep. Korea",
+    "korea, dem. people's rep.": "Dem. People's Rep. Korea",
+    "dem. people's rep.": "Dem. People's Rep. Korea",
+    "slovakia": "Slovak Republic",
+    "great britain": "United Kingdom",
+    "czechoslovakia": "Czech Republic",
+    "puerto rico (usa)": "Puerto Rico",
+    "venezuela, boliv. rep. of": "Venezuela",
+    "eswatini, kingdom of": "Kingdom of Eswatini",
+    "moldova, republic of": "Republic of Moldova",
+    "bermuda (uk)": "The Bermudas",
+    "congo, dem. rep. of": "Democratic Republic of the Congo",
+    "micronesia, fed. states": "Federated States of Micronesia",
+    "turks-caicos islands (uk)": "Turks and Caicos Islands",
+    "cayman islands (uk)": "Cayman Islands",
+    "tanzania, un. rep. of": "United Republic of Tanzania",
+    "anguilla": "United Kingdom",
+    "falkland islands (malvinas)": "United Kingdom",
+    "jersey": "United Kingdom",
+    "guernsey": "United Kingdom",
+    "saint helena": "United Kingdom",
+    "montserrat": "United Kingdom",
+    "pitcairn": "United Kingdom",
+    "turks-caicos islands": "Turks and Caicos Islands",
+    "northern mariana is.": "Commonwealth of the Northern Mariana Islands",
+    "sint maarten": "Kingdom of the Netherlands",
+    "netherlands antilles": "Kingdom of the Netherlands",
+    "serbia and montenegro": "Republic of Serbia",
+    "martinique": "French Republic",
+    "guadeloupe": "French Republic",
+    "french guiana": "French Republic",
+    "réunion": "French Republic",
+    "saint barthélemy (fra)": "French Republic",
+    "mayotte": "French Republic",
+    "norfolk island": "Commonwealth of Australia",
+    "tokelau": "New Zealand",
+    "svalbard": "Norway",
+}
+
+# Jurisdictions missing from Countries_Code.xlsx
+EXTRA_COUNTRY = {
+    "niue": ("Niue", "Niue", "NIU", '', ''),
+    "niue (new zealand)": ("Niue", "Niue", "NIU", '', ''),
+    "saint kitts and nevis": ("Saint Kitts and Nevis", "Saint Kitts and Nevis", "KNA", '', ''),
+    "saint lucia": ("Saint Lucia", "Saint Lucia", "LCA", '', ''),
+    "sao tome and principe": ("Sao Tome and Principe", "Sao Tome and Principe", "STP", '', ''),
+    "cook islands": ('Cook Islands', 'Cook Islands', 'COK', '', ''),
+    "cook islands (new zealand)": ('Cook Islands', 'Cook Islands', 'COK', '', ''),
+    "libyan arab jamahiriya": ('Libyan Arab Jamahiriya', 'Libyan Arab Jamahiriya', 'LBY', '', ''),
+    "unknown": ("Unknown", "Unknown", '', '', ''),
+}
+
+# ISO variants used by Climate Policy (Country ISO) and LSE (Geography ISO)
+ISO_ALIAS = {
+    "EUE": "EUU",
+    "EUR": "EUU",
+    "TWN": "CHN",
+}
+
+_parenthetical_pattern = re.compile(r"\([^)]*\)")
+_punctuation_pattern = re.compile(r"[^\w]+")
+
+
+def normalize_country(name):
+    # casefold, drop punctuation, collapse spaces: "Korea, Dem. People's Rep." ==> "korea dem people s rep"
+    return _punctuation_pattern.sub(" ", str(name).casefold()).strip()
+
+
+def strip_qualifier(name):
+    # "Niue (New Zealand)" ==> "niue"
+    return normalize_country(_parenthetical_pattern.sub(" ", str(name)))
+
+
+def fold_accents(name):
+    # "côte d ivoire" ==> "cote d ivoire"
+    return "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+
+
+def char_ngrams(name, n=3):
+    name = " {} ".format(fold_accents(name))
+    return {name[i:i + n] for i in range(len(name) - n + 1)}
+
+
+class FuzzyCountryIndex:
+    # Character-trigram inverted index over the normalized names/aliases of the resolver table
+    def __init__(self, table, n=3):
+        self.n = n
+        self.keys = list(table.keys())
+        self.records = [table[key] for key in self.keys]
+        self.gram_counts = []
+        self.postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            grams = char_ngrams(key, n)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(i)
+        # raw string ==> ranked candidates, so each distinct spelling is scored once per run
+        self.cache = {}
+
+    def candidates(self, name, k=5):
+        if (name, k) in self.cache:
+            return self.cache[(name, k)]
+        grams = char_ngrams(strip_qualifier(name) or normalize_country(name), self.n)
+        shared = defaultdict(int)
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] += 1
+        # Dice coefficient over trigram sets
+        scored = [(2 * count / (len(grams) + self.gram_counts[i]), i) for i, count in shared.items()]
+        scored.sort(key=lambda x: (-x[0], self.keys[x[1]]))
+        result = [(self.keys[i], self.records[i], round(score, 4)) for score, i in scored[:k]]
+        self.cache[(name, k)] = result
+        return result
+
+
+class CountryResolver:
+    def __init__(self, country_df, aggregates_df):
+        country_df = country_df.fillna("")
+        aggregates_df = aggregates_df.fillna("")
+
+        country_records = [
+            (s_name, l_name, code, i_group, region)
+            for s_name, l_name, code, i_group, region in zip(
+                country_df["Short Name"], country_df["Long Name"], country_df["Code"],
+                country_df["Income Group"], country_df["Region"])]
+        aggregates_records = [
+            (s_name, l_name, code, '', '')
+            for s_name, l_name, code in zip(
+                aggregates_df["Short Name"], aggregates_df["Long Name"], aggregates_df["Code"])]
+
+        # Lookup priority: Long_name, Short_name, extra jurisdictions, aggregates Long_name, aggregates Short_name
+        canonical = {}
+        for record in country_records:
+            canonical.setdefault(normalize_country(record[1]), record)
+        for record in country_records:
+            canonical.setdefault(normalize_country(record[0]), record)
+        for name, record in EXTRA_COUNTRY.items():
+            canonical.setdefault(normalize_country(name), record)
+        for record in aggregates_records:
+            canonical.setdefault(normalize_country(record[1]), record)
+        for record in aggregates_records:
+            canonical.setdefault(normalize_country(record[0]), record)
+
+        # Aliases are applied before the canonical lookup, so they take precedence
+        table = dict(canonical)
+        for alias, target in COUNTRY_ALIAS.items():
+            record = canonical.get(normalize_country(target))
+            if record is not None:
+                table[normalize_country(alias)] = record
+
+        # Fallback keys without parenthetical qualifiers, never overriding an exact key
+        for key, record in list(table.items()):
+            table.setdefault(strip_qualifier(key), record)
+        table.pop("", None)
+        self.table = table
+        self._fuzzy_index = None
+
+        self.iso_table = {}
+        for record in aggregates_records + country_records:
+            self.iso_table[record[2]] = record
+        for alias, target in ISO_ALIAS.items():
+            self.iso_table.setdefault(alias, self.iso_table[target])
+        for record in EXTRA_COUNTRY.values():
+            if record[2]:
+                self.iso_table.setdefault(record[2], record)
+
+    @property
+    def fuzzy_index(self):
+        if self._fuzzy_index is None:
+            self._fuzzy_index = FuzzyCountryIndex(self.table)
+        return self._fuzzy_index
+
+    def resolve(self, name, fuzzy=False):
+        record = self.table.get(normalize_country(name))
+        if record is None:
+            record = self.table.get(strip_qualifier(name), EMPTY_RECORD)
+        if record is EMPTY_RECORD and fuzzy and normalize_country(name) and not self.is_country_list(name):
+            record = self.fuzzy_resolve(name)
+        return record
+
+    def fuzzy_resolve(self, name):
+        candidates = self.fuzzy_index.candidates(name, k=10)
+        if not candidates or candidates[0][2] < FUZZY_THRESHOLD:
+            return EMPTY_RECORD
+        best = candidates[0]
+        runner_up = next((score for _, record, score in candidates if record[2] != best[1][2]), 0)
+        if best[2] - runner_up < FUZZY_MARGIN:
+            return EMPTY_RECORD
+        print("fuzzy match: {} ==> {} ({})".format(name, best[1][0], best[2]))
+        return best[1]
+
+    def candidates(self, name, k=5):
+        return self.fuzzy_index.candidates(name, k)
+
+    def is_country_list(self, name):
+        # "Argentina,Russian Federation" is several jurisdictions, not a misspelling of one
+        parts = str(name).split(",")
+        return sum(normalize_country(part) in self.table for part in parts) > 1
+
+    def resolve_iso(self, iso):
+        return self.iso_table.get(str(iso).strip().upper(), EMPTY_RECORD)
+
+    def resolve_series(self, series, fuzzy=False):
+        return self._map_unique(series, lambda name: self.resolve(name, fuzzy))
+
+    def resolve_iso_series(self, series):
+        return self._map_unique(series, self.resolve_iso)
+
+    @staticmethod
+    def _map_unique(series, func):
+        # Resolve each distinct value once, then broadcast with map
+        series = series.fillna("").astype(str)
+        lookup = {value: func(value) for value in series.unique()}
+        records = series.map(lookup)
+        return pd.DataFrame(records.tolist(), index=series.index, columns=RESOLVED_COLUMNS)
+
+
+def build_iso_enrichment(annex_iso_list, iso_region_dict=None):
+    # One table keyed by ISO holding every enrichment column
+    columns = {"Annex": {iso: "Annex I" for iso in annex_iso_list}}
+    if iso_region_dict is not None:
+        columns["IPCC_Region"] = dict(iso_region_dict)
+    return pd.DataFrame({column: pd.Series(values, dtype=object) for column, values in columns.items()})
+
+
+def enrich_by_iso(df, enrichment):
+    joined = enrichment.reindex(df["ISO_code"].values)
+    for column in enrichment.columns:
+        df[column] = joined[column].fillna(ENRICHMENT_DEFAULTS[column]).values
+    return df
+
+
+_resolver_cache = {}
+
+
+def load_country_resolver(path="."):
+    path = os.path.abspath(path)
+    if path not in _resolver_cache:
+        _resolver_cache[path] = CountryResolver(load_country_codes(path), load_aggregates_codes(path))
+    return _resolver_cache[path]
@@ -1,64 +1,16 @@
 import pandas as pd
 import json
-import re
-from nltk.tokenize import word_tokenize
-from nltk import pos_tag
-from nltk.stem import WordNetLemmatizer
+import os
+import sys
 from sklearn.model_selection import train_test_split
-from nltk import data
 
-data.path.append(r"/home/zhhuang/climate_policy_paper/code/data/nltk_data")
-
-
-def load_stopwords():
-    stopwords = []
-    with open('stopwords.txt', 'r', encoding='utf8') as file:
-        for line in file:
-            stopwords.append(line.strip())
-    return stopwords
-
-
-def lemmatize(words, wnl: WordNetLemmatizer):
-    for word, tag in pos_tag(words):
-        if tag.startswith('NN'):
-            yield wnl.lemmatize(word, pos='n')
-        elif tag.startswith('VB'):
-            yield wnl.lemmatize(word, pos='v')
-        elif tag.startswith('JJ'):
-            yield wnl.lemmatize(word, pos='a')
-        elif tag.startswith('R'):
-            yield wnl.lemmatize(word, pos='r')
-        else:
-            yield word
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from text_normalize import normalize_texts
 
 
 def normalize(texts):
-    stopwords = load_stopwords()
-    wnl = WordNetLemmatizer()
-    processed_texts = []
-
-    for text in texts:
-        # 1.去除年份和%，如1991-2007，2025，2.5%
-        n_text = re.sub(r'(\d{4}(-\d{4})?)|([-+]?\d+(.\d+)?%)', '', str(text))
-
-        # 2.converting all characters to lowercase 小写
-        n_text = n_text.lower()
-
-        # 3.stopwords 停用词 (包含punctuation and symbols 标点和符号)
-        words = [word for word in word_tokenize(n_text) if word not in stopwords]
-
-        processed_texts.append(' '.join(words))
-
-        # # 4.lemmatization 词形还原
-        # words = list(lemmatize(words, wnl))
-
-        # # 5.removing fewer than five characters 去除5个单词以内的
-        # if len(words) > 5:
-        #     processed_texts.append(' '.join(words))
-        # else:
-        #     processed_texts.append('')
-
-    return processed_texts
+    # years and %, lowercase, stopwords; lemmatization stays off here
+    return normalize_texts(texts, lemmatize_words=False)
 
 
 def load_excel():
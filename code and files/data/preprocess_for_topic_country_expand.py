@@ -2,138 +2,107 @@ import pandas as pd
 import json
 from tqdm import tqdm
 import re
-from nltk.tokenize import word_tokenize
-from nltk import pos_tag
-from nltk.stem import WordNetLemmatizer
 from nltk.corpus import wordnet
-import spacy
+import os
+import sys
 
 from nltk import data
 
-data.path.append(r"/home/zhhuang/climate_policy_paper/code/data/nltk_data")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ner_pipeline import pipe_entities, remove_entities, model_tag
+from text_normalize import load_stopwords as load_stopwords_file, tokenize, load_lemmatizer, Replacer, \
+    add_clean_content, CLEAN_CONTENT, STOPWORDS_FILE
+from corpus_store import build_corpus, source_tag
 
+data.path.append(r"/home/zhhuang/climate_policy_paper/code/data/nltk_data")
 
-def replace_str_by_index(doc, start, end):
-    if len(start) <= 1:
-        str_re = doc[:start[0]].text + ' ' + doc[end[-1] + 1:].text
-    else:
-        str_re = doc[:start[0]].text
-        # print(str_re)
-        for s, e in zip(end[:-1], start[1:]):
-            str_temp = ' ' + doc[s + 1:e].text
-            # print(str_temp)
-            str_re += str_temp
-        str_re = str_re + ' ' + doc[end[-1] + 1:].text
 
-    return str_re
+# Topic-model stopwords on top of data/stopwords.txt
+TOPIC_STOPWORDS = ('mee', 'gov', 'cn', 'republic', '“', 'cal', '”', 'law', 'regulation', 'decree', 'ministry', 'art',
+                   'issue', 'party', 'council', 'provision', 'unite', 'kingdom', 'european', 'federation', 'ministerial',
+                   'directive', 'europe', 'declaration', 'provision')
+
+
+# 1. web, year, %, ‰, like 1991-2007，2025，2.5%
+# A domain can't start after a letter, so the lookbehind skips mid-word starts without changing any match
+remove_numbers = Replacer([
+    (re.compile(r"(http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+)|"
+                r"((?<![a-zA-Z])[a-zA-Z]+.\w+\.+[a-zA-Z0-9\/_]+)"), ''),
+    (re.compile(r'(\d{4}(-\d{4})?)|([-+]?\d+(.\d+)?%)'), ''),
+    (re.compile(r'([-+]?\d+(.\d+)?‰)'), ''),
+    (re.compile(r'\d+'), '')])
+
+# 3. units, brackets, quotes and symbols in the lowercased text
+rewrite_symbols = Replacer([
+    (re.compile(r'g\?co2/km'), ''), (re.compile(r'm2\s?/year'), ''), (re.compile(r'\(.+?\)'), ' '),
+    (re.compile(r'\[.+?\]'), ' '), ("..", '.'), (" •", '.'), ('‘', "'"), ("``", " "), ("''", " "), ("nº", 'no'),
+    ("/", ' '), ("co-operative", 'cooperative'), ("co-operation", 'cooperation')])
+
+# Agency acronyms, units, roman numerals and symbols dropped from the topic docs, one after another
+REPLACE_LIST = ["european union", "ec european", "european parliament", "islamic republic", "mee gov cn",
+               "interministerial committee", "panchayat raj", "commission", " mra ", " mahrh ", " mecv ",
+               " masa ", " mme ", "interministerial", " mce ", " medd ", " mica ", " pres ", " pm ", " mef ",
+               " metd ", " mhu ", " mid ", " minagri ", " mpmef ", " mpmp  ", " micpme ", " mjldlh ", " sgm ",
+               " dggufe ", " sa ", " dc ", " pr ", " mah ", "european", 'charter', 'treaty', 'deplete',
+               'provision', "®", "sepã", "¢", "€", "ž", "¢", 'u.s.', ' ec ', 'amending', 'amendment', 'amend',
+               'amended', ' km ', ' kwh ', ' btu ', "''", ' mw ', '``', ' mtcoe ', " mefpcp ", " dgddi ",
+               " dgid ", " dgtcp ", " rgf ", " f35034 ", " meft ", " mem ", " mea ", " mef ", " mic ", " met ",
+               " mmeems ", " mefepepn ", " mcpea ", " agri ", " mats ", " mihu ", " muha ", " cj ", " rbm ",
+               " mispc ", " ms ", " mdlaat ", " dghc ", " dnsp ", " dgnsp ", " dclr ", " ecn-dd", " cab ",
+               " min ", " ecn-t", " jeb ", " ecn-ef ", " bnme ", " tt-btc ", " mlhl ", " ecntljeb ",
+               'co2', ' kw ', ' kv ', ' co2-eq ', ' mton ', ' swh ', ' twh ', ' gwh ', '‰', '¥', '°c', ' kpa ',
+               ' hdd ', ' cdd ', 'kwh/m', '°f', '≤', '≥', '<', '>', '=', ' gw ', ' kp ', ' niger ', ' sidf ',
+               ' pner ', ' nlccc ', ' sce ', ' dpe ', ' gpn ', ' sti ', ' msi ', ' sids ', ' ktoe ', ' mtoe ',
+               ' nsee ', ' sgcie ', ' bep ', ' dfid ', ' kyrgyz ', ' gj ', ' sce ', ' gujarat ', ' scfi ',
+               ' qd ', ' ttg ', ' kva ', ' tcvn ', ' bau ', ' ruen ',
+               " Ⅰ ", " Ⅱ ", " Ⅲ ", " Ⅳ ", " Ⅴ ", " Ⅵ ", " Ⅶ ", " Ⅷ ", " Ⅸ ", " Ⅹ ", " Ⅺ ", " Ⅻ ", " XIII ",
+               " XIV ", " XV ", " XVI ", " XVII ", " XVIII ", " XIX ", " XX "]
+
+remove_terms = Replacer((term, '') for term in REPLACE_LIST)
+
+CORPUS_NAME = "topic_country_expand"
+# Names the tokenization in the corpus store; editing this script, the shared normalizer or the stopwords retires it
+TOPIC_TOKENIZER = "topic-{}-{}".format(model_tag(), source_tag(
+    __file__, STOPWORDS_FILE, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'text_normalize.py')))
 
 
 def load_stopwords():
-    stopwords = []
-    with open('/home/zhhuang/climate_policy_paper/code/data/stopwords.txt', 'r', encoding='utf8') as file:
-        for line in file:
-            stopwords.append(line.strip())
-    stopwords += ['mee', 'gov', 'cn', 'republic', '“', 'cal', '”', 'law', 'regulation', 'decree', 'ministry', 'art',
-                  'issue', 'party', 'council', 'provision', 'unite', 'kingdom', 'european', 'federation', 'ministerial',
-                  'directive', 'europe', 'declaration', 'provision']
-    return stopwords
-
-
-def lemmatize(words, wnl: WordNetLemmatizer):
-    for word, tag in pos_tag(words):
-        if tag.startswith('NN'):
-            yield wnl.lemmatize(word, pos='n')
-        elif tag.startswith('VB'):
-            yield wnl.lemmatize(word, pos='v')
-        elif tag.startswith('JJ'):
-            yield wnl.lemmatize(word, pos='a')
-        elif tag.startswith('R'):
-            yield wnl.lemmatize(word, pos='r')
-        else:
-            yield word
+    return load_stopwords_file(extra=TOPIC_STOPWORDS)
 
 
-def normalize(texts, dlist):
+def tokenize_docs(texts):
     stopwords = load_stopwords()
-    wnl = WordNetLemmatizer()
-    processed_texts = []
-
-    nlp = spacy.load('en_core_web_trf')
-
-    bar = tqdm(range(len(texts)), desc='Preprocessing ...', ncols=150)
-    for _, num_text in zip(bar, enumerate(texts)):
-        num, text = num_text
-        # for text in texts:
-
-        # 1. web, year, %, ‰, like 1991-2007，2025，2.5%
-        n_text = re.sub(
-            r"(http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+)|([a-zA-Z]+.\w+\.+[a-zA-Z0-9\/_]+)",
-            '', text)
-        n_text = re.sub(r'(\d{4}(-\d{4})?)|([-+]?\d+(.\d+)?%)', '', n_text)
-        n_text = re.sub(r'([-+]?\d+(.\d+)?‰)', '', n_text)
-        n_text = re.sub(r'(\d)+', '', n_text)
-
-        # 2. NER
-        '''
-        'EVENT',
-        'FAC',
-        '''
-        start = []
-        end = []
-        doc = nlp(n_text)
-        for ent in doc.ents:
-            if ent.label_ in ['GPE', 'ORG', 'PERSON', 'DATE', 'NORP', 'LAW', 'LOC', 'MONEY', 'PRODUCT', 'TIME',
-                              'PERCENT', 'ORDINAL', 'LANGUAGE', 'CARDINAL', 'QUANTITY', 'WORK_OF_ART', 'EVENT', 'FAC']:
-                start.append(ent.start)
-                end.append(ent.end)
-
-        if start:
-            n_text = replace_str_by_index(doc, start, end)
+    lemmatizer = load_lemmatizer()
+    word_lists = []
+
+    # 1. web, year, %, ‰
+    raw_texts = [remove_numbers(text) for text in texts]
+
+    # 2. NER, batched and cached over all texts
+    '''
+    'EVENT',
+    'FAC',
+    '''
+    ner_labels = ['GPE', 'ORG', 'PERSON', 'DATE', 'NORP', 'LAW', 'LOC', 'MONEY', 'PRODUCT', 'TIME', 'PERCENT',
+                  'ORDINAL', 'LANGUAGE', 'CARDINAL', 'QUANTITY', 'WORK_OF_ART', 'EVENT', 'FAC']
+    ner_texts = [remove_entities(n_text, ents, ner_labels)
+                 for n_text, ents in zip(raw_texts, pipe_entities(raw_texts, desc='NER'))]
+
+    bar = tqdm(range(len(ner_texts)), desc='Preprocessing ...', ncols=150)
+    for _, num_text in zip(bar, enumerate(ner_texts)):
+        num, n_text = num_text
 
         # 3. converting all characters to lowercase
         n_text = n_text.lower()
-        n_text = re.sub(r'g\?co2/km', '', n_text)
-        n_text = re.sub(r'm2\s?/year', '', n_text)
-        n_text = re.sub(r'\(.+?\)', ' ', n_text)
-        n_text = re.sub(r'\[.+?\]', ' ', n_text)
-        n_text = n_text.replace("..", '.')
-        n_text = n_text.replace(" •", '.')
-        n_text = n_text.replace('‘', "'")
-        n_text = n_text.replace("``", " ")
-        n_text = n_text.replace("''", " ")
-        n_text = n_text.replace("nº", 'no')
-        n_text = n_text.replace("/", ' ')
-        replace_list = ["european union", "ec european", "european parliament", "islamic republic", "mee gov cn",
-                        "interministerial committee", "panchayat raj", "commission", " mra ", " mahrh ", " mecv ",
-                        " masa ", " mme ", "interministerial", " mce ", " medd ", " mica ", " pres ", " pm ", " mef ",
-                        " metd ", " mhu ", " mid ", " minagri ", " mpmef ", " mpmp  ", " micpme ", " mjldlh ", " sgm ",
-                        " dggufe ", " sa ", " dc ", " pr ", " mah ", "european", 'charter', 'treaty', 'deplete',
-                        'provision', "®", "sepã", "¢", "€", "ž", "¢", 'u.s.', ' ec ', 'amending', 'amendment', 'amend',
-                        'amended', ' km ', ' kwh ', ' btu ', "''", ' mw ', '``', ' mtcoe ', " mefpcp ", " dgddi ",
-                        " dgid ", " dgtcp ", " rgf ", " f35034 ", " meft ", " mem ", " mea ", " mef ", " mic ", " met ",
-                        " mmeems ", " mefepepn ", " mcpea ", " agri ", " mats ", " mihu ", " muha ", " cj ", " rbm ",
-                        " mispc ", " ms ", " mdlaat ", " dghc ", " dnsp ", " dgnsp ", " dclr ", " ecn-dd", " cab ",
-                        " min ", " ecn-t", " jeb ", " ecn-ef ", " bnme ", " tt-btc ", " mlhl ", " ecntljeb ",
-                        'co2', ' kw ', ' kv ', ' co2-eq ', ' mton ', ' swh ', ' twh ', ' gwh ', '‰', '¥', '°c', ' kpa ',
-                        ' hdd ', ' cdd ', 'kwh/m', '°f', '≤', '≥', '<', '>', '=', ' gw ', ' kp ', ' niger ', ' sidf ',
-                        ' pner ', ' nlccc ', ' sce ', ' dpe ', ' gpn ', ' sti ', ' msi ', ' sids ', ' ktoe ', ' mtoe ',
-                        ' nsee ', ' sgcie ', ' bep ', ' dfid ', ' kyrgyz ', ' gj ', ' sce ', ' gujarat ', ' scfi ',
-                        ' qd ', ' ttg ', ' kva ', ' tcvn ', ' bau ', ' ruen ',
-                        " Ⅰ ", " Ⅱ ", " Ⅲ ", " Ⅳ ", " Ⅴ ", " Ⅵ ", " Ⅶ ", " Ⅷ ", " Ⅸ ", " Ⅹ ", " Ⅺ ", " Ⅻ ", " XIII ",
-                        " XIV ", " XV ", " XVI ", " XVII ", " XVIII ", " XIX ", " XX "]
-        n_text = n_text.replace("co-operative", 'cooperative')
-        n_text = n_text.replace("co-operation", 'cooperation')
-
-        for i in replace_list:
-            n_text = n_text.replace(i, '')
+        n_text = rewrite_symbols(n_text)
+        n_text = remove_terms(n_text)
 
         # 4.stopwords (punctuation and symbols)
-        words = [word for word in word_tokenize(n_text) if word not in stopwords]
+        words = [word for word in tokenize(n_text) if word not in stopwords]
 
         # 5.lemmatization
-        words = list(lemmatize(words, wnl))
-
-        n_text = ' '.join(words)
+        words = lemmatizer.lemmatize(words)
+        word_lists.append(words)
 
 
         #         # 5.geo
@@ -151,6 +120,15 @@ def normalize(texts, dlist):
         # processed_texts.append(words)
         #                 print(ent.text)
 
+    return word_lists
+
+
+def normalize(texts, dlist, doc_ids=None):
+    # Topic tokens are kept in the corpus store, so only new or edited texts go through NER and lemmatization
+    corpus = build_corpus(CORPUS_NAME, texts, tokenize_docs, doc_ids, tokenizer=TOPIC_TOKENIZER)
+    processed_texts = []
+    for num in range(len(corpus)):
+        n_text = corpus.text(num)
         if len(n_text.split()) > 5:
             processed_texts.append(n_text)
         else:
@@ -168,24 +146,9 @@ def process():
         pass
     df.dropna(subset=['Policy_Content'], inplace=True)
 
-    df["Policy_Content"] = df["Policy_Content"].str.replace(
-        'IEA/IRENA Global Renewable Energy Policies and Measures Database © OECD/IEA and IRENA, [November 2020]', '',
-        regex=False)
-    # df["Policy_Content"] = df["Policy_Content"] = df["Policy_Content"].str.lower()
-    df["Policy_Content"] = df["Policy_Content"].str.replace('\n', ' ', regex=False)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'<a href.+?>', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'<ul style.+?>', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'<.+?>', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace('&nbsp;', ' ', regex=False)
-
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(source:.+?\)', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(http:.+?\)', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(Reference.+?\)', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(.+?\)', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'\[.+?\]', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r' •', '.', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'‘', "'", regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'’', "'", regex=True)
+    # Markup cleanup, reusing Policy_Content_clean when the input workbook already carries it
+    df = add_clean_content(df)
+    df["Policy_Content"] = df[CLEAN_CONTENT]
 
     # df["Policy_Content"] = df["Policy_Content"].str.replace(r'/', " ", regex=True)
 
@@ -206,7 +169,8 @@ def process():
     # for _, num_row in zip(bar, df.iterrows()):
     #     num, row = num_row
     #     # print(f"{df['Policy']} {df['Policy_Content']}")
-    docs, del_list = normalize([f"{row['Policy']} {row['Policy_Content']}" for num, row in df.iterrows()], del_list)
+    docs, del_list = normalize([f"{row['Policy']} {row['Policy_Content']}" for num, row in df.iterrows()], del_list,
+                               df["Index"].to_list())
     # topic_doc = normalize(f"{row['Policy']} {row['Policy_Content']}")
     # df.loc[num, "docs"] = topic_doc
     # if topic_doc:
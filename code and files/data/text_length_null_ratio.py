@@ -1,5 +1,10 @@
 import pandas as pd
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from text_normalize import add_clean_content, CLEAN_CONTENT
 
 
 def policy_after_fill():
@@ -7,20 +12,9 @@ def policy_after_fill():
     df = pd.read_excel('policy_db_complete.xlsx', sheet_name='all_policies_dedup')
     df = df[['Policy', 'Policy_Content', 'db_source']]
     # df.dropna(subset=['Policy_Content'], inplace=True)
-    df["Policy_Content"] = df["Policy_Content"] = df["Policy_Content"].str.lower()
-    df["Policy_Content"] = df["Policy_Content"].str.replace('\n', ' ', regex=False)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'<a href.+?>', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'<ul style.+?>', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'<.+?>', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace('&nbsp;', ' ', regex=False)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(
-        'IEA/IRENA Global Renewable Energy Policies and Measures Database © OECD/IEA and IRENA, [November 2020]', '',
-        regex=False)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(source:.+?\)', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(http:.+?\)', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(Reference.+?\)', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(.+?\)', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'\[.+?\]', ' ', regex=True)
+    # Same cleaned text the topic stage reads (lowercasing does not change the word counts)
+    df = add_clean_content(df)
+    df["Policy_Content"] = df[CLEAN_CONTENT]
 
     df_iea = df[df['db_source'] == 'IEA']
     df_cp = df[df['db_source'] == 'Climate Policy']
@@ -64,20 +58,9 @@ def policy_before_fill():
     df = pd.read_excel('policy_db_complete.xlsx', sheet_name='raw_data')
     df = df[['Policy', 'Policy_Content', 'db_source']]
     # df.dropna(subset=['Policy_Content'], inplace=True)
-    df["Policy_Content"] = df["Policy_Content"] = df["Policy_Content"].str.lower()
-    df["Policy_Content"] = df["Policy_Content"].str.replace('\n', ' ', regex=False)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'<a href.+?>', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'<ul style.+?>', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'<.+?>', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace('&nbsp;', ' ', regex=False)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(
-        'IEA/IRENA Global Renewable Energy Policies and Measures Database © OECD/IEA and IRENA, [November 2020]', '',
-        regex=False)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(source:.+?\)', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(http:.+?\)', ' ', regex=True)
-    # df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(Reference.+?\)', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'\(.+?\)', ' ', regex=True)
-    df["Policy_Content"] = df["Policy_Content"].str.replace(r'\[.+?\]', ' ', regex=True)
+    # Same cleaned text the topic stage reads (lowercasing does not change the word counts)
+    df = add_clean_content(df)
+    df["Policy_Content"] = df[CLEAN_CONTENT]
 
     df_iea = df[df['db_source'] == 'IEA']
     df_cp = df[df['db_source'] == 'Climate Policy']
@@ -0,0 +1,271 @@
+import json
+import os
+import shutil
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from bm25_dedup import PARAM_K1, PARAM_B, EPSILON, bm25_idf, bm25_weights
+from corpus_store import content_hash
+
+# Persistent BM25 dedup index for the database updates, under .reference_cache/dedup_index/<name>/<generation>/:
+#   state.json   record keys, content hashes, block keys, vocabulary, size and average length of the IDF snapshot
+#   counts.npz   records x vocab term counts (CSR); retired records keep their row
+#   active.npy   records still in the database
+#   clusters.npy cluster id per record (the lowest position that ever joined the cluster)
+#   neighbours.npy, neighbour_scores.npy   the two best scoring active records of the block per record
+#   idf.npy      IDF snapshot used for scoring
+# An update only scores the new or changed records against the active records of their blocks, and merges the
+# pairs above the threshold into the stored clusters. The other records keep their stored neighbours, only taking
+# the new records of their block into account; records whose block lost a record are rescored. The IDF snapshot
+# is refreshed only once the corpus drifts more than IDF_DRIFT from it, so old records never need rescoring for
+# small weekly batches. The index is tied to the tokenizer its documents came from; another one starts it afresh.
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(CODE_DIR, ".reference_cache", "dedup_index")
+CURRENT_FILE = "CURRENT"
+IDF_DRIFT = 0.05
+
+NEW = "new"
+MERGED = "merged"
+
+
+def record_key(values):
+    # Key of a record across releases, e.g. (ISO_code, Year, Jurisdiction_standard, Policy, db_source)
+    return "\t".join(str(value) for value in values)
+
+
+class DedupIndex:
+    def __init__(self, name, tokenizer="", path=INDEX_DIR):
+        self.path = os.path.join(path, name)
+        self.tokenizer = tokenizer
+        self.keys, self.hashes, self.blocks, self.vocab = [], [], [], []
+        self.counts = sparse.csr_matrix((0, 0))
+        self.active = np.zeros(0, bool)
+        self.clusters = np.zeros(0, np.int64)
+        self.neighbours = np.full((0, 2), -1, np.int64)
+        self.neighbour_scores = np.full((0, 2), -np.inf)
+        # Set when the stored neighbours can't be trusted (an index saved without them)
+        self.stale_neighbours = False
+        self.idf = np.zeros(0)
+        self.avgdl = 0.0
+        self.corpus_size = 0
+        self.generation = 0
+
+        current_file = os.path.join(self.path, CURRENT_FILE)
+        if os.path.exists(current_file):
+            with open(current_file, "r", encoding="utf8") as f:
+                self.generation = int(f.read().strip())
+            self._load(os.path.join(self.path, str(self.generation)))
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def _load(self, path):
+        with open(os.path.join(path, "state.json"), "r", encoding="utf8") as f:
+            state = json.load(f)
+        if state.get("tokenizer", "") != self.tokenizer:
+            print("Dedup index {} was built with another tokenizer, starting afresh".format(self.path))
+            return
+        self.keys, self.hashes, self.blocks = state["keys"], state["hashes"], state["blocks"]
+        self.vocab, self.avgdl, self.corpus_size = state["vocab"], state["avgdl"], state["corpus_size"]
+        self.counts = sparse.load_npz(os.path.join(path, "counts.npz")).tocsr()
+        self.active = np.load(os.path.join(path, "active.npy"))
+        self.clusters = np.load(os.path.join(path, "clusters.npy"))
+        self.idf = np.load(os.path.join(path, "idf.npy"))
+        if os.path.exists(os.path.join(path, "neighbours.npy")):
+            self.neighbours = np.load(os.path.join(path, "neighbours.npy"))
+            self.neighbour_scores = np.load(os.path.join(path, "neighbour_scores.npy"))
+        else:
+            self.neighbours = np.full((len(self.keys), 2), -1, np.int64)
+            self.neighbour_scores = np.full((len(self.keys), 2), -np.inf)
+            self.stale_neighbours = True
+
+    def save(self):
+        # Written as the next generation, then CURRENT is switched over to it
+        generation = self.generation + 1
+        build_path = os.path.join(self.path, str(generation))
+        tmp_path = "{}.{}.tmp".format(build_path, os.getpid())
+        os.makedirs(tmp_path, exist_ok=True)
+        with open(os.path.join(tmp_path, "state.json"), "w", encoding="utf8") as f:
+            json.dump({"tokenizer": self.tokenizer, "keys": self.keys, "hashes": self.hashes, "blocks": self.blocks,
+                       "vocab": self.vocab, "avgdl": self.avgdl, "corpus_size": self.corpus_size}, f,
+                      ensure_ascii=False)
+        sparse.save_npz(os.path.join(tmp_path, "counts.npz"), self.counts)
+        np.save(os.path.join(tmp_path, "active.npy"), self.active)
+        np.save(os.path.join(tmp_path, "clusters.npy"), self.clusters)
+        np.save(os.path.join(tmp_path, "neighbours.npy"), self.neighbours)
+        np.save(os.path.join(tmp_path, "neighbour_scores.npy"), self.neighbour_scores)
+        np.save(os.path.join(tmp_path, "idf.npy"), self.idf)
+        shutil.rmtree(build_path, ignore_errors=True)
+        os.replace(tmp_path, build_path)
+
+        tmp_file = os.path.join(self.path, "{}.{}.tmp".format(CURRENT_FILE, os.getpid()))
+        with open(tmp_file, "w", encoding="utf8") as f:
+            f.write(str(generation))
+        os.replace(tmp_file, os.path.join(self.path, CURRENT_FILE))
+        shutil.rmtree(os.path.join(self.path, str(self.generation)), ignore_errors=True)
+        self.generation = generation
+
+    def _append(self, keys, hashes, blocks, documents):
+        token_ids = {token: i for i, token in enumerate(self.vocab)}
+        ids = [token_ids.setdefault(word, len(token_ids)) for document in documents for word in document]
+        self.vocab = list(token_ids)
+        indptr = np.zeros(len(documents) + 1, np.int64)
+        np.cumsum([len(document) for document in documents], out=indptr[1:])
+        added = sparse.csr_matrix((np.ones(len(ids)), ids, indptr), shape=(len(documents), len(token_ids)))
+        added.sum_duplicates()
+        counts = self.counts.copy()
+        counts.resize((counts.shape[0], len(token_ids)))
+        self.counts = sparse.vstack([counts, added], format="csr")
+
+        start = len(self.keys)
+        self.keys += keys
+        self.hashes += hashes
+        self.blocks += blocks
+        self.active = np.concatenate([self.active, np.ones(len(keys), bool)])
+        self.clusters = np.concatenate([self.clusters, np.arange(start, start + len(keys))])
+        self.neighbours = np.concatenate([self.neighbours, np.full((len(keys), 2), -1, np.int64)])
+        self.neighbour_scores = np.concatenate([self.neighbour_scores, np.full((len(keys), 2), -np.inf)])
+        return np.arange(start, start + len(keys))
+
+    def _refresh_idf(self, epsilon=EPSILON):
+        # Exact statistics of the active records; the snapshot only moves once they drift past IDF_DRIFT.
+        # True when it moved, which invalidates every stored score.
+        counts = self.counts[self.active]
+        idf, _ = bm25_idf(np.bincount(counts.indices, minlength=counts.shape[1]), counts.shape[0], epsilon)
+        avgdl = counts.sum() / max(counts.shape[0], 1)
+        known = len(self.idf)
+        if known:
+            # Weekly batches move single words' IDF a little; the snapshot follows once the corpus as a whole has
+            # grown or shrunk, or its documents' length changed, by more than IDF_DRIFT
+            drift = max(abs(counts.shape[0] - self.corpus_size) / self.corpus_size, abs(avgdl - self.avgdl) / avgdl)
+            if drift <= IDF_DRIFT:
+                # Words first seen in this batch still need an IDF
+                self.idf = np.concatenate([self.idf, idf[known:]])
+                return False
+            print("IDF drift {:.4f}, snapshot refreshed".format(drift))
+        self.idf, self.avgdl, self.corpus_size = idf, avgdl, counts.shape[0]
+        return True
+
+    def _set_neighbours(self, queries, others, scores):
+        # Best two of the block records others for each query (scores: queries x others), the query itself excluded
+        scores = np.where(others[None, :] == queries[:, None], -np.inf, scores)
+        self._keep_best(queries, np.broadcast_to(others, scores.shape), scores)
+
+    def _merge_neighbours(self, queries, docs, scores):
+        # The stored neighbours of queries, challenged by docs (scores: queries x docs)
+        self._keep_best(queries, np.hstack([self.neighbours[queries], np.broadcast_to(docs, scores.shape)]),
+                        np.hstack([self.neighbour_scores[queries], scores]))
+
+    def _keep_best(self, queries, candidates, scores):
+        candidates = np.hstack([candidates, np.full((len(queries), 2), -1, np.int64)])
+        scores = np.hstack([scores, np.full((len(queries), 2), -np.inf)])
+        best = np.argsort(-scores, axis=1, kind="stable")[:, :2]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        self.neighbours[queries] = np.where(best_scores > -np.inf, np.take_along_axis(candidates, best, axis=1), -1)
+        self.neighbour_scores[queries] = best_scores
+
+    def _score(self, added, dirty, threshold, k1, b):
+        # Added and dirty records are scored against the active records of their block and get new neighbours;
+        # the block's other records score the added ones only, against their stored neighbours. Returns the pairs
+        # above threshold (either direction) between each added record and its block.
+        members = {}
+        for i in np.flatnonzero(self.active):
+            members.setdefault(self.blocks[i], []).append(i)
+        by_block = {}
+        for i in added:
+            by_block.setdefault(self.blocks[i], ([], []))[0].append(i)
+        for i in dirty:
+            by_block.setdefault(self.blocks[i], ([], []))[1].append(i)
+
+        firsts, seconds = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)]
+        for block, (new, old) in by_block.items():
+            others = np.array(members[block], np.int64)
+            queries = np.array(new + old, np.int64)
+            weights = bm25_weights(self.counts[others], self.idf, self.avgdl, k1, b)
+            scores = (self.counts[queries] @ weights.T).toarray()
+            self._set_neighbours(queries, others, scores)
+            if not new or len(others) < 2:
+                continue
+
+            # Block records as queries for the added documents: from scores where they were scored already
+            new = np.array(new, np.int64)
+            new_columns = np.searchsorted(others, new)
+            back = np.zeros((len(others), len(new)))
+            back[np.searchsorted(others, queries)] = scores[:, new_columns]
+            clean = np.flatnonzero(~np.isin(others, queries))
+            if len(clean):
+                back[clean] = (self.counts[others[clean]] @ weights[new_columns].T).toarray()
+                self._merge_neighbours(others[clean], new, back[clean])
+
+            both = np.maximum(scores[:len(new)], back.T)
+            rows, cols = np.nonzero(both > threshold)
+            other = new[rows] != others[cols]
+            firsts.append(new[rows[other]])
+            seconds.append(others[cols[other]])
+        return np.concatenate(firsts), np.concatenate(seconds)
+
+    def update(self, keys, blocks, documents, threshold, k1=PARAM_K1, b=PARAM_B):
+        # Bring the index in line with the given records (unique key, block key, token list) and return, per record:
+        # its cluster id; its status, NEW for a cluster of new records only, MERGED where new records joined an
+        # earlier cluster or linked several of them, "" otherwise; the positions of its two best scoring block
+        # records (-1 for none) and their scores. Only new or changed records, and the records of blocks that lost
+        # one, are scored.
+        hashes = [content_hash(" ".join(document)) for document in documents]
+        positions = {self.keys[i]: i for i in np.flatnonzero(self.active)}
+        rows = np.full(len(keys), -1, np.int64)
+        for i, (key, digest) in enumerate(zip(keys, hashes)):
+            j = positions.get(key)
+            if j is not None and self.hashes[j] == digest:
+                rows[i] = j
+        todo = np.flatnonzero(rows < 0)
+
+        # Records gone from the database (or changed) are retired; their rows stay so cluster ids keep pointing
+        # somewhere
+        retired = np.setdiff1d(np.array(list(positions.values()), np.int64), rows[rows >= 0])
+        self.active[retired] = False
+        prior = np.flatnonzero(self.active)
+        previous_clusters = self.clusters.copy()
+        added = self._append([keys[i] for i in todo], [hashes[i] for i in todo], [blocks[i] for i in todo],
+                             [documents[i] for i in todo])
+        rows[todo] = added
+        refreshed = self._refresh_idf()
+
+        # Stored neighbours hold unless their scores moved with the IDF snapshot or their block lost a record
+        kept = np.setdiff1d(np.flatnonzero(self.active), added)
+        if refreshed or self.stale_neighbours:
+            dirty = kept
+        else:
+            shrunk = {self.blocks[i] for i in retired}
+            dirty = np.array([i for i in kept if self.blocks[i] in shrunk], np.int64)
+        self.stale_neighbours = False
+
+        # Merge: every record stays linked to its previous cluster, plus the new pairs
+        first, second = self._score(added, dirty, threshold, k1, b)
+        n = len(self.keys)
+        first = np.concatenate([np.arange(n), first])
+        second = np.concatenate([self.clusters, second])
+        graph = sparse.csr_matrix((np.ones(len(first)), (first, second)), shape=(n, n))
+        labels = connected_components(graph, directed=True, connection="weak")[1]
+        lowest = np.full(labels.max() + 1, n, np.int64)
+        np.minimum.at(lowest, labels, np.arange(n))
+        self.clusters = lowest[labels]
+
+        has_prior = np.bincount(labels[prior], minlength=len(lowest)) > 0
+        has_added = np.bincount(labels[added], minlength=len(lowest)) > 0
+        prior_links = np.unique(np.stack([labels[prior], previous_clusters[prior]]), axis=1)
+        several = np.bincount(prior_links[0], minlength=len(lowest)) > 1
+        status = np.full(len(lowest), "", dtype=object)
+        status[has_added & ~has_prior] = NEW
+        status[(has_added & has_prior) | several] = MERGED
+
+        # Neighbours as positions in the given records
+        positions = np.full(n, -1, np.int64)
+        positions[rows] = np.arange(len(keys))
+        neighbours = self.neighbours[rows]
+        neighbours = np.where(neighbours >= 0, positions[neighbours], -1)
+
+        print("Dedup index: {} records, {} kept, {} new or changed, {} rescored, {} retired, {} new clusters, "
+              "{} merged".format(len(keys), len(keys) - len(todo), len(todo), len(dirty), len(retired),
+                                 int((status == NEW).sum()), int((status == MERGED).sum())))
+        return self.clusters[rows], status[labels[rows]], neighbours, self.neighbour_scores[rows]
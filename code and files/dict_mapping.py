@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Dictionary mapping of the sector / instrument / objective process stages (iea_, cp_, lse_ *_process.py).
+# A separated source field (Sectors, Type, Topics, ...) is exploded into one (row, item) pair per item, the items
+# go through the JSON dictionary as one vectorized lookup, and the mapped values are aggregated back per row with a
+# groupby. Rows are positions in the DataFrame; every output has one ";"-joined string per row, "" when nothing
+# mapped, with values in order of first appearance.
+#   {item: [value, subvalue]}                          sector / objective dictionaries
+#   {item: ["No", instrument, sector instrument]}      instrument dictionaries, sector independent
+#   {item: ["Sector", instrument, {sector: sector instrument}]}   sector dependent
+
+ROW = "row"
+ITEM = "item"
+VALUE = "value"
+MULTI_SECTOR = "Multi-sector"
+
+
+def explode_field(series, sep=";", strip=True):
+    # (row, item) pairs of a separated text column; sep is a character or a regex like "[;,]".
+    # Items are stripped unless strip is False; empty ones are dropped.
+    items = pd.Series(series.fillna("").astype(str).values).str.split(sep)
+    pairs = pd.DataFrame({ROW: np.arange(len(items)), ITEM: items}).explode(ITEM, ignore_index=True)
+    if strip:
+        pairs[ITEM] = pairs[ITEM].str.strip()
+    return pairs[pairs[ITEM].notna() & (pairs[ITEM] != "")]
+
+
+def check_keys(keys, known, strict=True):
+    # Keys missing from the dictionary raise a KeyError, or with strict=False are printed and skipped
+    missing = pd.unique(keys[~keys.isin(known)])
+    if len(missing):
+        if strict:
+            raise KeyError(missing[0])
+        for key in missing:
+            print(repr(key))
+    return keys.isin(known)
+
+
+def join_values(rows, values, n):
+    # ";"-joined distinct values per row for rows 0..n-1; a value can itself hold several ";"-separated ones
+    pairs = pd.DataFrame({ROW: np.asarray(rows), VALUE: pd.Series(values, dtype=object).str.split(";").values})
+    pairs = pairs.explode(VALUE)
+    pairs = pairs[pairs[VALUE].notna() & (pairs[VALUE] != "")].drop_duplicates()
+    joined = pairs.groupby(ROW, sort=False)[VALUE].agg(";".join)
+    return joined.reindex(np.arange(n), fill_value="").tolist()
+
+
+def lookup_values(items, map_dict, strict=True):
+    # (row, value, subvalue) of {item: [value, subvalue]}; a subvalue only counts along with its value
+    known = check_keys(items[ITEM], map_dict.keys(), strict)
+    items = items[known]
+    values = items[ITEM].map({key: mapped[0] for key, mapped in map_dict.items()})
+    subvalues = items[ITEM].map({key: mapped[1] for key, mapped in map_dict.items()})
+    mapped = pd.DataFrame({ROW: items[ROW].values, VALUE: values.values, "subvalue": subvalues.values})
+    return mapped[mapped[VALUE].astype(bool)]
+
+
+def map_field(series, map_dict, sep=";", strict=True, multi_sector=False, extra=None):
+    # (values, subvalues) per row of a sector / objective field. multi_sector adds "Multi-sector" to rows mapped
+    # to more than one distinct value. extra: further (row, value, subvalue) rows, e.g. from another column.
+    mapped = lookup_values(explode_field(series, sep), map_dict, strict)
+    if extra is not None:
+        mapped = pd.concat([mapped, extra], ignore_index=True)
+    rows, values = mapped[ROW].values, mapped[VALUE].values
+    if multi_sector:
+        distinct = mapped.drop_duplicates([ROW, VALUE])[ROW]
+        several = distinct[distinct.duplicated()].unique()
+        rows = np.concatenate([rows, several])
+        values = np.concatenate([values, np.full(len(several), MULTI_SECTOR, dtype=object)])
+    return join_values(rows, values, len(series)), join_values(mapped[ROW].values, mapped["subvalue"].values,
+                                                               len(series))
+
+
+def map_instrument_field(series, sectors, map_dict, sep=";", strict=True):
+    # (Instrument, Sector-Instrument) per row. Sector dependent items take the sector instrument of every sector
+    # of the row (sectors: the ";"-joined sector column).
+    items = explode_field(series, sep)
+    items = items[check_keys(items[ITEM], map_dict.keys(), strict)]
+    kinds = items[ITEM].map({key: mapped[0] for key, mapped in map_dict.items()})
+    items = items[kinds.isin(["No", "Sector"])]
+    instruments = items[ITEM].map({key: mapped[1] for key, mapped in map_dict.items()})
+
+    plain = items[kinds.loc[items.index] == "No"]
+    plain_values = plain[ITEM].map({key: mapped[2] for key, mapped in map_dict.items() if mapped[0] == "No"})
+
+    # Sector dependent items x the row's sectors, looked up in one (item, sector) table
+    by_sector = items[kinds.loc[items.index] == "Sector"].merge(explode_field(sectors, ";", strip=False)
+                                                                .rename(columns={ITEM: "sector"}), on=ROW)
+    table = pd.DataFrame([(key, sector, value) for key, mapped in map_dict.items() if mapped[0] == "Sector"
+                          for sector, value in mapped[2].items()], columns=[ITEM, "sector", VALUE])
+    by_sector = by_sector.merge(table, on=[ITEM, "sector"], how="left", indicator=True)
+    missing = by_sector["_merge"] == "left_only"
+    if missing.any():
+        # Sectors the dictionary has no column for
+        check_keys(by_sector.loc[missing, "sector"], [], strict)
+    by_sector = by_sector[~missing]
+
+    n = len(series)
+    instrument = join_values(items[ROW].values, instruments.values, n)
+    sector_instrument = join_values(np.concatenate([plain[ROW].values, by_sector[ROW].values]),
+                                    np.concatenate([plain_values.values, by_sector[VALUE].values]), n)
+    return instrument, sector_instrument
@@ -0,0 +1,259 @@
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from corpus_store import content_hash
+from bm25_calibration import optimal_rank
+from text_normalize import clean_content
+
+# Optional semantic dedup: ClimateBERT sentence vectors of title + leading content, searched with a CPU ANN index
+# that persists under .reference_cache/ann/<name>/. It finds paraphrased duplicates (translated ECOLEX/MEE text
+# against IEA/CP English titles) that the lexical BM25 threshold misses; its pairs go into the same duplicate
+# clusters as the BM25 pairs. Pairs come either from the ANN index over all vectors (similar_pairs) or from exact
+# cosine within each block (block_similar_pairs), picked with --embedding in the dedup scripts.
+# Mean-pooled vectors are anisotropic (unrelated titles can score close to 1), so the cosine cutoff is calibrated
+# on the hand-labelled duplicates of policy_db_complete.xlsx, as bm25_f1_roc_plot does for the BM25 cutoff.
+# torch/transformers are only imported when something has to be embedded; hnswlib is used when installed,
+# otherwise a numpy IVF index (k-means lists, nprobe of them scanned per query).
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_DIR = os.path.join(CODE_DIR, ".reference_cache", "embeddings")
+ANN_DIR = os.path.join(CODE_DIR, ".reference_cache", "ann")
+ENCODER_PATH = "/home/zhhuang/climate_policy_paper/models/distilroberta-base-climate-f"
+# raw_data: the records; dup: the labelled duplicate pairs (A, dup_index)
+LABELLED_DUPLICATES = "/home/zhhuang/climate_policy_paper/code/files/policy_db_complete.xlsx"
+
+# Title plus this many characters of cleaned content are embedded
+CONTENT_CHARS = 300
+MAX_LENGTH = 128
+BATCH_SIZE = 32
+# Cosine similarity from which two policies count as duplicates when no calibrated cutoff is passed
+EMBEDDING_SIMILARITY = 0.98
+TOP_K = 10
+NPROBE = 8
+
+
+def dedup_texts(titles, contents, content_chars=CONTENT_CHARS):
+    return ["{}. {}".format(title, content[:content_chars] if isinstance(content, str) else "").strip(" .")
+            for title, content in zip(titles, contents)]
+
+
+def embed_texts(texts, model_path=ENCODER_PATH, batch_size=BATCH_SIZE, max_length=MAX_LENGTH):
+    # L2-normalized mean-pooled last hidden states, in input order; texts are batched by length
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModel.from_pretrained(model_path).to(device).eval()
+    vectors = np.zeros((len(texts), model.config.hidden_size), np.float32)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    with torch.no_grad():
+        for start in tqdm(range(0, len(order), batch_size), desc='Embedding', ncols=150):
+            batch = order[start:start + batch_size]
+            encoded = tokenizer([texts[i] for i in batch], padding=True, truncation=True, max_length=max_length,
+                                return_tensors='pt').to(device)
+            hidden = model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            vectors[batch] = torch.nn.functional.normalize(pooled, dim=1).cpu().numpy()
+    return vectors
+
+
+def cached_embeddings(name, texts, model_path=ENCODER_PATH, path=EMBEDDING_DIR):
+    # Vectors of texts; only texts the previous run of name didn't embed go through the encoder
+    store = os.path.join(path, name)
+    tag = "{}\n{}\n{}".format(model_path, MAX_LENGTH, CONTENT_CHARS)
+    hashes = [content_hash(text) for text in texts]
+    known = {}
+    if os.path.exists(os.path.join(store, "hashes.json")):
+        with open(os.path.join(store, "hashes.json"), "r", encoding="utf8") as f:
+            stored = json.load(f)
+        if stored["tag"] == tag:
+            vectors = np.load(os.path.join(store, "vectors.npy"), mmap_mode="r")
+            known = {digest: vectors[i] for i, digest in enumerate(stored["hashes"])}
+
+    missing = list(dict.fromkeys(digest for digest in hashes if digest not in known))
+    print("{}: {} texts, {} embedded before, {} to embed".format(name, len(texts), len(hashes) - len(missing),
+                                                              len(missing)))
+    if missing:
+        first_text = {}
+        for text, digest in zip(texts, hashes):
+            first_text.setdefault(digest, text)
+        for digest, vector in zip(missing, embed_texts([first_text[digest] for digest in missing], model_path)):
+            known[digest] = vector
+    vectors = np.array([known[digest] for digest in hashes], np.float32)
+
+    tmp_path = "{}.{}.tmp".format(store, os.getpid())
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, "vectors.npy"), vectors)
+    with open(os.path.join(tmp_path, "hashes.json"), "w", encoding="utf8") as f:
+        json.dump({"tag": tag, "hashes": hashes}, f)
+    shutil.rmtree(store, ignore_errors=True)
+    os.replace(tmp_path, store)
+    return vectors
+
+
+class IVFIndex:
+    # Inverted file over spherical k-means lists; inner product search on normalized vectors
+    def __init__(self, centroids, lists, offsets, vectors):
+        self.centroids = centroids
+        self.lists = lists
+        self.offsets = offsets
+        self.vectors = vectors
+
+    @classmethod
+    def build(cls, vectors, nlist=None, n_iter=10, seed=0):
+        n = len(vectors)
+        nlist = min(n, nlist or max(1, int(np.sqrt(n))))
+        rng = np.random.RandomState(seed)
+        centroids = vectors[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = cls._nearest(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            norms = np.linalg.norm(sums, axis=1)
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        assign = cls._nearest(vectors, centroids)
+        lists = np.argsort(assign, kind="stable")
+        offsets = np.zeros(nlist + 1, np.int64)
+        np.cumsum(np.bincount(assign, minlength=nlist), out=offsets[1:])
+        return cls(centroids, lists, offsets, vectors)
+
+    @staticmethod
+    def _nearest(vectors, centroids, chunk=4096):
+        return np.concatenate([np.argmax(vectors[i:i + chunk] @ centroids.T, axis=1)
+                               for i in range(0, len(vectors), chunk)])
+
+    def search(self, queries, k=TOP_K, nprobe=NPROBE):
+        # (ids, similarities), queries x k, best first; -1 pads queries with fewer candidates
+        ids = np.full((len(queries), k), -1, np.int64)
+        sims = np.full((len(queries), k), -np.inf, np.float32)
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+        for q, probe in enumerate(probes):
+            candidates = np.concatenate([self.lists[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+            scores = self.vectors[candidates] @ queries[q]
+            best = np.argsort(-scores, kind="stable")[:k]
+            ids[q, :len(best)] = candidates[best]
+            sims[q, :len(best)] = scores[best]
+        return ids, sims
+
+    def save(self, path):
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(path, "lists.npy"), self.lists)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+
+    @classmethod
+    def load(cls, path, vectors):
+        return cls(np.load(os.path.join(path, "centroids.npy")), np.load(os.path.join(path, "lists.npy")),
+                   np.load(os.path.join(path, "offsets.npy")), vectors)
+
+
+class HNSWIndex:
+    # hnswlib graph with inner product space
+    def __init__(self, index):
+        self.index = index
+
+    @classmethod
+    def build(cls, vectors, m=16, ef_construction=200, seed=0):
+        import hnswlib
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.init_index(max_elements=len(vectors), ef_construction=ef_construction, M=m, random_seed=seed)
+        index.add_items(vectors, np.arange(len(vectors)))
+        return cls(index)
+
+    def search(self, queries, k=TOP_K, nprobe=NPROBE):
+        self.index.set_ef(max(k * nprobe, 50))
+        ids, distances = self.index.knn_query(queries, k=min(k, self.index.get_current_count()))
+        return ids.astype(np.int64), (1 - distances).astype(np.float32)
+
+    def save(self, path):
+        self.index.save_index(os.path.join(path, "hnsw.bin"))
+
+    @classmethod
+    def load(cls, path, vectors):
+        import hnswlib
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.load_index(os.path.join(path, "hnsw.bin"), max_elements=len(vectors))
+        return cls(index)
+
+
+def ann_index(name, vectors, kind=None, path=ANN_DIR):
+    # ANN index over vectors, loaded from disk when the same vectors were indexed before
+    kind = kind or ("hnsw" if importlib.util.find_spec("hnswlib") else "ivf")
+    index_class = HNSWIndex if kind == "hnsw" else IVFIndex
+    key = hashlib.sha1(np.ascontiguousarray(vectors).tobytes()).hexdigest()
+    index_path = os.path.join(path, name, "{}-{}".format(kind, key))
+    if os.path.isdir(index_path):
+        print("{}: {} index of {} vectors, unchanged".format(name, kind, len(vectors)))
+        return index_class.load(index_path, vectors)
+
+    index = index_class.build(vectors)
+    tmp_path = "{}.{}.tmp".format(index_path, os.getpid())
+    os.makedirs(tmp_path, exist_ok=True)
+    index.save(tmp_path)
+    # Indexes of older vectors are dropped
+    if os.path.isdir(os.path.join(path, name)):
+        for entry in os.listdir(os.path.join(path, name)):
+            if not entry.endswith(".tmp"):
+                shutil.rmtree(os.path.join(path, name, entry), ignore_errors=True)
+    os.replace(tmp_path, index_path)
+    print("{}: {} index of {} vectors built".format(name, kind, len(vectors)))
+    return index
+
+
+def block_similar_pairs(vectors, blocks, threshold=EMBEDDING_SIMILARITY):
+    # (first, second) pairs within each block with cosine similarity >= threshold, exact
+    firsts, seconds = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)]
+    for index in blocks:
+        if len(index) > 1:
+            index = np.asarray(index)
+            rows, cols = np.nonzero(np.triu(vectors[index] @ vectors[index].T, 1) >= threshold)
+            firsts.append(index[rows])
+            seconds.append(index[cols])
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def similar_pairs(index, vectors, threshold=EMBEDDING_SIMILARITY, k=TOP_K, nprobe=NPROBE):
+    # (first, second) pairs, first < second, among each vector's k approximate nearest neighbours
+    ids, sims = index.search(vectors, k, nprobe)
+    first = np.repeat(np.arange(len(vectors)), ids.shape[1])
+    second = ids.ravel()
+    keep = (sims.ravel() >= threshold) & (second >= 0) & (first != second)
+    codes = np.unique(np.minimum(first[keep], second[keep]) * len(vectors) + np.maximum(first[keep], second[keep]))
+    print("ANN: {} pairs with similarity >= {}".format(len(codes), threshold))
+    return codes // len(vectors), codes % len(vectors)
+
+
+def best_block_similarity(vectors, blocks):
+    # Each vector's highest cosine similarity to another vector of its block; -1 for vectors alone in their block
+    best = np.full(len(vectors), -1.0)
+    for index in blocks:
+        if len(index) > 1:
+            index = np.asarray(index)
+            sims = vectors[index] @ vectors[index].T
+            np.fill_diagonal(sims, -np.inf)
+            best[index] = sims.max(axis=1)
+    return best
+
+
+def calibrated_similarity(block_columns, path=LABELLED_DUPLICATES):
+    # Cosine cutoff with the best macro F1 over the labelled records: records are ranked by their best in-block
+    # similarity and the top N called duplicates, as the BM25 cutoff is picked on bm25_score_first
+    records = pd.read_excel(path, sheet_name="raw_data")
+    dup = pd.read_excel(path, sheet_name="dup")
+    dup = dup[dup["group_policy_number"] > 1]
+    labels = records["A"].isin(set(dup["A"].to_list() + dup["dup_index"].to_list())).astype(int).to_numpy()
+
+    texts = dedup_texts(records["Policy"].tolist(), records["Policy_Content"].map(clean_content).tolist())
+    vectors = cached_embeddings("embedding_calibration", texts)
+    blocks = list(records.groupby(block_columns).indices.values())
+    rank, threshold, curve = optimal_rank(best_block_similarity(vectors, blocks), labels)
+    print("Embedding cutoff: top {} of {} labelled records, cosine {:.4f}, macro f1 {:.4f}".format(
+        rank, len(records), threshold, curve["macro_f1"][rank - 1]))
+    return threshold
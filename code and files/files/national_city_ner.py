@@ -1,35 +1,24 @@
+import argparse
 import pandas as pd
-import spacy
-import geonamescache
-from tqdm import tqdm
 import shutil
+import os
+import sys
 
-
-def gen_dict_extract(var, key):
-    if isinstance(var, dict):
-        for k, v in var.items():
-            if k == key:
-                yield v
-            if isinstance(v, (dict, list)):
-                yield from gen_dict_extract(v, key)
-    elif isinstance(var, list):
-        for d in var:
-            yield from gen_dict_extract(d, key)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gazetteer import load_gazetteer
+from ner_pipeline import BATCH_SIZE, N_PROCESS
+from scope_resolver import ScopeResolver
 
 
 if __name__ == '__main__':
-    gc = geonamescache.GeonamesCache()
-
-    # gets nested dictionary for countries
-    countries = gc.get_countries()
-
-    # gets nested dictionary for cities
-    cities = gc.get_cities()
-
-    cities = [*gen_dict_extract(cities, 'name')]
-    countries = [*gen_dict_extract(countries, 'name')]
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', default=BATCH_SIZE, type=int)
+    parser.add_argument('--n_process', default=N_PROCESS, type=int)
+    parser.add_argument('--mode', default='cascade', type=str)  # ['cascade', 'transformer']
+    args = parser.parse_args()
 
-    nlp = spacy.load("en_core_web_trf")
+    # City/country hash sets compiled from geonamescache
+    gazetteer = load_gazetteer()
 
     df = pd.read_excel("/home/zhhuang/climate_policy_paper/code/data/ALL_POLICIES_EN.xlsx")
     df['Policy_Content'].fillna('', inplace=True)
@@ -47,55 +36,18 @@ if __name__ == '__main__':
     df["Scope"] = df["Scope"].map(scope_map)
     scope = df["Scope"].to_list()
 
-    bar = tqdm(range(len(df)), desc='National City NER', ncols=150)
-    for _, index_row in zip(bar, df.iterrows()):
-        index, row = index_row
-        if row["Scope"] in ["National", 'Unknown']:
-            doc_title = nlp(row["Policy"])
-            doc_content = nlp(row['Policy_Content'])
-
-            judge = True
-            citi = []
-            country = []
-            for ent in doc_title.ents:
-                if ent.label_ == 'GPE':
-                    if ent.text in countries:
-                        country.append(ent.text)
-                    elif ent.text in cities:
-                        citi.append(ent.text)
-
-            if len(set(citi)) == 1:
-                scope[index] = "SubNational"
-                print("SubNational: ", row["Policy"])
-                judge = False
-            elif len(set(citi)) > 1:
-                scope[index] = "Subnational region"
-                print("Subnational region: ", row["Policy"])
-                judge = False
-            elif len(set(country)) > 1:
-                scope[index] = "International"
-                print("International: ", row["Policy"])
-                judge = False
-
-            if judge:
-                for ent in doc_content.ents:
-                    if ent.label_ == 'GPE':
-                        if ent.text in cities:
-                            citi.append(ent.text)
-                        elif ent.text in countries:
-                            country.append(ent.text)
-                if len(set(citi)) == 1:
-                    scope[index] = "SubNational"
-                    print("SubNational: ", row["Policy"])
-                    judge = False
-                elif len(set(citi)) > 1:
-                    scope[index] = "Subnational region"
-                    print("Subnational region: ", row["Policy"])
-                    judge = False
-                elif len(set(country)) > 1:
-                    scope[index] = "International"
-                    print("International: ", row["Policy"])
-                    judge = False
+    # Titles first; content is only parsed for rows the title left undecided.
+    # Gazetteer/fast-model tiers settle the clear rows, en_core_web_trf only sees the ambiguous ones.
+    candidates = [index for index, value in enumerate(scope) if value in ["National", 'Unknown']]
+    titles = df["Policy"].to_list()
+    contents = df["Policy_Content"].to_list()
+    resolver = ScopeResolver(gazetteer, cascade=args.mode == 'cascade', batch_size=args.batch_size,
+                             n_process=args.n_process)
+    judges = resolver.resolve([titles[index] for index in candidates], [contents[index] for index in candidates])
+    for index, judge in zip(candidates, judges):
+        if judge:
+            scope[index] = judge
+            print("{}: ".format(judge), titles[index])
 
     df["Scope"] = scope
     with pd.ExcelWriter("ALL_POLICIES_EN.xlsx", engine='xlsxwriter',
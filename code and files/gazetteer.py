@@ -0,0 +1,127 @@
+import os
+import re
+import geonamescache
+from reference_cache import cached_reference
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# City/country gazetteer compiled once from geonamescache and cached under .reference_cache/gazetteer.pkl.
+# Replaces the `ent.text in cities` list scans in the NER and BM25 stages.
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+GEONAMES_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(geonamescache.__file__)), "data")
+
+CITY = "CITY"
+COUNTRY = "COUNTRY"
+
+_word_pattern = re.compile(r"\w+")
+
+
+def gen_dict_extract(var, key):
+    if isinstance(var, dict):
+        for k, v in var.items():
+            if k == key:
+                yield v
+            if isinstance(v, (dict, list)):
+                yield from gen_dict_extract(v, key)
+    elif isinstance(var, list):
+        for d in var:
+            yield from gen_dict_extract(d, key)
+
+
+def is_city_alias(name):
+    # Keep Latin-script alternate names ("Escaldes-Engordany"), drop transliterations and short codes
+    return len(name) >= 4 and name.isascii() and name[0].isupper()
+
+
+class Gazetteer:
+    def __init__(self, cities, countries, city_aliases=None):
+        self.cities = frozenset(cities)
+        self.countries = frozenset(countries)
+        # alias ==> canonical city name
+        self.city_aliases = {alias: city for alias, city in (city_aliases or {}).items()
+                             if alias not in self.cities and alias not in self.countries}
+
+        # surface form ==> (canonical name, label); countries win over cities of the same name
+        self.names = {}
+        for alias, city in self.city_aliases.items():
+            self.names[alias] = (city, CITY)
+        for city in self.cities:
+            self.names[city] = (city, CITY)
+        for country in self.countries:
+            self.names[country] = (country, COUNTRY)
+        self.max_words = max(len(_word_pattern.findall(name)) for name in self.names)
+
+        self.automaton = None
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for name, value in self.names.items():
+                self.automaton.add_word(name, (len(name),) + value)
+            self.automaton.make_automaton()
+
+    def is_city(self, text):
+        return text in self.cities
+
+    def is_country(self, text):
+        return text in self.countries
+
+    def lookup(self, text):
+        # (canonical name, CITY/COUNTRY) or None
+        return self.names.get(text)
+
+    def find_gpe(self, text):
+        # Leftmost-longest, word-aligned gazetteer matches: [(start, end, canonical name, CITY/COUNTRY)]
+        if not text:
+            return []
+        if self.automaton is not None:
+            candidates = []
+            for end, (length, name, label) in self.automaton.iter(text):
+                start, end = end - length + 1, end + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    candidates.append((start, end, name, label))
+        else:
+            candidates = []
+            words = [m.span() for m in _word_pattern.finditer(text)]
+            for i, (start, _) in enumerate(words):
+                for _, end in words[i:i + self.max_words]:
+                    value = self.names.get(text[start:end])
+                    if value is not None:
+                        candidates.append((start, end) + value)
+
+        matches = []
+        last_end = 0
+        for start, end, name, label in sorted(candidates, key=lambda x: (x[0], x[0] - x[1])):
+            if start >= last_end:
+                matches.append((start, end, name, label))
+                last_end = end
+        return matches
+
+
+def build_gazetteer(path=None):
+    gc = geonamescache.GeonamesCache()
+    cities = gc.get_cities()
+    countries = gc.get_countries()
+
+    city_aliases = {}
+    for city in cities.values():
+        for alias in city.get("alternatenames", []):
+            if is_city_alias(alias):
+                city_aliases.setdefault(alias, city["name"])
+
+    return Gazetteer([*gen_dict_extract(cities, 'name')], [*gen_dict_extract(countries, 'name')], city_aliases)
+
+
+_gazetteer = None
+
+
+def load_gazetteer():
+    # Rebuilt only when the geonamescache data files change
+    global _gazetteer
+    if _gazetteer is None:
+        sources = [os.path.join(GEONAMES_DATA_DIR, "cities15000.json"),
+                   os.path.join(GEONAMES_DATA_DIR, "countries.json")]
+        _gazetteer = cached_reference("gazetteer", sources, build_gazetteer, CODE_DIR)
+    return _gazetteer
@@ -0,0 +1,85 @@
+import re
+
+# Keyword matching for the law / soft law classification (cp_iea_lse_law_process.py).
+# The ';'-separated lists of law_soft_law_strategy_title_dict.json / _content_dict.json are compiled once per
+# category: keywords containing a space are regexes searched in the cleaned text and become one alternation per
+# category, single words have to be one of the text's " "-separated tokens and become a set. A row splits its title
+# and content once, and every category check is one set intersection plus at most one regex search.
+
+HARD_LAWS = ['Constitution', 'International Law', 'Law/Act', 'Decree/Order/Ordinance',
+             'Regulation/Directive/Decision']
+LEGISLATIVE_LAWS = ['Constitution', 'International Law', 'Law/Act']
+STEERING = "Steering Instruments"
+DECISIONAL = "Decisional Guidelines, Codes and Frameworks"
+# Soft laws looked up in the content once Steering / Decisional Guidelines didn't apply
+CONTENT_SOFT_LAWS = ["Decisional Notices and Communications", "Preparatory Instruments", "Informative Instruments",
+                     "Interpretative Communications and Notices"]
+
+# "the/this <law>" in the content, per hard law
+THIS_LAWS = [('Law/Act', re.compile(r'(?:the|this) (?:law|act|legislation) ')),
+             ('Decree/Order/Ordinance', re.compile(r'(?:the|this) (?:decree|order|ordinance) ')),
+             ('Regulation/Directive/Decision', re.compile(r'(?:the|this) (?:regulation|directive|decision) '))]
+YEAR_RANGES = [re.compile(r'(?:19|20)\d{2}\s*-\s*(?:19|20)\d{2}\s*'),
+               re.compile(r'(?:19|20)\d{2}/\d{2}\s*-\s*(?:19|20)\d{2}/\d{2}\s*')]
+
+_PUNCTUATION = str.maketrans({c: ' ' for c in "(),\"'.;-:/"})
+
+
+def clean_text(text):
+    # Lower case with ( ) , " ' . ; - : / turned into spaces
+    return text.lower().translate(_PUNCTUATION)
+
+
+def split_keywords(value):
+    return value.lower().split(';')
+
+
+class KeywordSet:
+    def __init__(self, *keyword_lists):
+        keywords = list(dict.fromkeys(keyword for keywords in keyword_lists for keyword in keywords))
+        self.words = frozenset(keyword for keyword in keywords if ' ' not in keyword)
+        phrases = [keyword for keyword in keywords if ' ' in keyword]
+        self.pattern = re.compile("|".join("(?:{})".format(phrase) for phrase in phrases)) if phrases else None
+
+    def in_words(self, words):
+        return not self.words.isdisjoint(words)
+
+    def in_text(self, text):
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+    def found(self, text, words):
+        # words: set(text.split(" "))
+        return self.in_words(words) or self.in_text(text)
+
+
+class LawKeywords:
+    def __init__(self, title_dict, content_dict):
+        self.title = {law: KeywordSet(split_keywords(value)) for law, value in title_dict.items()}
+        self.content = {law: KeywordSet(split_keywords(value)) for law, value in content_dict.items()}
+        hard_keywords = [split_keywords(content_dict[law]) for law in HARD_LAWS]
+        self.hard_content = KeywordSet(*hard_keywords)
+        self.hard_content_kyoto = KeywordSet(*hard_keywords, ['kyoto protocol'])
+        # Steering / Decisional Guidelines keywords: the content lists, and the content plus title lists
+        self.steering_decisional = KeywordSet(split_keywords(content_dict[STEERING]),
+                                              split_keywords(content_dict[DECISIONAL]))
+        self.steering_decisional_all = KeywordSet(split_keywords(content_dict[STEERING]),
+                                                  split_keywords(title_dict[STEERING]),
+                                                  split_keywords(content_dict[DECISIONAL]),
+                                                  split_keywords(title_dict[DECISIONAL]))
+
+    def title_law(self, laws, text, words):
+        # First of laws with a title keyword in text, or None
+        return next((law for law in laws if self.title[law].found(text, words)), None)
+
+    def content_law(self, laws, text, words):
+        return next((law for law in laws if self.content[law].found(text, words)), None)
+
+
+def this_law(content):
+    # Hard law referred to as "the/this <law>" in the cleaned content, or None
+    return next((law for law, pattern in THIS_LAWS if pattern.search(content)), None)
+
+
+def year_range(title):
+    # Title names a period like 2020-2030 or 2020/21-2029/30
+    return any(pattern.search(title.lower()) for pattern in YEAR_RANGES)
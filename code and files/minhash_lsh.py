@@ -0,0 +1,88 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# MinHash-LSH candidate pairs for near-duplicate policies across the (Year, ISO_code, Scope) blocks.
+# Every text becomes a set of character shingles, MinHash squeezes the set into NUM_BANDS * ROWS_PER_BAND
+# minima, and two texts become candidates when all rows of any one band agree. Texts with Jaccard similarity s
+# collide with probability 1 - (1 - s^rows)^bands, about 50% at s = (1 / bands)^(1 / rows).
+# Hashing, signatures and banding are numpy passes over all texts, so the cost grows with the corpus, not its square.
+
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+SHINGLE_SIZE = 5
+# Buckets holding more texts than this (empty or boilerplate titles) would add a quadratic number of pairs
+MAX_BUCKET = 100
+
+_PRIME = (1 << 31) - 1
+_BASE = 1000003
+# Shingles hashed per signature step
+CHUNK_SIZE = 1 << 16
+
+
+def shingle_hashes(texts, k=SHINGLE_SIZE):
+    # Rolling hash of every k-character shingle and the offset of each text's first shingle.
+    # Texts shorter than k are padded so they still get one shingle.
+    texts = [text.ljust(k) for text in texts]
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), np.uint32).astype(np.int64)
+    lengths = np.array([len(text) for text in texts], np.int64)
+    starts = np.zeros(len(texts) + 1, np.int64)
+    np.cumsum(lengths, out=starts[1:])
+
+    powers = np.array([pow(_BASE, k - 1 - j, _PRIME) for j in range(k)], np.int64)
+    windows = sliding_window_view(codes, k) if len(codes) >= k else np.zeros((0, k), np.int64)
+    hashes = (windows % _PRIME * powers % _PRIME).sum(axis=1) % _PRIME
+
+    # Windows that run into the next text are dropped
+    counts = lengths - k + 1
+    keep = np.concatenate([np.arange(start, start + count) for start, count in zip(starts[:-1], counts)]) \
+        if len(texts) else np.zeros(0, np.int64)
+    offsets = np.zeros(len(texts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return hashes[keep], offsets
+
+
+def minhash_signatures(texts, num_perm=NUM_BANDS * ROWS_PER_BAND, k=SHINGLE_SIZE, seed=0):
+    # texts x num_perm minima of (a * h + b) mod p over each text's shingle hashes h
+    hashes, offsets = shingle_hashes(texts, k)
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _PRIME, num_perm).astype(np.int64)
+    b = rng.randint(0, _PRIME, num_perm).astype(np.int64)
+
+    signatures = np.empty((len(texts), num_perm), np.int64)
+    first = 0
+    while first < len(texts):
+        # Whole texts per chunk so every reduceat segment is complete
+        last = max(first + 1, int(np.searchsorted(offsets, offsets[first] + CHUNK_SIZE, side="right")) - 1)
+        last = min(last, len(texts))
+        chunk = hashes[offsets[first]:offsets[last]]
+        permuted = (chunk[:, None] * a + b) % _PRIME
+        signatures[first:last] = np.minimum.reduceat(permuted, offsets[first:last] - offsets[first], axis=0)
+        first = last
+    return signatures
+
+
+def lsh_candidates(texts, bands=NUM_BANDS, rows=ROWS_PER_BAND, k=SHINGLE_SIZE, max_bucket=MAX_BUCKET, seed=0):
+    # (first, second) positions of the candidate pairs, first < second, each pair once
+    signatures = minhash_signatures(texts, bands * rows, k, seed)
+    n = len(texts)
+    codes = []
+    skipped = 0
+    for band in range(bands):
+        _, bucket = np.unique(signatures[:, band * rows:(band + 1) * rows], axis=0, return_inverse=True)
+        bucket = bucket.ravel()
+        order = np.argsort(bucket, kind="stable")
+        sizes = np.bincount(bucket)
+        bounds = np.zeros(len(sizes) + 1, np.int64)
+        np.cumsum(sizes, out=bounds[1:])
+        for b in np.flatnonzero(sizes > 1):
+            if sizes[b] > max_bucket:
+                skipped += 1
+                continue
+            members = order[bounds[b]:bounds[b + 1]]
+            i, j = np.triu_indices(len(members), 1)
+            codes.append(members[i] * n + members[j])
+
+    codes = np.unique(np.concatenate(codes)) if codes else np.zeros(0, np.int64)
+    print("LSH: {} texts, {} bands x {} rows, {} candidate pairs, {} oversized buckets skipped".format(
+        n, bands, rows, len(codes), skipped))
+    return codes // n, codes % n
@@ -2,6 +2,7 @@ import re
 import pandas as pd
 import numpy as np
 import os
+from text_normalize import add_clean_content
 
 
 def save(all_df, filename):
@@ -21,6 +22,8 @@ if __name__ == '__main__':
         df_all_policies_dedup = pd.read_excel(path[0], sheet_name='all_policies_dedup')
     else:
         raise IOError('The file is not exist or too many files！')
+    # Clean Policy_Content once here; the topic preprocessors reuse the column instead of re-cleaning
+    df_all_policies_dedup = add_clean_content(df_all_policies_dedup)
 
     with open("/home/zhhuang/climate_policy_paper/code/policy_db_iea_cp_cclw/Mitigation and Adaptation.txt") as f:
         adaptation_keywords = f.read().lower().split('\n')[0]
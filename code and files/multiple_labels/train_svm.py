@@ -1,17 +1,20 @@
 import argparse
 import os
+import sys
 import json
 import joblib
 import time
 import numpy as np
 import pandas as pd
 from sklearn.metrics import f1_score, classification_report
-from sklearn.feature_extraction.text import TfidfVectorizer
 from tqdm import tqdm
 from sklearn.svm import SVC
 from sklearn.decomposition import PCA
 from sklearn.multiclass import OneVsRestClassifier
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from corpus_store import tfidf_corpus, Tfidf
+
 
 def load_label2id(args):
     with open(os.path.join(args.data_dir, 'labels2ids.json'), 'r', encoding='utf8') as file:
@@ -44,19 +47,20 @@ def train(args):
     label2id = load_label2id(args)
     args.num_labels = len(label2id)
 
-    trainset = read_jsonl(args, os.path.join(args.data_dir, 'train.jsonl'), label2id)
+    train_file = os.path.join(args.data_dir, 'train.jsonl')
+    trainset = read_jsonl(args, train_file, label2id)
 
     # 特征化
-    if os.path.exists(os.path.join(args.save_dir, 'vectorizer.pkl')):
-        vectorizer = joblib.load(os.path.join(args.save_dir, 'vectorizer.pkl'))
+    # (tokens come from the corpus store, so only new or edited samples are tokenized)
+    corpus = tfidf_corpus(train_file, [f"{sample['title']} {sample['content']}" for sample in trainset])
+    if os.path.exists(os.path.join(args.save_dir, 'tfidf.pkl')):
+        vectorizer = joblib.load(os.path.join(args.save_dir, 'tfidf.pkl'))
     else:
-        vectorizer = TfidfVectorizer()
-        vectorizer.fit([f"{sample['title']} {sample['content']}" for sample in trainset])
-        joblib.dump(vectorizer, os.path.join(args.save_dir, 'vectorizer.pkl'))
+        vectorizer = Tfidf().fit(corpus)
+        joblib.dump(vectorizer, os.path.join(args.save_dir, 'tfidf.pkl'))
 
-    features = vectorizer.transform([f"{sample['title']} {sample['content']}" for sample in trainset])
-    features = features.todense()
-    features = np.asarray(features)
+    features = vectorizer.transform(corpus)
+    features = features.toarray()
 
     print('完成特征化...')
 
@@ -83,15 +87,16 @@ def test(args):
     label2id = load_label2id(args)
     args.num_labels = len(label2id)
 
-    testset = read_jsonl(args, os.path.join(args.data_dir, 'test.jsonl'), label2id)
-    vectorizer = joblib.load(os.path.join(args.save_dir, 'vectorizer.pkl'))
+    test_file = os.path.join(args.data_dir, 'test.jsonl')
+    testset = read_jsonl(args, test_file, label2id)
+    vectorizer = joblib.load(os.path.join(args.save_dir, 'tfidf.pkl'))
     pca = joblib.load(os.path.join(args.save_dir, 'pca.pkl'))
     model = joblib.load(os.path.join(args.save_dir, f'svm_{args.attribution}.pkl'))
 
     # 特征化
-    features = vectorizer.transform([f"{sample['title']} {sample['content']}" for sample in testset])
-    features = features.todense()
-    features = np.asarray(features)
+    corpus = tfidf_corpus(test_file, [f"{sample['title']} {sample['content']}" for sample in testset])
+    features = vectorizer.transform(corpus)
+    features = features.toarray()
 
     print('完成特征化...')
 
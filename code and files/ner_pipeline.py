@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from importlib import metadata
+import spacy
+from tqdm import tqdm
+
+# Batched en_core_web_trf runner shared by the NER/BM25/topic stages.
+# Texts go through nlp.pipe sorted by length so each batch is padded to similar sizes,
+# and results come back in input order.
+# Entities are cached on disk by text hash, so only unseen text is parsed; the model is not
+# even loaded when every text is already cached.
+
+NER_MODEL = "en_core_web_trf"
+# Pipes the NER passes never read; "ner" only listens to "transformer"
+UNUSED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+
+BATCH_SIZE = 64
+N_PROCESS = 1
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+NER_CACHE_FILE = os.path.join(CODE_DIR, ".reference_cache", "ner_entities.sqlite")
+# Parsed entities are written back every FLUSH_SIZE docs so an interrupted run keeps its work
+FLUSH_SIZE = 1000
+
+
+def load_ner_model(name=NER_MODEL):
+    nlp = spacy.load(name)
+    nlp.select_pipes(disable=[pipe for pipe in UNUSED_COMPONENTS if pipe in nlp.pipe_names])
+    return nlp
+
+
+def model_tag(name=NER_MODEL):
+    # Cache entries are tied to the installed model version
+    try:
+        version = metadata.version(name)
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    return "{}-{}".format(name, version)
+
+
+class EntityCache:
+    # text hash ==> [(start_char, end_char, label), ...], stored in SQLite
+    def __init__(self, path=NER_CACHE_FILE, model=NER_MODEL):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.tag = model_tag(model)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS entities (key TEXT PRIMARY KEY, ents TEXT NOT NULL)")
+        self.conn.commit()
+
+    def key(self, text):
+        return hashlib.sha1("{}\n{}".format(self.tag, text).encode("utf8")).hexdigest()
+
+    def get_many(self, texts):
+        # {text: entities} for the texts already cached
+        keys = {self.key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i:i + 500]
+            rows = self.conn.execute("SELECT key, ents FROM entities WHERE key IN ({})".format(
+                ",".join("?" * len(chunk))), chunk)
+            for key, ents in rows:
+                found[keys[key]] = [tuple(ent) for ent in json.loads(ents)]
+        return found
+
+    def put_many(self, entities):
+        # entities: {text: [(start_char, end_char, label), ...]}
+        self.conn.executemany("INSERT OR REPLACE INTO entities (key, ents) VALUES (?, ?)",
+                              [(self.key(text), json.dumps(ents)) for text, ents in entities.items()])
+        self.conn.commit()
+
+
+_entity_caches = {}
+
+
+def load_entity_cache(model=NER_MODEL):
+    if model not in _entity_caches:
+        _entity_caches[model] = EntityCache(model=model)
+    return _entity_caches[model]
+
+
+def pipe_docs(nlp, texts, batch_size=BATCH_SIZE, n_process=N_PROCESS, desc="NER"):
+    # Yield (index, doc) for every non-empty text, shortest first; prints docs/s when exhausted
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    order = sorted((i for i, text in enumerate(texts) if text.strip()), key=lambda i: len(texts[i]))
+
+    start = time.perf_counter()
+    docs = nlp.pipe((texts[i] for i in order), batch_size=batch_size, n_process=n_process)
+    for i, doc in zip(tqdm(order, desc=desc, ncols=150), docs):
+        yield i, doc
+    elapsed = time.perf_counter() - start
+    print("{}: {} docs in {:.1f}s ({:.1f} docs/s, batch_size={}, n_process={})".format(
+        desc, len(order), elapsed, len(order) / elapsed if elapsed else 0.0, batch_size, n_process))
+
+
+def pipe_entities(texts, nlp=None, batch_size=BATCH_SIZE, n_process=N_PROCESS, desc="NER", cache=True,
+                  model=NER_MODEL):
+    # [(start_char, end_char, label), ...] per text, in input order.
+    # Only texts missing from the entity cache are parsed; nlp is loaded on first miss if not given.
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    unique = list(dict.fromkeys(text for text in texts if text.strip()))
+
+    entity_cache = load_entity_cache(model) if cache else None
+    found = entity_cache.get_many(unique) if entity_cache else {}
+    missing = [text for text in unique if text not in found]
+    print("{}: {} texts, {} unique, {} cached, {} to parse".format(
+        desc, len(texts), len(unique), len(unique) - len(missing), len(missing)))
+
+    if missing:
+        if nlp is None:
+            nlp = load_ner_model(model)
+        parsed = {}
+        for i, doc in pipe_docs(nlp, missing, batch_size, n_process, desc):
+            parsed[missing[i]] = [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents]
+            if entity_cache and len(parsed) >= FLUSH_SIZE:
+                entity_cache.put_many(parsed)
+                found.update(parsed)
+                parsed = {}
+        if entity_cache and parsed:
+            entity_cache.put_many(parsed)
+        found.update(parsed)
+
+    return [found.get(text, []) for text in texts]
+
+
+def remove_entities(text, entities, labels=None):
+    # Cut the entity spans (optionally only the given labels) out of text, joining what is left with spaces
+    pieces = []
+    last = 0
+    for start, end, label in entities:
+        if labels is None or label in labels:
+            pieces.append(text[last:start].strip())
+            last = end
+    if not pieces:
+        return text
+    pieces.append(text[last:].strip())
+    return ' '.join(pieces)
+
+
+def gpe_mentions(text, entities, gazetteer, city_first=False, citi=None, country=None):
+    # Split GPE entities into city/country mentions; city_first matches the content-side rule
+    citi = [] if citi is None else citi
+    country = [] if country is None else country
+    for start, end, label in entities:
+        if label == 'GPE':
+            name = text[start:end]
+            if city_first and gazetteer.is_city(name):
+                citi.append(name)
+            elif gazetteer.is_country(name):
+                country.append(name)
+            elif not city_first and gazetteer.is_city(name):
+                citi.append(name)
+    return citi, country
+
+
+def scope_from_mentions(citi, country):
+    # One city, several cities or several countries decide the scope; None leaves it unchanged
+    if len(set(citi)) == 1:
+        return "SubNational"
+    elif len(set(citi)) > 1:
+        return "Subnational region"
+    elif len(set(country)) > 1:
+        return "International"
+    return None
@@ -1,36 +1,23 @@
+import argparse
+import time
 import pandas as pd
-import spacy
-import geonamescache
-from tqdm import tqdm
+from gazetteer import load_gazetteer
+from ner_pipeline import BATCH_SIZE, N_PROCESS
+from scope_resolver import ScopeResolver
 import shutil
 from sklearn.metrics import f1_score, classification_report
 
 
-def gen_dict_extract(var, key):
-    if isinstance(var, dict):
-        for k, v in var.items():
-            if k == key:
-                yield v
-            if isinstance(v, (dict, list)):
-                yield from gen_dict_extract(v, key)
-    elif isinstance(var, list):
-        for d in var:
-            yield from gen_dict_extract(d, key)
-
-
 if __name__ == '__main__':
-    gc = geonamescache.GeonamesCache()
-
-    # gets nested dictionary for countries
-    countries = gc.get_countries()
-
-    # gets nested dictionary for cities
-    cities = gc.get_cities()
-
-    cities = [*gen_dict_extract(cities, 'name')]
-    countries = [*gen_dict_extract(countries, 'name')]
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', default=BATCH_SIZE, type=int)
+    parser.add_argument('--n_process', default=N_PROCESS, type=int)
+    parser.add_argument('--mode', default='compare', type=str)  # ['compare', 'cascade', 'transformer']
+    parser.add_argument('--no_cache', action='store_true', help="Parse every text again, for timing")
+    args = parser.parse_args()
 
-    nlp = spacy.load("en_core_web_trf")
+    # City/country hash sets compiled from geonamescache
+    gazetteer = load_gazetteer()
 
     df = pd.read_excel("/home/zhhuang/climate_policy_paper/code/files/policy_db_complete.xlsx",
                        sheet_name="all_policies_dedup")
@@ -39,61 +26,30 @@ if __name__ == '__main__':
     df['Policy_Content'].fillna('', inplace=True)
 
     scope_lab = df["Jurisdiction_standard_amend"].to_list()
-    scope = ["National"] * len(df["Jurisdiction_standard_amend"].to_list())
-
-    bar = tqdm(range(len(df)), desc='National City NER', ncols=150)
-    for _, index_row in zip(bar, df.iterrows()):
-        index, row = index_row
-        doc_title = nlp(row["Policy"])
-        doc_content = nlp(row['Policy_Content'])
-
-        judge = True
-        citi = []
-        country = []
-        for ent in doc_title.ents:
-            if ent.label_ == 'GPE':
-                if ent.text in countries:
-                    country.append(ent.text)
-                elif ent.text in cities:
-                    citi.append(ent.text)
-
-        if len(set(citi)) == 1:
-            scope[index] = "SubNational"
-            print("SubNational: ", row["Policy"])
-            judge = False
-        elif len(set(citi)) > 1:
-            scope[index] = "Subnational region"
-            print("Subnational region: ", row["Policy"])
-            judge = False
-        elif len(set(country)) > 1:
-            scope[index] = "International"
-            print("International: ", row["Policy"])
-            judge = False
-
-        if judge:
-            for ent in doc_content.ents:
-                if ent.label_ == 'GPE':
-                    if ent.text in cities:
-                        citi.append(ent.text)
-                    elif ent.text in countries:
-                        country.append(ent.text)
-            if len(set(citi)) == 1:
-                scope[index] = "SubNational"
-                print("SubNational: ", row["Policy"])
-                judge = False
-            elif len(set(citi)) > 1:
-                scope[index] = "Subnational region"
-                print("Subnational region: ", row["Policy"])
-                judge = False
-            elif len(set(country)) > 1:
-                scope[index] = "International"
-                print("International: ", row["Policy"])
-                judge = False
+    titles = df["Policy"].to_list()
+    contents = df["Policy_Content"].to_list()
+
+    # --mode compare runs the full transformer pass and the cascade on the same labelled rows
+    modes = ['transformer', 'cascade'] if args.mode == 'compare' else [args.mode]
+    predictions = {}
+    for mode in modes:
+        start = time.perf_counter()
+        resolver = ScopeResolver(gazetteer, cascade=mode == 'cascade', batch_size=args.batch_size,
+                                 n_process=args.n_process, cache=not args.no_cache)
+        judges = resolver.resolve(titles, contents)
+        predictions[mode] = [judge if judge else "National" for judge in judges]
+        print("{}: {:.1f}s".format(mode, time.perf_counter() - start))
+        print(classification_report(scope_lab, predictions[mode], zero_division=1))
+
+    if args.mode == 'compare':
+        changed = sum(t != c for t, c in zip(predictions['transformer'], predictions['cascade']))
+        print("cascade vs transformer: {} of {} rows differ".format(changed, len(titles)))
+        df["Scope_transformer"] = predictions['transformer']
+    scope = predictions[modes[-1]]
 
     df["Scope"] = scope
-    df = df[["Policy", 'Policy_Content', "Jurisdiction_standard_amend", "Scope"]]
+    df = df[["Policy", 'Policy_Content', "Jurisdiction_standard_amend", "Scope"] +
+            (["Scope_transformer"] if args.mode == 'compare' else [])]
     with pd.ExcelWriter("NER_TEST.xlsx", engine='xlsxwriter',
                         engine_kwargs={'options': {'strings_to_urls': False}}) as writer:
         df.to_excel(writer, index=False)
-    report = classification_report(scope_lab, scope, zero_division=1)
-    print(report)
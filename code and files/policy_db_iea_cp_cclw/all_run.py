@@ -1,49 +1,110 @@
+import argparse
 import os
-import time
+import runpy
 import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from country_resolver import build_iso_enrichment, load_country_resolver
+from reference_cache import load_annex_iso_list, load_region_dict
+from law_keywords import LawKeywords
+import iea_dedup
+import cp_dedup
+import iea_sector_process
+import cp_sector_process
+import lse_sector_process
+import cp_iea_lse_region_process
+import iea_instrument_process
+import cp_instrument_process
+import lse_instrument_process
+import cp_iea_lse_annex_process
+import iea_objective_process
+import cp_objective_process
+import lse_objective_process
+import cp_iea_lse_law_process
+import contat_three_db
+
+# The dedup -> sector -> region -> instrument -> annex -> objective -> law stages run as functions over in-memory
+# DataFrames instead of one script per stage handing over workbooks. IEA, Climate Policy and LSE only meet in
+# contat_three_db, so the three databases run in parallel processes. With --checkpoint every stage also writes the
+# workbook its standalone script writes (iea_sector_result.xlsx, ...), for debugging.
+
+# Dictionaries are (re)built by their scripts first
+DICT_SCRIPTS = ["iea_sector_dict_create.py", "cp_sector_dict_create.py", "lse_sector_dict_create.py",
+                "iea_instrument_dict_create.py", "cp_instrument_dict_create.py", "lse_instrument_dict_create.py",
+                "iea_objective_dict_create.py", "cp_objective_dict_create.py", "lse_objective_dict_create.py",
+                "cp_iea_lse_law_title_dict_create.py", "cp_iea_lse_law_content_dict_create.py"]
+
+SECTOR = {"iea": iea_sector_process, "cp": cp_sector_process, "lse": lse_sector_process}
+INSTRUMENT = {"iea": iea_instrument_process, "cp": cp_instrument_process, "lse": lse_instrument_process}
+OBJECTIVE = {"iea": iea_objective_process, "cp": cp_objective_process, "lse": lse_objective_process}
+
+
+def run_database(db, df, checkpoint=False):
+    # sector -> region -> instrument -> annex -> objective -> law of one database, from its deduplicated data
+    region = cp_iea_lse_region_process
+    annex = cp_iea_lse_annex_process
+    law = cp_iea_lse_law_process
+    stages = [
+        ("sector", SECTOR[db].data_process, (SECTOR[db].get_dict(),), SECTOR[db].save, ()),
+        ("region", getattr(region, db + "_region_process"), (load_country_resolver(), load_region_dict()),
+         region.save, (db,)),
+        ("instrument", INSTRUMENT[db].data_process, (INSTRUMENT[db].get_json_data(),), INSTRUMENT[db].save, ()),
+        ("annex", getattr(annex, db + "_annex_process"), (build_iso_enrichment(load_annex_iso_list()),),
+         annex.save, (db,)),
+        ("objective", OBJECTIVE[db].data_process, (OBJECTIVE[db].get_dict(),), OBJECTIVE[db].save, ()),
+        ("law", getattr(law, db + "_law_process"), (LawKeywords(*law.get_dict()),), law.save, (db,)),
+    ]
+    for name, process, args, save, save_args in stages:
+        start = time.perf_counter()
+        # Stages index rows by position, as they did reading a workbook
+        df = process(df.reset_index(drop=True), *args)
+        if checkpoint:
+            save(df, *save_args)
+        print("{} {}: {} rows, {:.1f}s".format(db, name, len(df), time.perf_counter() - start))
+    return df
+
 
-# print(os.getcwd())
-start = time.perf_counter()
+def run_pipeline(checkpoint=False):
+    for script in DICT_SCRIPTS:
+        runpy.run_path(script, run_name='__main__')
 
-os.system("python iea_dedup.py")
-os.system("python cp_dedup.py")
+    # dup_statistic.txt is started by the IEA dedup and appended to by the later steps, so these stay in order
+    databases = {"iea": iea_dedup.data_process(iea_dedup.get_data()),
+                 "cp": cp_dedup.data_process(cp_dedup.get_data()),
+                 "lse": lse_sector_process.get_data()}
+    if checkpoint:
+        databases["iea"].to_excel('iea_dedup_result.xlsx', index=False)
+        databases["cp"].to_excel('cp_dedup_result.xlsx', index=False)
 
-os.system("python iea_sector_dict_create.py")
-os.system("python cp_sector_dict_create.py")
-os.system("python lse_sector_dict_create.py")
-os.system("python iea_sector_process.py")
-os.system("python cp_sector_process.py")
-os.system("python lse_sector_process.py")
+    with ProcessPoolExecutor(max_workers=len(databases)) as executor:
+        futures = {db: executor.submit(run_database, db, df, checkpoint) for db, df in databases.items()}
+        results = {db: future.result() for db, future in futures.items()}
 
-os.system("python cp_iea_lse_region_process.py")
+    all_data_mitigation, all_data_adaptation = contat_three_db.concat_databases(results["iea"], results["cp"],
+                                                                               results["lse"])
+    contat_three_db.save(all_data_mitigation, 'policy_concat_mitigation_result.xlsx')
+    contat_three_db.save(all_data_adaptation, 'policy_concat_adaptation_result.xlsx')
 
-os.system("python iea_instrument_dict_create.py")
-os.system("python cp_instrument_dict_create.py")
-os.system("python lse_instrument_dict_create.py")
-os.system("python iea_instrument_process.py")
-os.system("python cp_instrument_process.py")
-os.system("python lse_instrument_process.py")
+    runpy.run_path("concat_bm25_similar.py", run_name='__main__')
 
-os.system("python cp_iea_lse_annex_process.py")
 
-os.system("python iea_objective_dict_create.py")
-os.system("python cp_objective_dict_create.py")
-os.system("python lse_objective_dict_create.py")
-os.system("python iea_objective_process.py")
-os.system("python cp_objective_process.py")
-os.system("python lse_objective_process.py")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", action="store_true", help="also write the workbook of every stage")
+    args = parser.parse_args()
 
-os.system("python cp_iea_lse_law_title_dict_create.py")
-os.system("python cp_iea_lse_law_content_dict_create.py")
-os.system("python cp_iea_lse_law_process.py")
+    # print(os.getcwd())
+    start = time.perf_counter()
 
-os.system("python contat_three_db.py")
-os.system("python concat_bm25_similar.py")
+    run_pipeline(args.checkpoint)
 
-end = time.perf_counter()
-print("time cost:", end - start)
+    end = time.perf_counter()
+    print("time cost:", end - start)
 
-update_path = os.path.join(os.getcwd(), "update_policies")
-if not os.path.exists(update_path):
-    os.makedirs(update_path)
-shutil.move("bm25_result.xlsx", './update_policies/bm25_result.xlsx')
+    update_path = os.path.join(os.getcwd(), "update_policies")
+    if not os.path.exists(update_path):
+        os.makedirs(update_path)
+    shutil.move("bm25_result.xlsx", './update_policies/bm25_result.xlsx')
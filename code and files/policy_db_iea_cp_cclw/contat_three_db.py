@@ -96,11 +96,8 @@ def save(all_df, filename):
         all_df.to_excel(writer, index=False)
 
 
-if __name__ == '__main__':
-    iea_df = get_data("iea_sector_region_instrument_annex_objective_law_result.xlsx")
-    cp_df = get_data("cp_sector_region_instrument_annex_objective_law_result.xlsx")
-    lse_df = get_data("lse_sector_region_instrument_annex_objective_law_result.xlsx")
-
+def concat_databases(iea_df, cp_df, lse_df):
+    # (mitigation, adaptation) policies of the three databases
     iea_df = iea_process(iea_df)
     cp_df_mitigation, cp_df_adaptation = cp_process(cp_df)
     lse_df_mitigation, lse_df_adaptation = lse_process(lse_df)
@@ -133,5 +130,14 @@ if __name__ == '__main__':
         f.write("All Number Before Manual: " + str(len(all_data_mitigation)) + '\n')
         f.write('\n')
 
+    return all_data_mitigation, all_data_adaptation
+
+
+if __name__ == '__main__':
+    iea_df = get_data("iea_sector_region_instrument_annex_objective_law_result.xlsx")
+    cp_df = get_data("cp_sector_region_instrument_annex_objective_law_result.xlsx")
+    lse_df = get_data("lse_sector_region_instrument_annex_objective_law_result.xlsx")
+
+    all_data_mitigation, all_data_adaptation = concat_databases(iea_df, cp_df, lse_df)
     save(all_data_mitigation, 'policy_concat_mitigation_result.xlsx')
     save(all_data_adaptation, 'policy_concat_adaptation_result.xlsx')
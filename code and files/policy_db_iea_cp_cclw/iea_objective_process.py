@@ -4,6 +4,9 @@ import numpy as np
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dict_mapping import map_field
+
 print("================== {} ==================".format(os.path.basename(sys.argv[0])))
 
 
@@ -23,43 +26,11 @@ def save(result):
         result.to_excel(writer, index=False)
 
 
-if __name__ == '__main__':
-    df = get_data()
-    map_dict = get_dict()
-
-    df["Topics"].fillna("", inplace=True)
-    df["Topics"] = df["Topics"].apply(lambda x: x.strip().split(";") if x else x)
-    # print(df["Topics"])
-    # print(df.info())
-
-    objective = []
-    subobjective = []
+def data_process(df, map_dict):
+    df["Topics"] = df["Topics"].fillna("").str.strip()
+    df["objective"], df["subobjective"] = map_field(df["Topics"], map_dict, ";")
+    return df
 
-    for num, row in df.iterrows():
-        if not row["Topics"]:
-            objective.append("")
-            subobjective.append("")
-        else:
-            objective_inner = []
-            subobjective_inner = []
-            for i in row["Topics"]:
-                if i:
-                    if map_dict[i.strip()][0]:
-                        objective_inner.append(map_dict[i.strip()][0])
-                        if map_dict[i.strip()][1]:
-                            subobjective_inner.append(map_dict[i.strip()][1])
 
-            objective_inner_temp = set(";".join(set(objective_inner)).split(';'))
-            objective_inner_temp.discard("")
-            subobjective_inner_temp = set(";".join(set(subobjective_inner)).split(';'))
-            subobjective_inner_temp.discard("")
-            objective.append(";".join(objective_inner_temp))
-            subobjective.append(";".join(subobjective_inner_temp))
-
-            # objective.append(";".join(set(objective_inner)))
-            # subobjective.append(";".join(set(subobjective_inner)))
-
-    df["Topics"] = df["Topics"].apply(lambda x: ";".join(x) if len(x) > 0 else "")
-    df["objective"] = objective
-    df["subobjective"] = subobjective
-    save(df)
+if __name__ == '__main__':
+    save(data_process(get_data(), get_dict()))
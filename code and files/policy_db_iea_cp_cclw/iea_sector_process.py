@@ -4,6 +4,9 @@ import numpy as np
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dict_mapping import map_field
+
 print("================== {} ==================".format(os.path.basename(sys.argv[0])))
 
 
@@ -23,50 +26,11 @@ def save(result):
         result.to_excel(writer, index=False)
 
 
-if __name__ == '__main__':
-    df = get_data()
-    iea_sector_dict = get_dict()
-
-    df["Sectors temp"] = df["Sectors"]
-    df["Sectors temp"].fillna("", inplace=True)
-
+def data_process(df, iea_sector_dict):
     # Sectors split by ";"
-    df["Sectors temp"] = df["Sectors temp"].apply(lambda x: x.strip().split(";") if x else x)
-
-    sector = []
-    subsector = []
+    df["sector"], df["subsector"] = map_field(df["Sectors"], iea_sector_dict, ";", multi_sector=True)
+    return df
 
-    for num, row in df.iterrows():
-        if not row["Sectors temp"]:
-            sector.append("")
-            subsector.append("")
-        else:
-            sector_inner = []
-            subsector_inner = []
-            for i in row["Sectors temp"]:
-                if i:
-                    if iea_sector_dict[i.strip()][0]:
-                        sector_inner.append(iea_sector_dict[i.strip()][0])
-                        if iea_sector_dict[i.strip()][1]:
-                            subsector_inner.append(iea_sector_dict[i.strip()][1])
 
-            if len(set(sector_inner)) > 1:
-                sector_inner_set = set(sector_inner)
-                sector_inner_set.add("Multi-sector")
-                sector_inner_temp = set(";".join(set(sector_inner_set)).split(';'))
-            else:
-                sector_inner_temp = set(";".join(set(sector_inner)).split(';'))
-
-            sector_inner_temp.discard("")
-            sector.append(";".join(sector_inner_temp))
-
-            subsector_inner_temp = set(";".join(set(subsector_inner)).split(';'))
-            subsector_inner_temp.discard("")
-            subsector.append(";".join(subsector_inner_temp))
-
-    # print(len(sector))
-    # print(len(subsector))
-    df.drop(['Sectors temp'], axis=1, inplace=True)
-    df["sector"] = sector
-    df["subsector"] = subsector
-    save(df)
+if __name__ == '__main__':
+    save(data_process(get_data(), get_dict()))
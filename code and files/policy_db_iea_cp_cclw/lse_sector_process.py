@@ -4,6 +4,9 @@ import numpy as np
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dict_mapping import map_field
+
 print("================== {} ==================".format(os.path.basename(sys.argv[0])))
 
 
@@ -23,42 +26,15 @@ def save(result):
         result.to_excel(writer, index=False)
 
 
-if __name__ == '__main__':
-    df = get_data()
-    lse_sector_dict = get_dict()
-
+def data_process(df, lse_sector_dict):
     df["Sectors"].fillna("", inplace=True)
 
     # Sectors split by ","
-    df["Sectors"] = df["Sectors"].apply(lambda x: x.strip().split(",") if len(x) > 0 else x)
+    df["sector"], df["subsector"] = map_field(df["Sectors"], lse_sector_dict, ",",
+                                              multi_sector=True)
+    df["Sectors"] = df["Sectors"].str.strip()
+    return df
 
-    sector = []
-    subsector = []
 
-    for num, row in df.iterrows():
-        if not row["Sectors"]:
-            sector.append("")
-            subsector.append("")
-        else:
-            sector_inner = []
-            subsector_inner = []
-            for i in row["Sectors"]:
-                if lse_sector_dict[i.strip()][0]:
-                    sector_inner.append(lse_sector_dict[i.strip()][0])
-                    if lse_sector_dict[i.strip()][1]:
-                        subsector_inner.append(lse_sector_dict[i.strip()][1])
-
-            if len(set(sector_inner)) > 1:
-                sector_inner_set = set(sector_inner)
-                sector_inner_set.add("Multi-sector")
-                sector.append(";".join(sector_inner_set))
-            else:
-                sector.append(";".join(set(sector_inner)))
-            subsector.append(";".join(set(subsector_inner)))
-
-    # print(len(sector))
-    # print(len(subsector))
-    df["Sectors"] = df["Sectors"].apply(lambda x: ",".join(x) if len(x) > 0 else "")
-    df["sector"] = sector
-    df["subsector"] = subsector
-    save(df)
+if __name__ == '__main__':
+    save(data_process(get_data(), get_dict()))
@@ -1,10 +1,18 @@
 import pandas as pd
 import numpy as np
-from rank_bm25 import BM25Okapi
-from gensim.summarization.bm25 import BM25
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from corpus_store import build_corpus
+from dedup_index import DedupIndex, record_key
+# Titles normalized as the main dedup does (lowercase, stopwords, lemmas, place names and dates out): the tokens
+# BM25_experience_judgment was calibrated on
+from bm25_tokenizer import tokenize_policies, BM25_TOKENIZER
+
+BLOCK_COLUMNS = ["Year", "ISO_code", "Jurisdiction_standard"]
+RECORD_COLUMNS = ["ISO_code", "Year", "Jurisdiction_standard", "Policy", "db_source"]
+
 print("================== {} ==================".format(os.path.basename(sys.argv[0])))
 
 
@@ -36,90 +44,43 @@ def save(data):
 
 
 if __name__ == '__main__':
+    BM25_experience_judgment = 17.231989221158145
+
     df = get_data()
     # print(df.info())
     df = data_process(df)
 
-    bm25_matrix = np.zeros((len(df["Policy"]), len(df["Policy"])))
     policy_list = df["Policy"].tolist()
-    tokenized_policy_list = [doc.split(" ") for doc in policy_list]
+    corpus = build_corpus("bm25_concat_update", policy_list, tokenize_policies, tokenizer=BM25_TOKENIZER)
+    tokenized_policy_list = [corpus.tokens(i) for i in range(len(corpus))]
 
     # rank_bm25
     # bm25 = BM25Okapi(tokenized_policy_list)
 
-    # gensim
-    bm25 = BM25(tokenized_policy_list)
-
-    for num, row in df.iterrows():
-        tokenized_query = row["Policy"].split(" ")
-        doc_scores = bm25.get_scores(tokenized_query)
-        bm25_matrix[num] = doc_scores
-
-    # np.savetxt('bm25_matrix.txt', bm25_matrix, delimiter=',')
-
-    grouped = df.groupby(["Year", "ISO_code", "Jurisdiction_standard"])["Policy"]
-
-    group_policy_number = np.zeros(len(df["Policy"]))
-    bm25_score_first = np.zeros(len(df["Policy"]))
-    bm25_score_second = np.zeros(len(df["Policy"]))
-    bm25_index_first = np.zeros(len(df["Policy"]))
-    bm25_index_second = np.zeros(len(df["Policy"]))
-    bm25_policy_first = np.empty(len(df["Policy"]), dtype=object)
-    bm25_policy_second = np.empty(len(df["Policy"]), dtype=object)
-
-    # print(grouped.indices)
-    # print(type(grouped.indices))
-    for name, index in grouped.indices.items():
-        if len(index) == 1:
-            group_policy_number[index] = 1
-            bm25_score_first[index] = -9999999
-            bm25_score_second[index] = -9999999
-            bm25_policy_first[index] = ''
-            bm25_policy_second[index] = ''
-            bm25_index_first[index] = -9999999
-            bm25_index_second[index] = -9999999
-        elif len(index) == 2:
-            group_policy_number[index] = 2
-            bm25_score_second[index] = -9999999
-            bm25_index_second[index] = -9999999
-            bm25_policy_second[index] = ''
-            for num, idx in enumerate(index):
-                scores = bm25_matrix[idx]
-                other_policy_index = np.delete(index, num)
-                other_policy_scores = scores[other_policy_index]
-                sort_score_index = np.argsort(other_policy_scores)
-                # print(other_policy_index)
-                # print(other_policy_scores)
-
-                bm25_score_first[idx] = other_policy_scores[sort_score_index[0]]
-                bm25_policy_first[idx] = policy_list[other_policy_index[sort_score_index[0]]]
-                bm25_index_first[idx] = other_policy_index[sort_score_index[0]]
-
-        else:
-            group_policy_number[index] = len(index)
-
-            for num, idx in enumerate(index):
-                scores = bm25_matrix[idx]
-                other_policy_index = np.delete(index, num)
-                other_policy_scores = scores[other_policy_index]
-                sort_score_index = np.argsort(other_policy_scores)
-                # print(other_policy_index[sort_score_index[0]])
-                # print(policy_list[other_policy_index[sort_score_index[0]]])
-
-                bm25_score_first[idx] = other_policy_scores[sort_score_index[0]]
-                bm25_policy_first[idx] = policy_list[other_policy_index[sort_score_index[0]]]
-                bm25_score_second[idx] = other_policy_scores[sort_score_index[1]]
-                bm25_policy_second[idx] = policy_list[other_policy_index[sort_score_index[1]]]
-                bm25_index_first[idx] = other_policy_index[sort_score_index[0]]
-                bm25_index_second[idx] = other_policy_index[sort_score_index[1]]
-                # print(bm25_policy_first)
-
-    df["group_policy_number"] = group_policy_number
-    df["bm25_score_first"] = bm25_score_first
-    df["bm25_score_second"] = bm25_score_second
-    df["bm25_policy_first"] = bm25_policy_first
-    df["bm25_index_first"] = bm25_index_first
-    df["bm25_policy_second"] = bm25_policy_second
-    df["bm25_index_second"] = bm25_index_second
+    # Duplicate clusters and the two best scoring policies of each group, carried over from the previous updates:
+    # only new or changed records, and the groups that lost one, are scored
+    occurrence = df.groupby(RECORD_COLUMNS, dropna=False).cumcount()
+    dedup_index = DedupIndex("policy_db_update", BM25_TOKENIZER)
+    dup_cluster, dup_status, neighbours, neighbour_scores = dedup_index.update(
+        [record_key([*key, n]) for key, n in zip(df[RECORD_COLUMNS].values, occurrence)],
+        [record_key(key) for key in df[BLOCK_COLUMNS].values], tokenized_policy_list, BM25_experience_judgment)
+    dedup_index.save()
+
+    # -9999999 and '' where the group has no first/second other policy
+    missing = neighbours < 0
+    neighbour_policies = np.array(policy_list, dtype=object)[np.maximum(neighbours, 0)]
+    neighbour_policies[missing] = ''
+    neighbour_scores = np.where(missing, -9999999, neighbour_scores)
+    neighbours = np.where(missing, -9999999, neighbours).astype(float)
+
+    df["group_policy_number"] = df.groupby(BLOCK_COLUMNS)["Policy"].transform("size").to_numpy(dtype=float)
+    df["bm25_score_first"] = neighbour_scores[:, 0]
+    df["bm25_score_second"] = neighbour_scores[:, 1]
+    df["bm25_policy_first"] = neighbour_policies[:, 0]
+    df["bm25_index_first"] = neighbours[:, 0]
+    df["bm25_policy_second"] = neighbour_policies[:, 1]
+    df["bm25_index_second"] = neighbours[:, 1]
+    df["dup_cluster"] = dup_cluster
+    df["dup_status"] = dup_status
 
     save(df)
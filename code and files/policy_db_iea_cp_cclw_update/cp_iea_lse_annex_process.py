@@ -3,6 +3,10 @@ import numpy as np
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from country_resolver import build_iso_enrichment, enrich_by_iso
+from reference_cache import load_annex_iso_list
+
 print("================== {} ==================".format(os.path.basename(sys.argv[0])))
 
 
@@ -21,98 +25,33 @@ def get_lse_data():
     return df
 
 
-def get_country_data():
-    df = pd.read_excel("Countries_Code.xlsx")
-    return df
-
-
-def get_annex_data():
-    df = pd.read_excel("Annex.xlsx")
-    return df
-
-
 def save(df, file_name):
     with pd.ExcelWriter('{}_sector_region_instrument_annex_result.xlsx'.format(file_name)) as writer:
         df.to_excel(writer, index=False)
 
 
-def iea_annex_process():
+def iea_annex_process(iea_df, iso_enrichment):
     # IEA
-    iea_df = get_iea_data()
     iea_df.fillna("", inplace=True)
-    iea_annex = []
-    for num, row in iea_df.iterrows():
-        if row["ISO_code"] in annex_1_iso_list:
-            iea_annex.append("Annex I")
-        else:
-            iea_annex.append("Non Annex I")
-    iea_df["Annex"] = iea_annex
-    save(iea_df, "iea")
+    return enrich_by_iso(iea_df, iso_enrichment)
 
 
-def cp_annex_process():
+def cp_annex_process(cp_df, iso_enrichment):
     # Climate Policy
-    cp_df = get_cp_data()
     cp_df.fillna("", inplace=True)
-    cp_annex = []
-    for num, row in cp_df.iterrows():
-        if row["ISO_code"] in annex_1_iso_list:
-            cp_annex.append("Annex I")
-        else:
-            cp_annex.append("Non Annex I")
-    cp_df["Annex"] = cp_annex
-    save(cp_df, "cp")
+    return enrich_by_iso(cp_df, iso_enrichment)
 
 
-def lse_annex_process():
+def lse_annex_process(lse_df, iso_enrichment):
     # LSE
-    lse_df = get_lse_data()
     lse_df.fillna("", inplace=True)
-    lse_annex = []
-    for num, row in lse_df.iterrows():
-        if row["ISO_code"] in annex_1_iso_list:
-            lse_annex.append("Annex I")
-        else:
-            lse_annex.append("Non Annex I")
-    lse_df["Annex"] = lse_annex
-    save(lse_df, "lse")
+    return enrich_by_iso(lse_df, iso_enrichment)
 
 
 if __name__ == '__main__':
-    country_df = get_country_data()
-    annex_df = get_annex_data()
-    # print(annex_df["Annex I"])
-
-    annex_df["Annex I"] = annex_df["Annex I"].apply(lambda x: x.strip())
-    annex_country = annex_df["Annex I"].to_list()
-
-    country_s_name = country_df["Short Name"].tolist()
-    country_l_name = country_df["Long Name"].tolist()
-    country_code = country_df["Code"].tolist()
-
-    country_sname_dict = {
-        country_s_name[i].lower(): [country_s_name[i], country_code[i]]
-        for i in range(len(country_s_name))}
-    country_lname_dict = {
-        country_l_name[i].lower(): [country_l_name[i], country_code[i]]
-        for i in range(len(country_l_name))}
-
-    annex_data = []
-    for country in annex_country:
-        country = country.lower()
-        if country == "european union":
-            annex_data.append("EUU")
-        elif country in country_lname_dict:
-            annex_data.append(country_lname_dict[country][1])
-        elif country in country_sname_dict:
-            annex_data.append(country_sname_dict[country][1])
-        else:
-            annex_data.append("")
-    annex_df["ISO"] = annex_data
-    annex_df.to_excel("Annex.xlsx", index=False)
-
-    annex_1_iso_list = annex_df["ISO"].to_list()
-
-    iea_annex_process()
-    cp_annex_process()
-    lse_annex_process()
+    annex_1_iso_list = load_annex_iso_list()
+    iso_enrichment = build_iso_enrichment(annex_1_iso_list)
+
+    save(iea_annex_process(get_iea_data(), iso_enrichment), "iea")
+    save(cp_annex_process(get_cp_data(), iso_enrichment), "cp")
+    save(lse_annex_process(get_lse_data(), iso_enrichment), "lse")
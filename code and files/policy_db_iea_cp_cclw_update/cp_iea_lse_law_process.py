@@ -1,10 +1,13 @@
-import re
 import pandas as pd
 import numpy as np
 import json
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from law_keywords import HARD_LAWS, LEGISLATIVE_LAWS, STEERING, DECISIONAL, CONTENT_SOFT_LAWS, LawKeywords, \
+    clean_text, this_law, year_range
+
 print("================== {} ==================".format(os.path.basename(sys.argv[0])))
 
 
@@ -36,8 +39,7 @@ def save(df, db):
         df.to_excel(writer, index=False)
 
 
-def lse_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
-    lse_df = get_lse_data()
+def lse_law_process(lse_df, law_keywords):
     lse_df["Title"].fillna("", inplace=True)
     lse_df["Description"].fillna("", inplace=True)
     lse_df["Type"].fillna("", inplace=True)
@@ -75,225 +77,46 @@ def lse_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
             law_strategy_list[num] = "Steering Instruments"
         else:
             # Title
-            policy = row["Title"].lower(). \
-                replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-                replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
+            policy = clean_text(row["Title"])
+            title_words = set(policy.split(" "))
             # Content
-            policy_content = row["Description"].lower(). \
-                replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-                replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
-
-            break_judge = False
-            for hardlaw in ['Constitution', 'International Law', 'Law/Act', 'Decree/Order/Ordinance',
-                            'Regulation/Directive/Decision']:
-                if break_judge:
-                    break
-                law_keywords = soft_hard_law_title_dict[hardlaw].lower().split(';')
-                for keyword in law_keywords:
-                    if ' ' in keyword:
-                        if len(re.findall(keyword, policy)) > 0:
-                            law_strategy_list[num] = hardlaw
-                            break_judge = True
-                            break
-                    else:
-                        if keyword in policy.split(" "):
-                            law_strategy_list[num] = hardlaw
-                            break_judge = True
-                            break
-
-            for softlaw in ["Decisional Notices and Communications", "Steering Instruments", "Preparatory Instruments",
-                            "Decisional Guidelines, Codes and Frameworks", "Informative Instruments",
-                            "Interpretative Communications and Notices"]:
-                if break_judge:
-                    break
-                softlaw_keywords = soft_hard_law_title_dict[softlaw].lower().split(';')
-                for keyword in softlaw_keywords:
-                    if ' ' in keyword:
-                        if len(re.findall(keyword, policy)) > 0:
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-                    else:
-                        if keyword in policy.split(" "):
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-            if not break_judge:
-                if len(re.findall(r'(?:19|20)\d{2}\s*-\s*(?:19|20)\d{2}\s*', row["Title"].lower())) > 0:
-                    law_strategy_list[num] = "Preparatory Instruments"
-                elif len(re.findall(r'(?:19|20)\d{2}/\d{2}\s*-\s*(?:19|20)\d{2}/\d{2}\s*', row["Title"].lower())) > 0:
-                    law_strategy_list[num] = "Preparatory Instruments"
-                # elif "strategy" in row["Title"].lower():
-                #     law_strategy_list[num] = "Preparatory Instruments"
-                # elif ("aim" in row["Description"].lower()) or ("seek" in row["Description"].lower()) or (
-                #         "vision" in row["Description"].lower()):
-                #     law_strategy_list[num] = "Preparatory Instruments"
+            policy_content = clean_text(row["Description"])
+            content_words = set(policy_content.split(" "))
+
+            law = law_keywords.title_law(HARD_LAWS + ["Decisional Notices and Communications", "Steering Instruments",
+                                                      "Preparatory Instruments",
+                                                      "Decisional Guidelines, Codes and Frameworks",
+                                                      "Informative Instruments",
+                                                      "Interpretative Communications and Notices"],
+                                         policy, title_words)
+            if law is None and year_range(row["Title"]):
+                # Still open to the content checks below
+                law_strategy_list[num] = "Preparatory Instruments"
 
             # hard law "this"/"the" in policy content
-            for hl_this in ['Law/Act', 'Decree/Order/Ordinance', 'Regulation/Directive/Decision']:
-                if break_judge:
-                    break
-                if hl_this == 'Law/Act':
-                    for i in 'Law/Act/Legislation'.lower().split("/"):
-                        if (("the" + " " + i + " ") in policy_content) or (("this" + " " + i + " ") in policy_content):
-                            law_strategy_list[num] = hl_this
-                            break_judge = True
-                            break
-                else:
-                    for i in hl_this.lower().split("/"):
-                        if (("the" + " " + i + " ") in policy_content) or (("this" + " " + i + " ") in policy_content):
-                            law_strategy_list[num] = hl_this
-                            break_judge = True
-                            break
-
-            if not break_judge:
-                # distinct: Steering Instruments, Decisional Guidelines, Codes and Frameworks
-                # judgement: connection to existing Community law
-                for strdcs in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks"]:
-                    if break_judge:
-                        break
-                    softlaw_content_keywords = soft_hard_law_content_dict[strdcs].lower().split(';')
-                    for keyword in softlaw_content_keywords:
-                        if break_judge:
-                            break
-                        if ' ' in keyword:
-                            if len(re.findall(keyword, policy)) > 0:
-                                for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                'Decree/Order/Ordinance', 'Regulation/Directive/Decision']:
-                                    if break_judge:
-                                        break
-                                    law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                    for kw in law_keywords:
-                                        if ' ' in kw:
-                                            if len(re.findall(kw, policy_content)) > 0:
-                                                law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                                break_judge = True
-                                                break
-                                        else:
-                                            if kw in policy_content.split(" "):
-                                                law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                                break_judge = True
-                                                break
-
-                                if not break_judge:
-                                    law_strategy_list[num] = "Steering Instruments"
-                                    break_judge = True
-                                    break
-                        else:
-                            if keyword in policy.split(" "):
-                                for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                'Decree/Order/Ordinance', 'Regulation/Directive/Decision']:
-                                    if break_judge:
-                                        break
-                                    law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                    for kw in law_keywords:
-                                        if ' ' in kw:
-                                            if len(re.findall(kw, policy_content)) > 0:
-                                                law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                                break_judge = True
-                                                break
-                                        else:
-                                            if kw in policy_content.split(" "):
-                                                law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                                break_judge = True
-                                                break
-
-                                if not break_judge:
-                                    law_strategy_list[num] = "Steering Instruments"
-                                    break_judge = True
-                                    break
-
-            if not break_judge:
-                # Soft Law use Policy Content
-                for softlaw in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks",
-                                "Decisional Notices and Communications", "Preparatory Instruments",
-                                "Informative Instruments", "Interpretative Communications and Notices"]:
-                    if break_judge:
-                        break
-
-                    if softlaw in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks"]:
-                        softlaw_content_keywords = soft_hard_law_content_dict[softlaw].lower().split(';') + \
-                                                   soft_hard_law_title_dict[softlaw].lower().split(';')
-                        for keyword in softlaw_content_keywords:
-                            if ' ' in keyword:
-                                if len(re.findall(keyword, policy_content)) > 0:
-                                    for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                    'Decree/Order/Ordinance', 'Regulation/Directive/Decision',
-                                                    'Kyoto protocol']:
-                                        if break_judge:
-                                            break
-                                        if hardlaw == 'Kyoto protocol':
-                                            law_keywords = ['kyoto protocol']
-                                        else:
-                                            law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                        for kw in law_keywords:
-                                            if ' ' in kw:
-                                                if len(re.findall(kw, policy_content)) > 0:
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-                                            else:
-                                                if kw in policy_content.split(" "):
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-
-                                    if not break_judge:
-                                        law_strategy_list[num] = "Steering Instruments"
-                                        break_judge = True
-                                        break
-                            else:
-                                if keyword in policy_content.split(" "):
-                                    for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                    'Decree/Order/Ordinance', 'Regulation/Directive/Decision',
-                                                    'Kyoto protocol']:
-                                        if break_judge:
-                                            break
-                                        if hardlaw == 'Kyoto protocol':
-                                            law_keywords = ['kyoto protocol']
-                                        else:
-                                            law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                        for kw in law_keywords:
-                                            if ' ' in kw:
-                                                if len(re.findall(kw, policy_content)) > 0:
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-                                            else:
-                                                if kw in policy_content.split(" "):
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-
-                                    if not break_judge:
-                                        law_strategy_list[num] = "Steering Instruments"
-                                        break_judge = True
-                                        break
-
-                    else:
-                        softlaw_content_keywords = soft_hard_law_content_dict[softlaw].lower().split(';')
-                        for keyword in softlaw_content_keywords:
-                            if ' ' in keyword:
-                                if len(re.findall(keyword, policy_content)) > 0:
-                                    law_strategy_list[num] = softlaw
-                                    break_judge = True
-                                    break
-                            else:
-                                if keyword in policy_content.split(" "):
-                                    law_strategy_list[num] = softlaw
-                                    break_judge = True
-                                    break
+            if law is None:
+                law = this_law(policy_content)
+
+            # distinct: Steering Instruments, Decisional Guidelines, Codes and Frameworks
+            # judgement: connection to existing Community law
+            if law is None and law_keywords.steering_decisional.found(policy, title_words):
+                law = DECISIONAL if law_keywords.hard_content.found(policy_content, content_words) else STEERING
+
+            # Soft Law use Policy Content
+            if law is None and law_keywords.steering_decisional_all.found(policy_content, content_words):
+                law = DECISIONAL if law_keywords.hard_content_kyoto.found(policy_content, content_words) \
+                    else STEERING
+            if law is None:
+                law = law_keywords.content_law(CONTENT_SOFT_LAWS, policy_content, content_words)
+
+            if law is not None:
+                law_strategy_list[num] = law
 
     lse_df["law or strategy"] = law_strategy_list
-    save(lse_df, "lse")
+    return lse_df
 
 
-def iea_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
-    iea_df = get_iea_data()
+def iea_law_process(iea_df, law_keywords):
     iea_df["Policy"].fillna("", inplace=True)
     iea_df["Policy_Content"].fillna("", inplace=True)
     iea_df["Type"].fillna("", inplace=True)
@@ -303,231 +126,72 @@ def iea_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
     for num, row in iea_df.iterrows():
         if row["Country"] == "Australia":
             # Title
-            policy = row["Policy"].replace("ACT", 'Australian Capital Territory').lower(). \
-                replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-                replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
+            policy = clean_text(row["Policy"].replace("ACT", 'Australian Capital Territory'))
             # Content
-            policy_content = row["Policy_Content"].replace("ACT", 'Australian Capital Territory').lower(). \
-                replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-                replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
+            policy_content = clean_text(row["Policy_Content"].replace("ACT", 'Australian Capital Territory'))
         else:
             # Title
-            policy = row["Policy"].lower(). \
-                replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-                replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
+            policy = clean_text(row["Policy"])
             # Content
-            policy_content = row["Policy_Content"].lower(). \
-                replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-                replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
-
-        break_judge = False
-        for hardlaw in ['Constitution', 'International Law', 'Law/Act', 'Decree/Order/Ordinance',
-                        'Regulation/Directive/Decision']:
-            if break_judge:
-                break
-            law_keywords = soft_hard_law_title_dict[hardlaw].lower().split(';')
-            for keyword in law_keywords:
-                if ' ' in keyword:
-                    if len(re.findall(keyword, policy)) > 0:
-                        law_strategy_list[num] = hardlaw
-                        if hardlaw in ['Constitution', 'International Law', 'Law/Act']:
-                            policy_type_list[num] = "legislative"
-                        break_judge = True
-                        break
-                else:
-                    if keyword in policy.split(" "):
-                        law_strategy_list[num] = hardlaw
-                        if hardlaw in ['Constitution', 'International Law', 'Law/Act']:
-                            policy_type_list[num] = "legislative"
-                        break_judge = True
-                        break
-
-        if not break_judge:
-            for softlaw in ["Decisional Notices and Communications", "Interpretative Communications and Notices"]:
-                if break_judge:
-                    break
-                softlaw_keywords = soft_hard_law_title_dict[softlaw].lower().split(';')
-                for keyword in softlaw_keywords:
-                    if ' ' in keyword:
-                        if len(re.findall(keyword, policy)) > 0:
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-                    else:
-                        if keyword in policy.split(" "):
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
+            policy_content = clean_text(row["Policy_Content"])
+        title_words = set(policy.split(" "))
+        content_words = set(policy_content.split(" "))
+        regulation_type = any([i in row["Type"] for i in
+                               ['Market design rules', 'Energy market regulation',
+                                'Energy trading regulations', 'Regulation']])
+
+        law = law_keywords.title_law(HARD_LAWS + ["Decisional Notices and Communications",
+                                                  "Interpretative Communications and Notices"], policy, title_words)
+        if law in LEGISLATIVE_LAWS:
+            policy_type_list[num] = "legislative"
 
         # hard law "this"/"the" in policy content
-        for hl_this in ['Law/Act', 'Decree/Order/Ordinance', 'Regulation/Directive/Decision']:
-            if break_judge:
-                break
-            if hl_this == 'Law/Act':
-                for i in 'Law/Act/Legislation'.lower().split("/"):
-                    if (("the" + " " + i + " ") in policy_content) or (("this" + " " + i + " ") in policy_content):
-                        law_strategy_list[num] = hl_this
-                        policy_type_list[num] = "legislative"
-                        break_judge = True
-                        break
-            else:
-                for i in hl_this.lower().split("/"):
-                    if (("the" + " " + i + " ") in policy_content) or (("this" + " " + i + " ") in policy_content):
-                        law_strategy_list[num] = hl_this
-                        break_judge = True
-                        break
-
-        if not break_judge:
-            for softlaw in ["Steering Instruments", "Preparatory Instruments",
-                            "Decisional Guidelines, Codes and Frameworks", "Informative Instruments"]:
-                if break_judge:
-                    break
-                softlaw_keywords = soft_hard_law_title_dict[softlaw].lower().split(';')
-                for keyword in softlaw_keywords:
-                    if ' ' in keyword:
-                        if len(re.findall(keyword, policy)) > 0:
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-                    else:
-                        if keyword in policy.split(" "):
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-            if not break_judge:
-                if len(re.findall(r'(?:19|20)\d{2}\s*-\s*(?:19|20)\d{2}\s*', row["Policy"].lower())) > 0:
-                    law_strategy_list[num] = "Preparatory Instruments"
-                elif len(re.findall(r'(?:19|20)\d{2}/\d{2}\s*-\s*(?:19|20)\d{2}/\d{2}\s*', row["Policy"].lower())) > 0:
-                    law_strategy_list[num] = "Preparatory Instruments"
-                # elif "strategy" in row["Title"].lower():
-                #     law_strategy_list[num] = "Preparatory Instruments"
-                # elif ("aim" in row["Description"].lower()) or ("seek" in row["Description"].lower()) or (
-                #         "vision" in row["Description"].lower()):
-                #     law_strategy_list[num] = "Preparatory Instruments"
+        if law is None:
+            law = this_law(policy_content)
+            if law == 'Law/Act':
+                policy_type_list[num] = "legislative"
+
+        if law is None:
+            law = law_keywords.title_law(["Steering Instruments", "Preparatory Instruments",
+                                          "Decisional Guidelines, Codes and Frameworks", "Informative Instruments"],
+                                         policy, title_words)
+            if law is None and year_range(row["Policy"]):
+                # Still open to the checks below
+                law_strategy_list[num] = "Preparatory Instruments"
 
         # distinct: Steering Instruments, Decisional Guidelines, Codes and Frameworks
         # judgement: connection to existing Community law
-        for strdcs in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks"]:
-            if break_judge:
-                break
-            softlaw_content_keywords = soft_hard_law_content_dict[strdcs].lower().split(';')
-            for keyword in softlaw_content_keywords:
-                if break_judge:
-                    break
-                if ' ' in keyword:
-                    if len(re.findall(keyword, policy)) > 0:
-                        if any([i in row["Type"] for i in
-                                ['Market design rules', 'Energy market regulation',
-                                 'Energy trading regulations', 'Regulation']]):
-                            law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                            break_judge = True
-                            break
-                        for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                        'Decree/Order/Ordinance', 'Regulation/Directive/Decision', 'Kyoto protocol']:
-                            if break_judge:
-                                break
-                            if hardlaw == 'Kyoto protocol':
-                                law_keywords = ['kyoto protocol']
-                            else:
-                                law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                            for kw in law_keywords:
-                                if ' ' in kw:
-                                    if len(re.findall(kw, policy_content)) > 0:
-                                        law_strategy_list[
-                                            num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-                                else:
-                                    if kw in policy_content.split(" "):
-                                        law_strategy_list[
-                                            num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-
-                        if not break_judge:
-                            law_strategy_list[num] = "Steering Instruments"
-                            break_judge = True
-                            break
-                else:
-                    if keyword in policy.split(" "):
-                        if any([i in row["Type"] for i in
-                                ['Market design rules', 'Energy market regulation',
-                                 'Energy trading regulations', 'Regulation']]):
-                            law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                            break_judge = True
-                            break
-                        for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                        'Decree/Order/Ordinance', 'Regulation/Directive/Decision', 'Kyoto protocol']:
-                            if break_judge:
-                                break
-                            if hardlaw == 'Kyoto protocol':
-                                law_keywords = ['kyoto protocol']
-                            else:
-                                law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                            for kw in law_keywords:
-                                if ' ' in kw:
-                                    if len(re.findall(kw, policy_content)) > 0:
-                                        law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-                                else:
-                                    if kw in policy_content.split(" "):
-                                        law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-
-                        if not break_judge:
-                            law_strategy_list[num] = "Steering Instruments"
-                            break_judge = True
-                            break
+        if law is None and law_keywords.steering_decisional.found(policy, title_words):
+            law = DECISIONAL if regulation_type or law_keywords.hard_content_kyoto.found(policy_content,
+                                                                                          content_words) \
+                else STEERING
 
         # Type in IEA is not very accurate
-        if not break_judge:
+        if law is None:
             if any([i in row["Type"] for i in
                     ['Long-term low emissions development strategy (LT-LEDS)', 'Nationally Determined Contribution',
                      'Major infrastructure plan', 'Technology roadmaps', 'Urban planning', 'Strategic plans',
                      'Public voluntary programmes']]):
-                law_strategy_list[num] = "Preparatory Instruments"
+                law = "Preparatory Instruments"
             elif any([i in row["Type"] for i in
                       ['Negotiated agreements (public-private sector)', 'Unilateral commitments (private sector)',
                        'Government provided advice', 'International collaboration']]):
-                law_strategy_list[num] = "Steering Instruments"
+                law = "Steering Instruments"
             elif any([i in row["Type"] for i in
                       ['Sustainable finance frameworks', 'Framework legislation']]):
-                law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
+                law = "Decisional Guidelines, Codes and Frameworks"
             elif any([i in row["Type"] for i in
                       ['Building code (Prescriptive)', 'Building codes (performance-based)',
                        'Sectoral standards', 'Building codes and standards', 'Codes and standards',
                        'Product-based MEPS', 'Minimum energy performance standards',
                        'Prescriptive requirements and standards', 'Safety standards', 'Emission standards',
                        'Fuel quality standards']]):
-                if any([i in row["Type"] for i in
-                        ['Market design rules', 'Energy market regulation',
-                         'Energy trading regulations', 'Regulation']]):
-                    law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                else:
-                    for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                    'Decree/Order/Ordinance', 'Regulation/Directive/Decision']:
-                        if break_judge:
-                            break
-                        law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                        for keyword in law_keywords:
-                            if ' ' in keyword:
-                                if len(re.findall(keyword, policy_content)) > 0:
-                                    law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                    break_judge = True
-                                    break
-                            else:
-                                if keyword in policy_content.split(" "):
-                                    law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                    break_judge = True
-                                    break
-
-                    if not break_judge:
-                        law_strategy_list[num] = "Steering Instruments"
+                law = DECISIONAL if regulation_type or law_keywords.hard_content.found(policy_content,
+                                                                                        content_words) \
+                    else STEERING
             elif any([i in row["Type"] for i in
                       ['Information campaigns', 'Public information', 'Consumer information']]):
-                law_strategy_list[num] = "Informative Instruments"
+                law = "Informative Instruments"
 
             # elif row["Type"] in \
             #         ['Procedural requirements', 'Rights', 'Pollution liability', 'finance and taxation',
@@ -559,111 +223,23 @@ def iea_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
             #          'Loan guarantee', 'Education and training']:
             #     law_strategy_list[num] = "Steering Instruments"
 
+            # Soft Law use Policy Content
+            elif law_keywords.steering_decisional_all.found(policy_content, content_words):
+                law = DECISIONAL if regulation_type or law_keywords.hard_content_kyoto.found(policy_content,
+                                                                                              content_words) \
+                    else STEERING
             else:
-                # Soft Law use Policy Content
-                for softlaw in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks",
-                                "Decisional Notices and Communications", "Preparatory Instruments",
-                                "Informative Instruments", "Interpretative Communications and Notices"]:
-                    if break_judge:
-                        break
-
-                    if softlaw in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks"]:
-                        if break_judge:
-                            break
-                        softlaw_content_keywords = soft_hard_law_content_dict[softlaw].lower().split(';') + \
-                                                   soft_hard_law_title_dict[softlaw].lower().split(';')
-                        for keyword in softlaw_content_keywords:
-                            if ' ' in keyword:
-                                if len(re.findall(keyword, policy_content)) > 0:
-                                    if any([i in row["Type"] for i in
-                                            ['Market design rules', 'Energy market regulation',
-                                             'Energy trading regulations', 'Regulation']]):
-                                        law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-                                    for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                    'Decree/Order/Ordinance', 'Regulation/Directive/Decision',
-                                                    'Kyoto protocol']:
-                                        if break_judge:
-                                            break
-                                        if hardlaw == 'Kyoto protocol':
-                                            law_keywords = ['kyoto protocol']
-                                        else:
-                                            law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                        for kw in law_keywords:
-                                            if ' ' in kw:
-                                                if len(re.findall(kw, policy_content)) > 0:
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-                                            else:
-                                                if kw in policy_content.split(" "):
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-
-                                    if not break_judge:
-                                        law_strategy_list[num] = "Steering Instruments"
-                                        break_judge = True
-                                        break
-                            else:
-                                if keyword in policy_content.split(" "):
-                                    if any([i in row["Type"] for i in
-                                            ['Market design rules', 'Energy market regulation',
-                                             'Energy trading regulations', 'Regulation']]):
-                                        law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-                                    for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                    'Decree/Order/Ordinance', 'Regulation/Directive/Decision',
-                                                    'Kyoto protocol']:
-                                        if break_judge:
-                                            break
-                                        if hardlaw == 'Kyoto protocol':
-                                            law_keywords = ['kyoto protocol']
-                                        else:
-                                            law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                        for kw in law_keywords:
-                                            if ' ' in kw:
-                                                if len(re.findall(kw, policy_content)) > 0:
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-                                            else:
-                                                if kw in policy_content.split(" "):
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-
-                                    if not break_judge:
-                                        law_strategy_list[num] = "Steering Instruments"
-                                        break_judge = True
-                                        break
-                    else:
-                        softlaw_content_keywords = soft_hard_law_content_dict[softlaw].lower().split(';')
-                        for keyword in softlaw_content_keywords:
-                            if ' ' in keyword:
-                                if len(re.findall(keyword, policy_content)) > 0:
-                                    law_strategy_list[num] = softlaw
-                                    break_judge = True
-                                    break
-                            else:
-                                if keyword in policy_content.split(" "):
-                                    law_strategy_list[num] = softlaw
-                                    break_judge = True
-                                    break
+                law = law_keywords.content_law(CONTENT_SOFT_LAWS, policy_content, content_words)
+
+        if law is not None:
+            law_strategy_list[num] = law
 
     iea_df["law or strategy"] = law_strategy_list
     iea_df["Policy Type"] = policy_type_list
-    save(iea_df, "iea")
+    return iea_df
 
 
-def cp_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
-    cp_df = get_cp_data()
+def cp_law_process(cp_df, law_keywords):
     cp_df["Policy name"].fillna("", inplace=True)
     cp_df["Policy description"].fillna("", inplace=True)
     cp_df["Type of policy instrument"].fillna("", inplace=True)
@@ -672,35 +248,16 @@ def cp_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
 
     for num, row in cp_df.iterrows():
         # Title
-        policy = row["Policy name"].lower(). \
-            replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-            replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
+        policy = clean_text(row["Policy name"])
+        title_words = set(policy.split(" "))
         # Content
-        policy_content = row["Policy description"].lower(). \
-            replace("(", ' ').replace(")", ' ').replace(",", ' ').replace("\"", ' ').replace("'", ' '). \
-            replace(".", ' ').replace(";", ' ').replace("-", ' ').replace(":", ' ').replace("/", ' ')
-
-        break_judge = False
-        for hardlaw in ['Constitution', 'International Law', 'Law/Act', 'Decree/Order/Ordinance',
-                        'Regulation/Directive/Decision']:
-            if break_judge:
-                break
-            law_keywords = soft_hard_law_title_dict[hardlaw].lower().split(';')
-            for keyword in law_keywords:
-                if ' ' in keyword:
-                    if len(re.findall(keyword, policy)) > 0:
-                        law_strategy_list[num] = hardlaw
-                        if hardlaw in ['Constitution', 'International Law', 'Law/Act']:
-                            policy_type_list[num] = "legislative"
-                        break_judge = True
-                        break
-                else:
-                    if keyword in policy.split(" "):
-                        law_strategy_list[num] = hardlaw
-                        if hardlaw in ['Constitution', 'International Law', 'Law/Act']:
-                            policy_type_list[num] = "legislative"
-                        break_judge = True
-                        break
+        policy_content = clean_text(row["Policy description"])
+        content_words = set(policy_content.split(" "))
+
+        law = law_keywords.title_law(HARD_LAWS + ["Decisional Notices and Communications",
+                                                  "Interpretative Communications and Notices"], policy, title_words)
+        if law in LEGISLATIVE_LAWS:
+            policy_type_list[num] = "legislative"
 
         # if any([i in row["Type of policy instrument"] for i in
         #         ['Formal & legally binding GHG reduction target',
@@ -710,160 +267,33 @@ def cp_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
         #     law_strategy_list[num] = "Hard Law"
         #     break_judge = True
 
-        if not break_judge:
-            for softlaw in ["Decisional Notices and Communications", "Interpretative Communications and Notices"]:
-                if break_judge:
-                    break
-                softlaw_keywords = soft_hard_law_title_dict[softlaw].lower().split(';')
-                for keyword in softlaw_keywords:
-                    if ' ' in keyword:
-                        if len(re.findall(keyword, policy)) > 0:
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-                    else:
-                        if keyword in policy.split(" "):
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-
         # hard law "this"/"the" in policy content
-        for hl_this in ['Law/Act', 'Decree/Order/Ordinance', 'Regulation/Directive/Decision']:
-            if break_judge:
-                break
-            if hl_this == 'Law/Act':
-                for i in 'Law/Act/Legislation'.lower().split("/"):
-                    if (("the" + " " + i + " ") in policy_content) or (("this" + " " + i + " ") in policy_content):
-                        law_strategy_list[num] = hl_this
-                        policy_type_list[num] = "legislative"
-                        break_judge = True
-                        break
-            else:
-                for i in hl_this.lower().split("/"):
-                    if (("the" + " " + i + " ") in policy_content) or (("this" + " " + i + " ") in policy_content):
-                        law_strategy_list[num] = hl_this
-                        break_judge = True
-                        break
-
-        if not break_judge:
-            for softlaw in ["Steering Instruments", "Preparatory Instruments",
-                            "Decisional Guidelines, Codes and Frameworks", "Informative Instruments"]:
-                if break_judge:
-                    break
-                softlaw_keywords = soft_hard_law_title_dict[softlaw].lower().split(';')
-                for keyword in softlaw_keywords:
-                    if ' ' in keyword:
-                        if len(re.findall(keyword, policy)) > 0:
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-                    else:
-                        if keyword in policy.split(" "):
-                            law_strategy_list[num] = softlaw
-                            break_judge = True
-                            break
-            if not break_judge:
-                if len(re.findall(r'(?:19|20)\d{2}\s*-\s*(?:19|20)\d{2}\s*', row["Policy name"].lower())) > 0:
-                    law_strategy_list[num] = "Preparatory Instruments"
-                elif len(re.findall(r'(?:19|20)\d{2}/\d{2}\s*-\s*(?:19|20)\d{2}/\d{2}\s*',
-                                    row["Policy name"].lower())) > 0:
-                    law_strategy_list[num] = "Preparatory Instruments"
-                # elif "strategy" in row["Title"].lower():
-                #     law_strategy_list[num] = "Preparatory Instruments"
-                # elif ("aim" in row["Description"].lower()) or ("seek" in row["Description"].lower()) or (
-                #         "vision" in row["Description"].lower()):
-                #     law_strategy_list[num] = "Preparatory Instruments"
+        if law is None:
+            law = this_law(policy_content)
+            if law == 'Law/Act':
+                policy_type_list[num] = "legislative"
+
+        if law is None:
+            law = law_keywords.title_law(["Steering Instruments", "Preparatory Instruments",
+                                          "Decisional Guidelines, Codes and Frameworks", "Informative Instruments"],
+                                         policy, title_words)
+            if law is None and year_range(row["Policy name"]):
+                # Still open to the checks below
+                law_strategy_list[num] = "Preparatory Instruments"
 
         # distinct: Steering Instruments, Decisional Guidelines, Codes and Frameworks
         # judgement: connection to existing Community law
-        for strdcs in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks"]:
-            if break_judge:
-                break
-            softlaw_content_keywords = soft_hard_law_content_dict[strdcs].lower().split(';')
-            for keyword in softlaw_content_keywords:
-                if break_judge:
-                    break
-                if ' ' in keyword:
-                    if len(re.findall(keyword, policy)) > 0:
-                        for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                        'Decree/Order/Ordinance', 'Regulation/Directive/Decision', 'Kyoto protocol']:
-                            if break_judge:
-                                break
-                            if hardlaw == 'Kyoto protocol':
-                                law_keywords = ['kyoto protocol']
-                            else:
-                                law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                            for keyword in law_keywords:
-                                if ' ' in keyword:
-                                    if len(re.findall(keyword, policy_content)) > 0:
-                                        law_strategy_list[
-                                            num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-                                else:
-                                    if keyword in policy_content.split(" "):
-                                        law_strategy_list[
-                                            num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-
-                        if not break_judge:
-                            law_strategy_list[num] = "Steering Instruments"
-                            break_judge = True
-                            break
-                else:
-                    if keyword in policy_content.split(" "):
-                        for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                        'Decree/Order/Ordinance', 'Regulation/Directive/Decision', 'Kyoto protocol']:
-                            if break_judge:
-                                break
-                            if hardlaw == 'Kyoto protocol':
-                                law_keywords = ['kyoto protocol']
-                            else:
-                                law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                            for keyword in law_keywords:
-                                if ' ' in keyword:
-                                    if len(re.findall(keyword, policy_content)) > 0:
-                                        law_strategy_list[
-                                            num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-                                else:
-                                    if keyword in policy_content.split(" "):
-                                        law_strategy_list[
-                                            num] = "Decisional Guidelines, Codes and Frameworks"
-                                        break_judge = True
-                                        break
-
-                        if not break_judge:
-                            law_strategy_list[num] = "Steering Instruments"
-                            break_judge = True
-                            break
-
-        if not break_judge:
+        # (multi-word keywords are looked up in the title, single words in the content)
+        if law is None and (law_keywords.steering_decisional.in_text(policy) or
+                            law_keywords.steering_decisional.in_words(content_words)):
+            law = DECISIONAL if law_keywords.hard_content_kyoto.found(policy_content, content_words) else STEERING
+
+        if law is None:
             if any([i in row["Type of policy instrument"] for i in
                     ['Codes and standards', 'Sectoral standards', 'Product standards', 'Building codes and standards',
                      'Industrial air pollution standards', 'Vehicle fuel-economy and emissions standards',
                      'Vehicle air pollution standards', 'Performance label', 'Comparison label']]):
-                for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                'Decree/Order/Ordinance', 'Regulation/Directive/Decision']:
-                    if break_judge:
-                        break
-                    law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                    for keyword in law_keywords:
-                        if ' ' in keyword:
-                            if len(re.findall(keyword, policy_content)) > 0:
-                                law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                break_judge = True
-                                break
-                        else:
-                            if keyword in policy_content.split(" "):
-                                law_strategy_list[num] = "Decisional Guidelines, Codes and Frameworks"
-                                break_judge = True
-                                break
-
-                if not break_judge:
-                    law_strategy_list[num] = "Steering Instruments"
+                law = DECISIONAL if law_keywords.hard_content.found(policy_content, content_words) else STEERING
 
             # elif any([i in row["Type of policy instrument"] for i in
             #           ['Procurement rules', 'Energy and other taxes', 'Regulatory Instruments', 'User charges',
@@ -875,7 +305,7 @@ def cp_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
                        'Obligation schemes', 'Political & non-binding GHG reduction target', 'Research programme',
                        'Political & non-binding renewable energy target',
                        'Political & non-binding energy efficiency target', 'Tendering schemes']]):
-                law_strategy_list[num] = "Preparatory Instruments"
+                law = "Preparatory Instruments"
             # elif any([i in row["Type of policy instrument"] for i in
             #           ['Grants and subsidies', 'Economic instruments', 'RD&D funding', 'Tax relief',
             #            'Retirement premium', 'Feed-in tariffs or premiums', 'Advice or aid in implementation',
@@ -887,102 +317,29 @@ def cp_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict):
             elif any([i in row["Type of policy instrument"] for i in
                       ['Negotiated agreements (public-private sector)', 'Demonstration project',
                        'Unilateral commitments (private sector)', 'Voluntary approaches']]):
-                law_strategy_list[num] = "Steering Instruments"
+                law = "Steering Instruments"
             elif any([i in row["Type of policy instrument"] for i in
                       ['Information provision', 'Information and education']]):
-                law_strategy_list[num] = "Informative Instruments"
+                law = "Informative Instruments"
+            # Soft Law use Policy Content
+            elif law_keywords.steering_decisional_all.found(policy_content, content_words):
+                law = DECISIONAL if law_keywords.hard_content_kyoto.found(policy_content, content_words) \
+                    else STEERING
             else:
-                # Soft Law use Policy Content
-                for softlaw in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks",
-                                "Decisional Notices and Communications", "Preparatory Instruments",
-                                "Informative Instruments", "Interpretative Communications and Notices"]:
-                    if break_judge:
-                        break
-
-                    if softlaw in ["Steering Instruments", "Decisional Guidelines, Codes and Frameworks"]:
-                        softlaw_content_keywords = soft_hard_law_content_dict[softlaw].lower().split(';') + \
-                                                   soft_hard_law_title_dict[softlaw].lower().split(';')
-                        for keyword in softlaw_content_keywords:
-                            if ' ' in keyword:
-                                if len(re.findall(keyword, policy_content)) > 0:
-                                    for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                    'Decree/Order/Ordinance', 'Regulation/Directive/Decision',
-                                                    'Kyoto protocol']:
-                                        if break_judge:
-                                            break
-                                        if hardlaw == 'Kyoto protocol':
-                                            law_keywords = ['kyoto protocol']
-                                        else:
-                                            law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                        for kw in law_keywords:
-                                            if ' ' in kw:
-                                                if len(re.findall(kw, policy_content)) > 0:
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-                                            else:
-                                                if kw in policy_content.split(" "):
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-
-                                    if not break_judge:
-                                        law_strategy_list[num] = "Steering Instruments"
-                                        break_judge = True
-                                        break
-                            else:
-                                if keyword in policy_content.split(" "):
-                                    for hardlaw in ['Constitution', 'International Law', 'Law/Act',
-                                                    'Decree/Order/Ordinance', 'Regulation/Directive/Decision',
-                                                    'Kyoto protocol']:
-                                        if break_judge:
-                                            break
-                                        if hardlaw == 'Kyoto protocol':
-                                            law_keywords = ['kyoto protocol']
-                                        else:
-                                            law_keywords = soft_hard_law_content_dict[hardlaw].lower().split(';')
-                                        for kw in law_keywords:
-                                            if ' ' in kw:
-                                                if len(re.findall(kw, policy_content)) > 0:
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-                                            else:
-                                                if kw in policy_content.split(" "):
-                                                    law_strategy_list[
-                                                        num] = "Decisional Guidelines, Codes and Frameworks"
-                                                    break_judge = True
-                                                    break
-
-                                    if not break_judge:
-                                        law_strategy_list[num] = "Steering Instruments"
-                                        break_judge = True
-                                        break
-                    else:
-                        softlaw_content_keywords = soft_hard_law_content_dict[softlaw].lower().split(';')
-                        for keyword in softlaw_content_keywords:
-                            if ' ' in keyword:
-                                if len(re.findall(keyword, policy_content)) > 0:
-                                    law_strategy_list[num] = softlaw
-                                    break_judge = True
-                                    break
-                            else:
-                                if keyword in policy_content.split(" "):
-                                    law_strategy_list[num] = softlaw
-                                    break_judge = True
-                                    break
+                law = law_keywords.content_law(CONTENT_SOFT_LAWS, policy_content, content_words)
+
+        if law is not None:
+            law_strategy_list[num] = law
 
     cp_df["law or strategy"] = law_strategy_list
     cp_df["Policy Type"] = policy_type_list
-    save(cp_df, "cp")
+    return cp_df
 
 
 if __name__ == '__main__':
-    soft_hard_law_title_dict, soft_hard_law_content_dict = get_dict()
+    # Keyword lists compiled once for all three databases
+    law_keywords = LawKeywords(*get_dict())
 
-    lse_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict)
-    iea_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict)
-    cp_law_process(soft_hard_law_title_dict, soft_hard_law_content_dict)
+    save(lse_law_process(get_lse_data(), law_keywords), "lse")
+    save(iea_law_process(get_iea_data(), law_keywords), "iea")
+    save(cp_law_process(get_cp_data(), law_keywords), "cp")
@@ -4,8 +4,15 @@ import numpy as np
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dict_mapping import ITEM, map_field, lookup_values, explode_field
+
 print("================== {} ==================".format(os.path.basename(sys.argv[0])))
 
+# LSE sectors mapped to objectives
+SECTOR_OBJECTIVES = {'Health': ['Social', 'Social:Health impact'], 'Social development': ['Social', ''],
+                     'Environment': ['Environmental', '']}
+
 
 def get_data():
     data = pd.read_excel("lse_sector_region_instrument_annex_result.xlsx")
@@ -23,78 +30,14 @@ def save(result):
         result.to_excel(writer, index=False)
 
 
-if __name__ == '__main__':
-    df = get_data()
-    map_dict = get_dict()
-
-    df["Keywords temp"] = df["Keywords"]
-    df["Keywords temp"].fillna("", inplace=True)
-    df["Keywords temp"] = df["Keywords temp"].apply(
-        lambda x: x.strip().replace(";  ", ';').replace("; ", ';').split(';') if len(x) > 0 else x)
-
-    df["Sectors"].fillna("", inplace=True)
-    df["Sectors"] = df["Sectors"].apply(lambda x: x.strip().split(";") if len(x) > 0 else x)
-
-    objective = []
-    subobjective = []
-
-    for num, row in df.iterrows():
-        if not row["Keywords temp"]:
-            objective_inner = []
-            subobjective_inner = []
-            if 'Health' in row["Sectors"]:
-                objective_inner.append('Social')
-                subobjective_inner.append('Social:Health impact')
-            if 'Social development' in row["Sectors"]:
-                objective_inner.append('Social')
-            if 'Environment' in row["Sectors"]:
-                objective_inner.append('Environmental')
+def data_process(df, map_dict):
+    # Objectives implied by the LSE sectors, whichever keywords the policy has
+    sectors = explode_field(df["Sectors"].fillna("").str.strip(), ";", strip=False)
+    sector_objectives = lookup_values(sectors[sectors[ITEM].isin(SECTOR_OBJECTIVES.keys())], SECTOR_OBJECTIVES)
+    df["objective"], df["subobjective"] = map_field(df["Keywords"], map_dict, ";", strict=False,
+                                                    extra=sector_objectives)
+    return df
 
-            if objective_inner:
-                objective_inner_temp = set(";".join(set(objective_inner)).split(';'))
-                objective_inner_temp.discard("")
-                objective.append(";".join(objective_inner_temp))
-            else:
-                objective.append("")
 
-            if subobjective_inner:
-                subobjective_inner_temp = set(";".join(set(subobjective_inner)).split(';'))
-                subobjective_inner_temp.discard("")
-                subobjective.append(";".join(subobjective_inner_temp))
-            else:
-                subobjective.append("")
-
-        else:
-            objective_inner = []
-            subobjective_inner = []
-            if 'Health' in row["Sectors"]:
-                objective_inner.append('Social')
-                subobjective_inner.append('Social:Health impact')
-            if 'Social development' in row["Sectors"]:
-                objective_inner.append('Social')
-            if 'Environment' in row["Sectors"]:
-                objective_inner.append('Environmental')
-
-            for i in row["Keywords temp"]:
-                try:
-                    if map_dict[i.strip()][0]:
-                        objective_inner.append(map_dict[i.strip()][0])
-                        if map_dict[i.strip()][1]:
-                            subobjective_inner.append(map_dict[i.strip()][1])
-                except KeyError as e:
-                    print(e)
-
-            objective_inner_temp = set(";".join(set(objective_inner)).split(';'))
-            objective_inner_temp.discard("")
-            subobjective_inner_temp = set(";".join(set(subobjective_inner)).split(';'))
-            subobjective_inner_temp.discard("")
-            objective.append(";".join(objective_inner_temp))
-            subobjective.append(";".join(subobjective_inner_temp))
-
-            # objective.append(";".join(set(objective_inner)))
-            # subobjective.append(";".join(set(subobjective_inner)))
-
-    df["objective"] = objective
-    df["subobjective"] = subobjective
-    df.drop(['Keywords temp'], axis=1, inplace=True)
-    save(df)
+if __name__ == '__main__':
+    save(data_process(get_data(), get_dict()))
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# Dedup of the raw IEA / Climate Policy records (iea_dedup.py, cp_dedup.py and their _learn_more variants).
+# Rows sharing the key columns become one row with the first row's other columns and the union of the rows'
+# multi-valued fields. The keys are hashed once into integer group codes; every merged field is then stacked into
+# one long (field, group, value) frame, deduplicated, and collected in a single pass, instead of one groupby per
+# field concatenating and re-splitting a string per group.
+
+
+def merge_duplicates(df, keys, columns, text_columns=()):
+    # One row per key combination, sorted by the keys; rows with a missing key are dropped, as groupby drops them.
+    # Columns: keys, then columns, then the rest of df's columns. Each of columns becomes the distinct
+    # ";"-separated values of its group joined with ";", text_columns the distinct whole values joined with "\n".
+    # Values keep the order they first appear in.
+    group = df.groupby(keys, sort=True, dropna=True).ngroup().to_numpy()
+    rows = np.flatnonzero(group >= 0)
+    codes, first = np.unique(group[rows], return_index=True)
+    first_rows = df.iloc[rows[first]].reset_index(drop=True)
+
+    parts = []
+    for column in columns:
+        values = pd.DataFrame({"field": column, "group": group[rows], "value": df[column].to_numpy()[rows]})
+        values = values.dropna(subset=["value"])
+        values["value"] = values["value"].astype(str)
+        if column not in text_columns:
+            values["value"] = values["value"].str.split(";")
+            values = values.explode("value")
+        parts.append(values)
+    values = pd.concat(parts, ignore_index=True)
+    values = values[values["value"] != ""].drop_duplicates()
+    merged = {}
+    for field, code, value in zip(values["field"], values["group"], values["value"]):
+        merged.setdefault((field, code), []).append(value)
+
+    result = first_rows[keys].copy()
+    for column in columns:
+        sep = "\n" if column in text_columns else ";"
+        result[column] = [sep.join(merged.get((column, code), ())) for code in codes]
+    others = [column for column in df.columns if column not in keys and column not in columns]
+    return pd.concat([result, first_rows[others]], axis=1)
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import pickle
+import pandas as pd
+
+# Compiled cache of the reference workbooks (Countries_Code, Aggregates_Code, Region, Annex, policy_db_complete).
+# Each artifact is rebuilt only when one of its source workbooks changes (mtime/size, then content hash).
+
+CACHE_VERSION = 1
+CACHE_DIR = ".reference_cache"
+
+# Country spellings used by IEA/CP/LSE/ECOLEX that Region.xlsx does not list
+REGION_EXTRA_COUNTRIES = {
+    "North America": ["United States"],
+    "Europe": ["United Kingdom", "Czech Republic", "Bosnia And Herzegovina", "Slovak Republic", "Kosovo"],
+    "Asia-Pacific Developed": ["New Zealand", "Australia"],
+    "Eurasia": ["Republic Of Moldova", "Moldova, Republic of", "Moldova",
+                "North Macedonia (Republic of North Macedonia)", "Russia",
+                "Macedonia, the former Yugoslav Republic of"],
+    "Latin America and Caribbean": ["Plurinational State Of Bolivia", "Bolivarian Republic Of Venezuela",
+                                    "Antigua And Barbuda", "Saint Vincent And The Grenadines", "Bahamas, The",
+                                    "Bolivia", "Venezuela", "Venezuela, Bolivarian Republic of",
+                                    "Bolivia, Plurinational State of"],
+    "Africa": ["Republic Of The Congo", "Democratic Republic Of The Congo", "Democratic Republic of Congo",
+               "Congo, the Democratic Republic of the", "United Republic Of Tanzania",
+               "Tanzania, United Republic of", "Cape Verde", "Libyan Arab Jamahiriya"],
+    "Middle East": ["Islamic Republic Of Iran", "Iran", "Syria"],
+    "Eastern Asia": ["Korea", "Korea, North", "South Korea", "Republic of Korea",
+                     "Democratic People's Republic of Korea", "People's Republic Of China", "Chinese Taipei",
+                     "Taiwan"],
+    "Southern Asia": ["India", "Sri Lanka"],
+    "South-East Asia and developing Pacific": ["Micronesia (Federated States Of)", "Micronesia",
+                                               "Micronesia, Federated States of", "Vietnam"],
+}
+
+# ISO codes missing from the IPCC_Region column of policy_db_complete.xlsx
+ISO_REGION_EXTRA = {
+    'ASM': 'South-East Asia and developing Pacific',
+    'GUM': 'South-East Asia and developing Pacific',
+    'MNP': 'South-East Asia and developing Pacific',
+    'NCL': 'South-East Asia and developing Pacific',
+    'COM': 'Africa',
+}
+
+
+def file_digest(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def cached_reference(name, sources, build, path="."):
+    # Return build(path), reusing <path>/.reference_cache/<name>.pkl while the sources are unchanged
+    path = os.path.abspath(path)
+    cache_file = os.path.join(path, CACHE_DIR, "{}.pkl".format(name))
+    source_files = [os.path.join(path, source) for source in sources]
+    stats = {}
+    for source, source_file in zip(sources, source_files):
+        stat = os.stat(source_file)
+        stats[source] = (stat.st_mtime_ns, stat.st_size)
+
+    digests = None
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            meta = pickle.load(f)
+            if meta["version"] == CACHE_VERSION and meta["sources"] == sources:
+                if meta["stats"] == stats:
+                    return pickle.load(f)
+                # Touched but maybe not modified: compare content hashes before rebuilding
+                digests = {source: file_digest(source_file) for source, source_file in zip(sources, source_files)}
+                if meta["digests"] == digests:
+                    value = pickle.load(f)
+                    _write_cache(cache_file, sources, stats, digests, value)
+                    return value
+
+    value = build(path)
+    if digests is None:
+        digests = {source: file_digest(source_file) for source, source_file in zip(sources, source_files)}
+    _write_cache(cache_file, sources, stats, digests, value)
+    return value
+
+
+def _write_cache(cache_file, sources, stats, digests, value):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+    with open(tmp_file, "wb") as f:
+        pickle.dump({"version": CACHE_VERSION, "sources": sources, "stats": stats, "digests": digests}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+def load_country_codes(path="."):
+    return cached_reference(
+        "countries_code", ["Countries_Code.xlsx"],
+        lambda p: pd.read_excel(os.path.join(p, "Countries_Code.xlsx")), path)
+
+
+def load_aggregates_codes(path="."):
+    return cached_reference(
+        "aggregates_code", ["Aggregates_Code.xlsx"],
+        lambda p: pd.read_excel(os.path.join(p, "Aggregates_Code.xlsx")), path)
+
+
+def build_region_dict(path):
+    region_df = pd.read_excel(os.path.join(path, "Region.xlsx"))
+    region_dict = {}
+    for region, countries in zip(region_df["Regions"], region_df["Countries"]):
+        countries = [i.strip() for i in countries.replace(" (the)", "").split(",")]
+        countries += REGION_EXTRA_COUNTRIES.get(region, [])
+        # Country:Region dict
+        for country in countries:
+            region_dict[country] = region
+    return region_dict
+
+
+def load_region_dict(path="."):
+    return cached_reference("region", ["Region.xlsx"], build_region_dict, path)
+
+
+def build_annex_iso_list(path):
+    country_df = pd.read_excel(os.path.join(path, "Countries_Code.xlsx"))
+    annex_df = pd.read_excel(os.path.join(path, "Annex.xlsx"))
+    country_sname_dict = {s_name.lower(): code for s_name, code in zip(country_df["Short Name"], country_df["Code"])}
+    country_lname_dict = {l_name.lower(): code for l_name, code in zip(country_df["Long Name"], country_df["Code"])}
+
+    annex_data = []
+    for country in annex_df["Annex I"]:
+        country = country.strip().lower()
+        if country == "european union":
+            annex_data.append("EUU")
+        elif country in country_lname_dict:
+            annex_data.append(country_lname_dict[country])
+        elif country in country_sname_dict:
+            annex_data.append(country_sname_dict[country])
+        else:
+            annex_data.append("")
+    return annex_data
+
+
+def load_annex_iso_list(path="."):
+    return cached_reference("annex", ["Annex.xlsx", "Countries_Code.xlsx"], build_annex_iso_list, path)
+
+
+def build_iso_region_dict(path):
+    data = pd.read_excel(os.path.join(path, "policy_db_complete.xlsx"))
+    # ISO:Region dict
+    iso_region_dict = dict(zip(data["ISO_code"], data["IPCC_Region"]))
+    iso_region_dict.update(ISO_REGION_EXTRA)
+    return iso_region_dict
+
+
+def load_iso_region_dict(path="."):
+    return cached_reference("iso_region", ["policy_db_complete.xlsx"], build_iso_region_dict, path)
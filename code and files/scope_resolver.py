@@ -0,0 +1,92 @@
+from collections import Counter
+from spacy.util import is_package
+from ner_pipeline import pipe_entities, gpe_mentions, scope_from_mentions, BATCH_SIZE, N_PROCESS
+
+# Tiered National/SubNational/International resolver for national_city_ner / ner_validation.
+# Only GPE entities whose text is a gazetteer city/country count towards the scope, so:
+#   1. gazetteer: text without any gazetteer name can't contribute a mention -> no model at all
+#   2. fast model: en_core_web_sm GPEs; kept when they name the same cities/countries as the gazetteer
+#   3. transformer: en_core_web_trf only for texts where the two disagree (ambiguous names like "Nice")
+
+FAST_MODEL = "en_core_web_sm"
+GAZETTEER = "gazetteer"
+FAST = "fast"
+TRANSFORMER = "transformer"
+
+
+def gazetteer_mentions(text, gazetteer, city_first=False, citi=None, country=None):
+    # Treat every gazetteer match as a GPE entity
+    entities = [(start, end, 'GPE') for start, end, _, _ in gazetteer.find_gpe(text)]
+    return gpe_mentions(text, entities, gazetteer, city_first, citi, country)
+
+
+class ScopeResolver:
+    def __init__(self, gazetteer, cascade=True, fast_model=FAST_MODEL, batch_size=BATCH_SIZE, n_process=N_PROCESS,
+                 cache=True):
+        self.gazetteer = gazetteer
+        self.cascade = cascade
+        self.fast_model = fast_model if cascade and fast_model and is_package(fast_model) else None
+        if cascade and fast_model and self.fast_model is None:
+            print("{} is not installed, ambiguous texts go straight to the transformer".format(fast_model))
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.cache = cache
+        self.tiers = Counter()
+
+    def mentions(self, texts, priors, city_first=False, desc="Scope NER"):
+        # (citi, country) per text, extending a copy of the matching prior mention lists
+        results = [None] * len(texts)
+        escalate = []
+        fast = []
+        for i, text in enumerate(texts):
+            text = text if isinstance(text, str) else ""
+            if not self.cascade:
+                escalate.append(i)
+            elif not self.gazetteer.find_gpe(text):
+                results[i] = (list(priors[i][0]), list(priors[i][1]))
+                self.tiers[GAZETTEER] += 1
+            else:
+                fast.append(i)
+
+        if self.fast_model is not None and fast:
+            fast_ents = pipe_entities([texts[i] for i in fast], batch_size=self.batch_size, n_process=self.n_process,
+                                      desc="{} ({})".format(desc, FAST), cache=self.cache, model=self.fast_model)
+            for i, ents in zip(fast, fast_ents):
+                citi, country = gpe_mentions(texts[i], ents, self.gazetteer, city_first, *map(list, priors[i]))
+                gz_citi, gz_country = gazetteer_mentions(texts[i], self.gazetteer, city_first, *map(list, priors[i]))
+                if set(citi) == set(gz_citi) and set(country) == set(gz_country):
+                    results[i] = (citi, country)
+                    self.tiers[FAST] += 1
+                else:
+                    escalate.append(i)
+        else:
+            escalate += fast
+
+        if escalate:
+            escalate.sort()
+            trf_ents = pipe_entities([texts[i] for i in escalate], batch_size=self.batch_size,
+                                     n_process=self.n_process, desc="{} ({})".format(desc, TRANSFORMER),
+                                     cache=self.cache)
+            for i, ents in zip(escalate, trf_ents):
+                results[i] = gpe_mentions(texts[i], ents, self.gazetteer, city_first, *map(list, priors[i]))
+            self.tiers[TRANSFORMER] += len(escalate)
+        return results
+
+    def resolve(self, titles, contents):
+        # Scope per row, or None where neither title nor content changes it; content only for undecided rows
+        scopes = [None] * len(titles)
+        title_mentions = self.mentions(titles, [([], [])] * len(titles), desc="Scope NER (title)")
+        unresolved = []
+        for i, (citi, country) in enumerate(title_mentions):
+            scopes[i] = scope_from_mentions(citi, country)
+            if scopes[i] is None:
+                unresolved.append(i)
+
+        content_mentions = self.mentions([contents[i] for i in unresolved],
+                                         [title_mentions[i] for i in unresolved], True, desc="Scope NER (content)")
+        for i, (citi, country) in zip(unresolved, content_mentions):
+            scopes[i] = scope_from_mentions(citi, country)
+
+        print("Scope tiers: {}".format(", ".join("{} {}".format(tier, self.tiers[tier])
+                                                 for tier in [GAZETTEER, FAST, TRANSFORMER])))
+        return scopes
@@ -0,0 +1,270 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from functools import lru_cache
+from multiprocessing import Pool
+import pandas as pd
+from tqdm import tqdm
+from nltk import data
+from nltk.tokenize import word_tokenize
+from nltk import pos_tag
+from nltk.tag import PerceptronTagger
+from nltk.stem import WordNetLemmatizer
+
+# Shared normalize() for BM25 dedup, the topic preprocessors and the classifier data prep:
+# years/percentages out, lowercase, tokenize, drop stopwords, lemmatize.
+# Stopwords are a frozenset, the patterns are compiled and the POS tagger is loaded once per process.
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+STOPWORDS_FILE = os.path.join(CODE_DIR, "data", "stopwords.txt")
+data.path.append(os.path.join(CODE_DIR, "data", "nltk_data"))
+
+# 1991-2007, 2025, 2.5%
+YEAR_PERCENT_PATTERN = re.compile(r'(\d{4}(-\d{4})?)|([-+]?\d+(.\d+)?%)')
+# Fast tokenizer, close to word_tokenize on policy text: grouped numbers (1,000.5), possessives ('s),
+# words joined by "-", "." or "/", otherwise one token per symbol
+FAST_TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)*|'\w+|\w+(?:[-./]\w+)*|[^\w\s]")
+
+# Penn Treebank tag prefix ==> WordNet POS; other tags keep the word as is
+COARSE_POS = (('NN', 'n'), ('VB', 'v'), ('JJ', 'a'), ('R', 'r'))
+# (token, coarse POS) lemmas kept per process; the policy vocabulary is small and very repetitive
+LEMMA_CACHE_SIZE = 200000
+
+
+class Replacer:
+    # An ordered list of replacements: a str rule is a str.replace, a compiled regex a re.sub.
+    # Rules run one after another, each on the previous one's output, so a removal can expose a later match.
+    def __init__(self, rules):
+        self.rules = list(rules)
+
+    def __call__(self, text):
+        for rule, replacement in self.rules:
+            if isinstance(rule, str):
+                text = text.replace(rule, replacement)
+            else:
+                text = rule.sub(replacement, text)
+        return text
+
+
+IEA_COPYRIGHT = 'IEA/IRENA Global Renewable Energy Policies and Measures Database © OECD/IEA and IRENA, [November 2020]'
+
+# Policy_Content markup cleanup shared by the preprocess, stats and topic stages, in the order of the old
+# str.replace chains. Each document goes through all the rules in one call, so no intermediate Series is built.
+# Rules stay separate: a combined alternation loses re's literal-prefix scan and is slower on this text.
+SANITIZE_RULES = [
+    (IEA_COPYRIGHT, ''), ('\n', ' '), (re.compile(r'(?s)<.+?>'), ' '), ('&nbsp;', ' '),
+    (re.compile(r'(?s)\(.+?\)'), ' '), (re.compile(r'(?s)\[.+?\]'), ' '), (' •', '.'), ('‘', "'"), ('’', "'")]
+sanitize_content = Replacer(SANITIZE_RULES)
+
+CLEAN_CONTENT = "Policy_Content_clean"
+# Names the SANITIZE_RULES a Policy_Content_clean column was built with, so workbooks cleaned with other rules are
+# cleaned again
+CLEAN_CONTENT_TAG = "Policy_Content_clean_tag"
+SANITIZE_TAG = hashlib.sha1(repr([(getattr(rule, "pattern", rule), replacement)
+                                  for rule, replacement in SANITIZE_RULES]).encode("utf8")).hexdigest()[:12]
+_clean_cache = {}
+
+
+def clean_content(text):
+    # sanitize_content() memoized by content hash; NaN stays NaN
+    if not isinstance(text, str):
+        return text
+    key = hashlib.sha1(text.encode("utf8")).digest()
+    if key not in _clean_cache:
+        _clean_cache[key] = sanitize_content(text)
+    return _clean_cache[key]
+
+
+def add_clean_content(df, column="Policy_Content"):
+    # Materialize Policy_Content_clean once; rows that already carry it (e.g. from an upstream workbook) are kept
+    # when it was cleaned with the current SANITIZE_RULES
+    if CLEAN_CONTENT in df.columns and CLEAN_CONTENT_TAG in df.columns:
+        stale = (df[CLEAN_CONTENT_TAG] != SANITIZE_TAG) | (df[CLEAN_CONTENT].isnull() & df[column].notnull())
+        df.loc[stale, CLEAN_CONTENT] = df.loc[stale, column].map(clean_content)
+    else:
+        df[CLEAN_CONTENT] = df[column].map(clean_content)
+    df[CLEAN_CONTENT_TAG] = SANITIZE_TAG
+    return df
+
+
+@lru_cache(maxsize=None)
+def load_stopwords(path=STOPWORDS_FILE, extra=()):
+    with open(path, 'r', encoding='utf8') as file:
+        stopwords = {line.strip() for line in file}
+    return frozenset(stopwords.union(extra))
+
+
+def tokenize(text, fast=False):
+    # word_tokenize (punkt + treebank) or the regex tokenizer, which is several times faster
+    if fast:
+        return FAST_TOKEN_PATTERN.findall(text)
+    return word_tokenize(text)
+
+
+def coarse_pos(tag):
+    for prefix, pos in COARSE_POS:
+        if tag.startswith(prefix):
+            return pos
+    return None
+
+
+class Lemmatizer:
+    # POS-aware WordNet lemmatizer: one perceptron tagger per process, lemmas memoized by (token, coarse POS)
+    def __init__(self, cache_size=LEMMA_CACHE_SIZE):
+        self.tagger = PerceptronTagger()
+        self.wnl = WordNetLemmatizer()
+        self.lemma = lru_cache(maxsize=cache_size)(self._lemma)
+
+    def _lemma(self, word, pos):
+        return self.wnl.lemmatize(word, pos=pos)
+
+    def lemmatize(self, words):
+        return self.lemmatize_sents([words])[0]
+
+    def lemmatize_sents(self, sentences):
+        # Tag a batch of token lists, then lemmatize each (token, coarse POS) once
+        lemmas = []
+        for tagged in self.tagger.tag_sents(sentences):
+            words = []
+            for word, tag in tagged:
+                pos = coarse_pos(tag)
+                words.append(self.lemma(word, pos) if pos else word)
+            lemmas.append(words)
+        return lemmas
+
+
+_lemmatizer = None
+
+
+def load_lemmatizer():
+    global _lemmatizer
+    if _lemmatizer is None:
+        _lemmatizer = Lemmatizer()
+    return _lemmatizer
+
+
+def legacy_lemmatize(words, wnl: WordNetLemmatizer):
+    # The per-document pos_tag lemmatizer Lemmatizer replaces, kept for the benchmark
+    for word, tag in pos_tag(words):
+        if tag.startswith('NN'):
+            yield wnl.lemmatize(word, pos='n')
+        elif tag.startswith('VB'):
+            yield wnl.lemmatize(word, pos='v')
+        elif tag.startswith('JJ'):
+            yield wnl.lemmatize(word, pos='a')
+        elif tag.startswith('R'):
+            yield wnl.lemmatize(word, pos='r')
+        else:
+            yield word
+
+
+def normalize_words(text, stopwords, fast=False):
+    # 1.years and %, like 1991-2007, 2025, 2.5%
+    n_text = YEAR_PERCENT_PATTERN.sub('', str(text))
+
+    # 2.converting all characters to lowercase
+    n_text = n_text.lower()
+
+    # 3.stopwords (punctuation and symbols included)
+    return [word for word in tokenize(n_text, fast) if word not in stopwords]
+
+
+_worker = {}
+
+
+def _init_worker(stopwords, lemmatize_words, fast):
+    _worker["stopwords"] = stopwords
+    _worker["lemmatizer"] = load_lemmatizer() if lemmatize_words else None
+    _worker["fast"] = fast
+
+
+def _normalize_chunk(texts):
+    word_lists = [normalize_words(text, _worker["stopwords"], _worker["fast"]) for text in texts]
+
+    # 4.lemmatization, tagged as one batch
+    if _worker["lemmatizer"] is not None:
+        word_lists = _worker["lemmatizer"].lemmatize_sents(word_lists)
+    return [' '.join(words) for words in word_lists]
+
+
+def normalize_texts(texts, stopwords=None, lemmatize_words=True, fast=False, n_process=1, chunk_size=64,
+                    desc='Preprocessing ...'):
+    # ' '.join(normalize_words(text)) per text, in input order; n_process > 1 spreads chunks over a process pool
+    stopwords = load_stopwords() if stopwords is None else stopwords
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    bar = tqdm(total=len(texts), desc=desc, ncols=150)
+    processed_texts = []
+    if n_process > 1 and len(chunks) > 1:
+        with Pool(n_process, _init_worker, (stopwords, lemmatize_words, fast)) as pool:
+            for chunk in pool.imap(_normalize_chunk, chunks):
+                processed_texts += chunk
+                bar.update(len(chunk))
+    else:
+        _init_worker(stopwords, lemmatize_words, fast)
+        for chunk in chunks:
+            processed_texts += _normalize_chunk(chunk)
+            bar.update(len(chunk))
+    bar.close()
+    return processed_texts
+
+
+def legacy_normalize(texts, lemmatize_words=True):
+    # The per-script normalize() this module replaces, kept for the benchmark
+    stopwords = []
+    with open(STOPWORDS_FILE, 'r', encoding='utf8') as file:
+        for line in file:
+            stopwords.append(line.strip())
+    wnl = WordNetLemmatizer()
+    processed_texts = []
+    for text in texts:
+        n_text = re.sub(r'(\d{4}(-\d{4})?)|([-+]?\d+(.\d+)?%)', '', str(text))
+        n_text = n_text.lower()
+        words = [word for word in word_tokenize(n_text) if word not in stopwords]
+        if lemmatize_words:
+            words = list(legacy_lemmatize(words, wnl))
+        processed_texts.append(' '.join(words))
+    return processed_texts
+
+
+def load_benchmark_texts(path):
+    if path.endswith(".jsonl"):
+        with open(path, 'r', encoding='utf8') as file:
+            samples = [json.loads(line) for line in file]
+        return ["{} {}".format(sample["Policy"], sample["Policy_Content"]) for sample in samples]
+    df = pd.read_excel(path, sheet_name="all_policies_dedup")
+    return (df["Policy"].fillna('') + ' ' + df["Policy_Content"].fillna('')).to_list()
+
+
+if __name__ == '__main__':
+    # Benchmark: docs/s of the old per-script normalize() against normalize_texts()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default=os.path.join(CODE_DIR, "data", "test.jsonl"))
+    parser.add_argument('--n_process', default=os.cpu_count(), type=int)
+    parser.add_argument('--no_lemmatize', action='store_true', help="Skip pos_tag/WordNet (needs wordnet data)")
+    args = parser.parse_args()
+
+    texts = load_benchmark_texts(args.input)
+    lemmatize_words = not args.no_lemmatize
+
+    runs = [("legacy", lambda: legacy_normalize(texts, lemmatize_words)),
+            ("normalize_texts", lambda: normalize_texts(texts, lemmatize_words=lemmatize_words)),
+            ("normalize_texts n_process={}".format(args.n_process),
+             lambda: normalize_texts(texts, lemmatize_words=lemmatize_words, n_process=args.n_process)),
+            ("normalize_texts fast tokenizer",
+             lambda: normalize_texts(texts, lemmatize_words=lemmatize_words, fast=True)),
+            ("normalize_texts fast tokenizer n_process={}".format(args.n_process),
+             lambda: normalize_texts(texts, lemmatize_words=lemmatize_words, fast=True, n_process=args.n_process))]
+
+    baseline = None
+    for name, run in runs:
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = result
+        same = sum(a == b for a, b in zip(result, baseline))
+        print("{:<45} {:>9.1f} docs/s   identical to legacy: {}/{}".format(
+            name, len(texts) / elapsed, same, len(texts)))